@@ -0,0 +1,380 @@
+import os
+import re
+import heapq
+import queue
+import itertools
+import threading
+import psycopg2
+import psycopg2.extensions
+import db
+
+#
+# Streaming queries: the rows of a query are fetched through a named
+# (server-side) cursor in chunks of CHUNK_SIZE rows and returned one at a
+# time, so that a large result is never held in memory and the first rows
+# are processed before the query has returned them all (db.sql() returns
+# the whole result as a list).
+#
+# The rows are dictionaries like the ones returned by db.sql(..., 'auto'):
+# the column names are not case-sensitive.
+#
+# copy() exports a query with COPY (query) TO STDOUT instead, and returns
+# each row as a list of strings parsed from the tab-delimited text, which
+# is faster than building a dictionary (or a tuple of typed values) per row
+# for a large extract.
+#
+# merge() runs several queries at once, each on its own connection and
+# thread, and merges their rows (e.g. the rows of key ranges of a table).
+# The queries all see the same snapshot of the database, exported by a
+# coordinating connection, as if they were one query.
+#
+# The connection is separate from the one used by db.sql() (a named cursor
+# or a COPY cannot share it); it is opened with the server, database, user
+# and password of the db module, and is read-only.
+#
+
+# number of rows fetched per round trip
+CHUNK_SIZE = 10000
+
+# number of rows passed at once from a merge() thread
+BATCH_SIZE = 1000
+
+# number of batches queued per merge() thread
+QUEUE_SIZE = 16
+
+# the connection (see connect())
+connection = None
+
+# numbers the cursor names
+cursorNumber = itertools.count()
+
+# COPY text format escapes: backslash + 1 to 3 octal digits, backslash +
+# x + 1 or 2 hex digits (a byte value), or backslash + character
+COPY_ESCAPE = re.compile(r'\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|(.))')
+COPY_ESCAPES = { 'b' : '\b', 'f' : '\f', 'n' : '\n', 'r' : '\r', 't' : '\t',
+                 'v' : '\v' }
+
+#
+# CLASS: Row
+# IS: One row of a query.
+# HAS: The column values, by lower-case column name
+# DOES: Returns a column value by its name, in any case
+#
+class Row (dict):
+
+    def __getitem__ (self, key):
+        return dict.__getitem__(self, key.lower())
+
+    def __contains__ (self, key):
+        return dict.__contains__(self, key.lower())
+
+    def get (self, key, default=None):
+        return dict.get(self, key.lower(), default)
+
+
+#
+# Purpose: Open a new read-only connection.
+# Returns: psycopg2 connection
+# Assumes: Nothing
+# Effects: Connects to the database (see db.get_sqlServer(), etc.)
+# Throws: psycopg2.Error
+#
+def newConnection ():
+
+    conn = psycopg2.connect(host=db.get_sqlServer(),
+                            dbname=db.get_sqlDatabase(),
+                            user=db.get_sqlUser(),
+                            password=db.get_sqlPassword())
+    conn.set_session(readonly=True)
+
+    return conn
+
+
+#
+# Purpose: Open the connection, if it is not open.
+# Returns: psycopg2 connection
+# Assumes: Nothing
+# Effects: Connects to the database
+# Throws: psycopg2.Error
+#
+def connect ():
+    global connection
+
+    if connection is None:
+        connection = newConnection()
+
+    return connection
+
+
+#
+# Purpose: Run a query and return its rows as they are fetched.
+# Returns: A generator of Row objects (or of tuples, in column order,
+#          if 'raw' is set)
+# Assumes: Nothing
+# Effects: Declares a server-side cursor, in its own transaction, which
+#          ends when the rows are exhausted or the generator is closed.
+#          Uses 'conn' if given, else the connection.
+# Throws: psycopg2.Error
+#
+def stream (cmd, chunkSize=CHUNK_SIZE, raw=0, conn=None):
+
+    if conn is None:
+        conn = connect()
+    cursor = conn.cursor(name='pgstream%d' % next(cursorNumber))
+
+    try:
+        cursor.execute(cmd)
+
+        columns = None
+        while 1:
+            rows = cursor.fetchmany(chunkSize)
+            if not rows:
+                break
+            if raw:
+                yield from rows
+                continue
+            if columns is None:
+                columns = [c[0].lower() for c in cursor.description]
+            for row in rows:
+                yield Row(zip(columns, row))
+    finally:
+        cursor.close()
+        conn.rollback()
+
+
+#
+# Purpose: Convert one escape sequence of the COPY text format.
+# Returns: The character
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def copyEscape (match):
+
+    (octal, hex, char) = match.groups()
+
+    if octal:
+        return chr(int(octal, 8) & 0xff)
+    if hex:
+        return chr(int(hex, 16))
+    return COPY_ESCAPES.get(char, char)
+
+
+#
+# Purpose: Convert one field of the COPY text format.
+# Returns: The field value (string), or None for NULL
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def copyField (field):
+
+    if field == '\\N':
+        return None
+    if '\\' in field:
+        return COPY_ESCAPE.sub(copyEscape, field)
+    return field
+
+
+#
+# Purpose: Export a query with COPY (query) TO STDOUT and return its rows
+#          as they are received.
+# Returns: A generator of lists of strings (None for NULL), in column order
+# Assumes: Nothing
+# Effects: Runs the COPY on a thread, which writes the text (in the client
+#          encoding of the connection) to a pipe that is read and parsed
+#          here.  Uses 'conn' if given, else the connection.
+# Throws: psycopg2.Error
+#
+def copy (cmd, conn=None):
+
+    if conn is None:
+        conn = connect()
+    encoding = psycopg2.extensions.encodings.get(conn.encoding, conn.encoding)
+    (readFd, writeFd) = os.pipe()
+    fpRead = os.fdopen(readFd, 'r', encoding=encoding)
+    fpWrite = os.fdopen(writeFd, 'wb')
+    errors = []
+
+    def export():
+        try:
+            cursor = conn.cursor()
+            cursor.copy_expert('copy (%s) to stdout' % cmd, fpWrite)
+            cursor.close()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                fpWrite.close()
+            except OSError:
+                # the rows were not all read (see below)
+                pass
+            conn.rollback()
+
+    thread = threading.Thread(target=export, daemon=True)
+    thread.start()
+
+    try:
+        for line in fpRead:
+            fields = line[:-1].split('\t')
+            if '\\' in line:
+                fields = [copyField(f) for f in fields]
+            yield fields
+    finally:
+        fpRead.close()
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+#
+# Purpose: Run a query on a new connection and queue its rows (merge()
+#          thread).
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Starts a transaction on the exported 'snapshot' and sets
+#          'ready', then puts batches of rows on 'rowQueue', then None (or
+#          the exception, if the query fails); stops early, ending the
+#          query, when 'stop' is set
+# Throws: Nothing
+#
+def queueRows (cmd, useCopy, rowQueue, snapshot, ready, stop):
+
+    conn = None
+    rows = None
+    try:
+        try:
+            conn = newConnection()
+            conn.set_session(isolation_level='REPEATABLE READ')
+            conn.cursor().execute('set transaction snapshot %s', (snapshot,))
+        finally:
+            ready.set()
+
+        if useCopy:
+            rows = copy(cmd, conn)
+        else:
+            rows = stream(cmd, raw=1, conn=conn)
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                if stop.is_set():
+                    return
+                rowQueue.put(batch)
+                batch = []
+        rowQueue.put(batch)
+        rowQueue.put(None)
+    except Exception as e:
+        rowQueue.put(e)
+    finally:
+        if rows is not None:
+            rows.close()
+        if conn is not None:
+            conn.close()
+
+
+#
+# Purpose: Return the rows queued by a merge() thread.
+# Returns: A generator of rows
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: The exception of the thread's query
+#
+def dequeueRows (rowQueue):
+
+    while 1:
+        batch = rowQueue.get()
+        if batch is None:
+            break
+        if isinstance(batch, Exception):
+            raise batch
+        yield from batch
+
+
+#
+# Purpose: Stop the merge() threads.
+# Returns: Nothing
+# Assumes: 'stop' is set
+# Effects: Empties the queues until each thread has ended (a thread
+#          checks 'stop' before each batch, and closes its query and
+#          connection)
+# Throws: Nothing
+#
+def stopThreads (threads, queues):
+
+    for (thread, rowQueue) in zip(threads, queues):
+        while thread.is_alive():
+            try:
+                while 1:
+                    rowQueue.get_nowait()
+            except queue.Empty:
+                pass
+            thread.join(0.1)
+
+
+#
+# Purpose: Run queries at the same time, each on its own connection and
+#          thread, and merge their rows.
+# Returns: A generator of rows (tuples, or lists of strings if 'useCopy'
+#          is set; see stream() and copy()), in 'key' order
+# Assumes: The rows of each query are in 'key' order
+# Effects: Connects to the database once per query, and once to export
+#          the snapshot, which is kept until every query has started a
+#          transaction on it.  When the rows are exhausted, or the
+#          generator is closed or fails, the queries and their connections
+#          are closed and the threads are joined.
+# Throws: psycopg2.Error
+#
+def merge (cmds, key, useCopy=0):
+
+    stop = threading.Event()
+    threads = []
+    queues = []
+
+    try:
+        coordinator = newConnection()
+        try:
+            coordinator.set_session(isolation_level='REPEATABLE READ')
+            cursor = coordinator.cursor()
+            cursor.execute('select pg_export_snapshot()')
+            snapshot = cursor.fetchone()[0]
+
+            events = []
+            for cmd in cmds:
+                rowQueue = queue.Queue(QUEUE_SIZE)
+                ready = threading.Event()
+                thread = threading.Thread(target=queueRows,
+                                          args=(cmd, useCopy, rowQueue, snapshot,
+                                                ready, stop),
+                                          daemon=True)
+                thread.start()
+                threads.append(thread)
+                queues.append(rowQueue)
+                events.append(ready)
+
+            for ready in events:
+                ready.wait()
+        finally:
+            coordinator.close()
+
+        yield from heapq.merge(*[dequeueRows(q) for q in queues], key=key)
+    finally:
+        stop.set()
+        stopThreads(threads, queues)
+
+
+#
+# Purpose: Close the connection.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Disconnects from the database
+# Throws: Nothing
+#
+def close ():
+    global connection
+
+    if connection is not None:
+        connection.close()
+        connection = None
@@ -0,0 +1,208 @@
+import os
+import hashlib
+import pickle
+
+#
+# Binary cache of the records parsed from the UniProt input file.
+#
+# The cache file is a stream of pickles: the cache key, then the records in
+# input file order, in lists of CHUNK_SIZE records, then None; it ends with
+# the SHA-1 checksum of the input file (CHECKSUM_SIZE hex digits).  The key
+# is made of the size and modification time of the input file and of the
+# parser settings that change the parsed records, so a cache is only used
+# for the same input file, parsed the same way.
+# The input file is checksummed only when the key matches, and when the
+# cache file is finished (after the input file has been parsed, so the
+# input file is not read before it is parsed).
+#
+
+# cache file format version (change it when UniProtRecord.Record changes)
+CACHE_VERSION = 7
+
+# length of the checksum at the end of the cache file
+CHECKSUM_SIZE = 40
+
+# number of records per pickle
+CHUNK_SIZE = 10000
+
+# block size used to compute the checksum
+BLOCK_SIZE = 1024 * 1024
+
+#
+# Purpose: Get the cache key of an input file.
+# Returns: The key (a tuple)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: OSError
+#
+def cacheKey (path, *settings):
+
+    stat = os.stat(path)
+
+    return (CACHE_VERSION, stat.st_size, stat.st_mtime_ns) + settings
+
+
+#
+# Purpose: Get the checksum of an input file.
+# Returns: The SHA-1 checksum (hex string)
+# Assumes: Nothing
+# Effects: Reads the whole input file
+# Throws: OSError
+#
+def fileChecksum (path):
+
+    checksum = hashlib.sha1()
+    fp = open(path, 'rb')
+    block = fp.read(BLOCK_SIZE)
+    while block:
+        checksum.update(block)
+        block = fp.read(BLOCK_SIZE)
+    fp.close()
+
+    return checksum.hexdigest()
+
+
+#
+# CLASS: CacheReader
+# IS: A reader of the records in a cache file.
+# HAS: The open cache file
+# DOES: Returns the cached records, in input file order
+#
+class CacheReader:
+
+    #
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: fp is positioned after the cache key
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self, fp):
+        self.fp = fp
+
+    #
+    # Purpose: Generator of the cached records
+    # Returns: Record objects
+    # Assumes: Nothing
+    # Effects: Closes the cache file at the end
+    # Throws: pickle.UnpicklingError, EOFError if the cache file is damaged
+    #
+    def records (self):
+
+        while 1:
+            chunk = pickle.load(self.fp)
+            if chunk is None:
+                break
+            for rec in chunk:
+                yield rec
+
+        self.fp.close()
+
+
+#
+# CLASS: CacheWriter
+# IS: A writer of a cache file.
+# HAS: The temporary cache file and the records not yet written to it
+# DOES: Writes the records, then renames the temporary file to the cache
+#       file, so that an incomplete cache file is never used.
+#
+class CacheWriter:
+
+    #
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Creates cacheFile.tmp and writes the key (the temporary
+    #          file is removed if the key cannot be written)
+    # Throws: OSError
+    #
+    def __init__ (self, cacheFile, path, key):
+
+        self.cacheFile = cacheFile
+        self.path = path
+        self.fp = open(cacheFile + '.tmp', 'wb')
+        self.chunk = []
+
+        try:
+            pickle.dump(key, self.fp, pickle.HIGHEST_PROTOCOL)
+        except:
+            self.discard()
+            raise
+
+    #
+    # Purpose: Add one record to the cache.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Writes a chunk of records to the temporary file when full
+    # Throws: OSError
+    #
+    def add (self, rec):
+
+        self.chunk.append(rec)
+        if len(self.chunk) >= CHUNK_SIZE:
+            pickle.dump(self.chunk, self.fp, pickle.HIGHEST_PROTOCOL)
+            self.chunk = []
+
+    #
+    # Purpose: Finish the cache file.
+    # Returns: Nothing
+    # Assumes: Every record has been added
+    # Effects: Writes the checksum of the input file (path), which has just
+    #          been parsed; replaces cacheFile with the temporary file
+    # Throws: OSError
+    #
+    def close (self):
+
+        if self.chunk:
+            pickle.dump(self.chunk, self.fp, pickle.HIGHEST_PROTOCOL)
+            self.chunk = []
+        pickle.dump(None, self.fp, pickle.HIGHEST_PROTOCOL)
+        self.fp.write(fileChecksum(self.path).encode())
+        self.fp.close()
+
+        os.replace(self.cacheFile + '.tmp', self.cacheFile)
+
+    #
+    # Purpose: Discard an unfinished cache file.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Removes the temporary file
+    # Throws: Nothing
+    #
+    def discard (self):
+
+        self.fp.close()
+        try:
+            os.remove(self.cacheFile + '.tmp')
+        except OSError:
+            pass
+
+
+#
+# Purpose: Open a cache file for reading, if it matches the key and the
+#          checksum of the input file (path).
+# Returns: A CacheReader, or None if the cache file does not exist, cannot
+#          be read or was written for a different key or input file
+# Assumes: Nothing
+# Effects: Reads the whole input file if the key matches
+# Throws: Nothing
+#
+def openCache (cacheFile, path, key):
+
+    try:
+        fp = open(cacheFile, 'rb')
+    except OSError:
+        return None
+
+    try:
+        if pickle.load(fp) == key:
+            start = fp.tell()
+            fp.seek(-CHECKSUM_SIZE, os.SEEK_END)
+            if fp.read(CHECKSUM_SIZE).decode() == fileChecksum(path):
+                fp.seek(start)
+                return CacheReader(fp)
+    except Exception:
+        pass
+
+    fp.close()
+    return None
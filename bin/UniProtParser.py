@@ -1,5 +1,8 @@
 import os
 import re
+import mmap
+import time
+import heapq
 
 import UniProtRecord
 
@@ -14,12 +17,81 @@ import UniProtRecord
 #	- TR11071/add 'uniprotName' parsing
 #
 
+#
+# OX   NCBI_TaxID=10090;
+# OX   NCBI_TaxID=10090 {ECO:0000313|EMBL:BAE27360.1};
+#
+TAXON_PATTERN = re.compile(r'OX   NCBI_TaxID=(\d+)')
+MAPPED_TAXON_PATTERN = re.compile(b'\nOX   NCBI_TaxID=(\\d+)')
+
+#
+# Fields that can be extracted from a UniProt record:
+#
+#   field name -> (line code, DR database name, extractor method)
+#
+FIELDS = {
+    'ensembl' : ('DR   ', 'Ensembl', 'parseEnsembl'),
+    'entrezgene' : ('DR   ', 'GeneID', 'parseEntrezGene'),
+    'embl' : ('DR   ', 'EMBL', 'parseEMBL'),
+    'pdb' : ('DR   ', 'PDB', 'parsePDB'),
+    'interpro' : ('DR   ', 'InterPro', 'parseInterPro'),
+    'mgi' : ('DR   ', 'MGI', 'parseMGI'),
+    'ec' : ('DE   ', None, 'parseDE'),
+    'kw' : ('KW   ', None, 'parseKW'),
+    'crc64' : ('SQ   ', None, 'parseSQ'),
+    'length' : ('SQ   ', None, 'parseSQ'),
+    'taxon' : ('OX   ', None, 'parseOX'),
+    'gene' : ('GN   ', None, 'parseGN'),
+}
+
 #
 # CLASS: Parser
 # IS: An object that knows how to parse the mouse-only UniProt file and extract
 #     specific attributes.
 # HAS: A UniProt record object to hold attributes from one UniProt record.
-# DOES: Parses the mouse-only UniProt file.
+#      A lookup of line codes (ID, AC, DE, KW, DR) to the method that
+#      extracts the attributes from that line, and a lookup of DR database
+#      names (Ensembl, GeneID, ...) to the method that extracts that
+#      cross-reference.
+#      Optionally, a read-only memory map of the UniProt file.
+# DOES: Parses the mouse-only UniProt file, one independent record at a time.
+#
+#      By default, the file is read one line at a time.  If 'mapped' is set,
+#      the file is memory-mapped instead and the record terminators and the
+#      ID/AC/DE/KW/DR lines that have an extractor are found by a single
+#      bytes pattern search; only those lines are decoded to strings.
+#
+#      'fields' is the set of FIELDS to extract (default: all), e.g.
+#
+#          Parser(fp, fields={'entrezgene', 'ensembl', 'embl'})
+#
+#      The extractors for the other fields are never run; in mapped mode
+#      their lines are not even decoded.
+#
+#      In mapped mode, 'start' and 'end' limit parsing to a byte range of
+#      the file (see splitFile()), so that separate processes can parse
+#      separate parts of the same file.
+#
+#      'buffer' (bytes) is parsed the same way as a memory-mapped file, for
+#      data that has already been read into memory (see
+#      UniProtReader.readGzipRange()); fp is not used.
+#
+#      In mapped mode, each record also gets its byte offset and length in
+#      the file ('baseOffset' is added, for a buffer that does not start at
+#      the beginning of the file).  These are written to an accession index
+#      (see writeIndex()), and fetch() uses 'indexFile' to read and parse one
+#      record without scanning the file.
+#
+#      'taxon' (an NCBI taxonomy ID, e.g. '10090') restricts parsing to the
+#      records for that organism, so that a full UniProtKB release
+#      (uniprot_sprot.dat, uniprot_trembl.dat) can be read directly.  The
+#      OX line of each record is checked before any other line is
+#      extracted; records of other organisms are skipped to their "//".
+#
+#      'stats' (a ParserStats object) turns on instrumentation: the
+#      extractors are wrapped to count lines and time each extractor, and
+#      each record is timed.  Without 'stats' nothing is wrapped, so the
+#      parser runs exactly as before.
 #
 class Parser:
 
@@ -27,166 +99,988 @@ class Parser:
     # Purpose: Constructor
     # Returns: Nothing
     # Assumes: Nothing
-    # Effects: Initializes the file pointer and the UniProt record object.
-    # Throws: Nothing
+    # Effects: Initializes the file pointer and the extractor lookups.
+    #          If mapped, memory-maps the file.
+    # Throws: ValueError if 'fields' contains an unknown field name
     #
-    def __init__(self, fp):
+    def __init__(self, fp, mapped=0, start=0, end=None, fields=None, buffer=None,
+                 taxon=None, baseOffset=0, indexFile=None, stats=None):
 
         self.fp = fp
+        self.record = None
+        self.buffer = None
+        self.fields = fields
+        self.taxon = taxon
+        self.baseOffset = baseOffset
+        self.indexFile = indexFile
+        self.stats = stats
+
+        #
+        # Line code (first 5 characters of the line) -> extractor.
+        # Lines with any other code (SQ, FT, CC, RN, sequence data, ...)
+        # are dropped after a single lookup.
+        #
+        # The UniProt ID and the SwissProt/TrEMBL status are always parsed.
+        #
+        self.tagHandlers = {
+            'ID   ' : self.parseID,
+            'AC   ' : self.parseAC,
+        }
+
+        #
+        # DR database name -> extractor.
+        # Cross-references to any other database are dropped.
+        #
+        self.drHandlers = {}
+
+        #
+        # Add the extractors for the requested fields only.
+        #
+        if fields is None:
+            fields = FIELDS
+
+        for f in fields:
+            if f not in FIELDS:
+                raise ValueError('Unknown UniProt field: ' + str(f))
+
+        for f in FIELDS:
+            if f not in fields:
+                continue
+            (tag, dbName, method) = FIELDS[f]
+            if dbName:
+                self.tagHandlers[tag] = self.parseDR
+                self.drHandlers[dbName] = getattr(self, method)
+            else:
+                self.tagHandlers[tag] = getattr(self, method)
+
+        if buffer is not None:
+            self.mapFile(start, end, buffer)
+        elif mapped:
+            self.mapFile(start, end)
+
+        if stats is not None:
+            self.instrument(stats)
+
+
+    #
+    # Purpose: Wrap the extractors and nextRecord() to collect statistics.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Replaces the extractor lookups and, for this object only,
+    #          nextRecord(); a file read line by line is wrapped to count
+    #          the lines read
+    # Throws: Nothing
+    #
+    def instrument (self, stats):
+
+        #
+        # A DR line is counted by the extractor of its database, so that
+        # the DR lines of the other databases (which are not searched for
+        # in mapped mode) are not counted in text mode either.
+        #
+        for tag in self.tagHandlers:
+            if tag == 'DR   ':
+                self.tagHandlers[tag] = stats.wrap(None, self.tagHandlers[tag])
+            else:
+                self.tagHandlers[tag] = stats.wrap(tag.strip(), self.tagHandlers[tag])
+
+        for dbName in self.drHandlers:
+            self.drHandlers[dbName] = stats.wrap('DR', self.drHandlers[dbName])
+
+        if self.buffer is None:
+            self.fp = LineCounter(self.fp)
+
+        self.nextRecord = self.nextTimedRecord
+
+    #
+    # Purpose: Parse the next record and add its size and time to self.stats.
+    # Returns: Next record object (frozen), or None at EOF
+    # Assumes: instrument() has been called
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def nextTimedRecord (self):
+
+        if self.buffer is None:
+            lines = self.fp.lines
+
+        start = time.perf_counter()
+        rec = Parser.nextRecord(self)
+        elapsed = time.perf_counter() - start
+
+        if rec is None:
+            self.stats.addTime(elapsed)
+            return None
 
         #
-        # Create a UniProt record object.
+        # Entry size: lines read for the entry (skipped entries of other
+        # organisms included), or the lines of the entry in the mapped file.
         #
-        self.record = UniProtRecord.Record()
+        if self.buffer is None:
+            lines = self.fp.lines - lines
+        else:
+            offset = rec.getOffset() - self.baseOffset
+            lines = self.buffer[offset:offset + rec.getLength()].count(b'\n')
+
+        self.stats.addRecord(rec.getUniProtID(), lines, elapsed)
+
+        return rec
 
 
     #
-    # Purpose: Parser the next record from the UniProt file and load the
-    #          necessary attributes into the record object.
-    # Returns: Next record object
+    # Purpose: Parse the next record from the UniProt file and load the
+    #          necessary attributes into a new record object.
+    # Returns: Next record object (frozen), or None at EOF
     # Assumes: Nothing
     # Effects: Nothing
     # Throws: Nothing
     #
     def nextRecord (self):
-        self.record.clear()
+
+        if self.buffer is not None:
+            return self.nextMappedRecord()
+
+        if self.taxon is not None:
+            return self.nextTaxonRecord()
+
+        #
+        # Create a new UniProt record object for this entry so that records
+        # returned earlier are never changed by the parser.
+        #
+        rec = UniProtRecord.Record()
+        self.record = rec
+
+        handlers = self.tagHandlers
+        readline = self.fp.readline
 
         #
         # Start reading the lines of the UniProt record and continue to process
         # the lines until the record terminator ("//") is found or EOF is
         # reached.
         #
-        self.line = self.fp.readline()
-        while self.line and self.line[0:2] != '//':
-            self.line = self.line[:-1]
+        line = readline()
+        while line and line[0:2] != '//':
+            handler = handlers.get(line[0:5])
+            if handler:
+                handler(rec, line[:-1])
+            line = readline()
 
-            #
-            # Determine if the UniProt ID is a TrEMBL ID or not
-            #
-            if self.line[0:2] == 'ID':
-                if self.line.find('Unreviewed;') >= 0:
-                    self.record.isTrembl = 1
+        self.line = line
 
-            #
-            # Save the UniProt ID.
-            #
-            if self.line[0:2] == 'AC' and self.record.getUniProtID() == '':
-                self.record.setUniProtID(re.split(';', self.line[5:])[0].strip())
+        #
+        # If the record terminator was found, return the record object.
+        # Otherwise, EOF must have been reached, so return None.
+        #
+        if line[0:2] == '//':
+            return rec.freeze()
+        else:
+            return None
 
-            #
-            # Save an Ensembl ID. If the input line looks like this:
-            #
-            # DR   Ensembl; ID1; ID2; ID3; Mus musculus.
-            # DR   Ensembl; ID1; ID2; ID3; Mus musculus. [xxxxx]
-            #
-            # need to split by ";" and "."
-            #
-            # We want to extract any IDs that begin with 'ENSMUSG'. Do not
-            # add an ID that has already been added.
-            #
-            if self.line[0:13] == 'DR   Ensembl;':
-                for t1 in re.split(';',self.line[13:]):
-                    if t1.strip()[0:7] == 'ENSMUSG':
-                        for t2 in re.split('\.',t1):
-                            if t2.strip()[0:7] == 'ENSMUSG':
-                                if not self.record.hasEnsemblID(t2.strip()):
-                                    self.record.addEnsemblID(t2.strip())
+    #
+    # Purpose: Parse the next record for self.taxon from the UniProt file.
+    # Returns: Next record object (frozen), or None at EOF
+    # Assumes: Nothing
+    # Effects: Skips the records of other organisms
+    # Throws: Nothing
+    #
+    def nextTaxonRecord (self):
 
-            #
-            # Save an EntrezGene ID. If the input line looks like this:
-            #
-            # DR   GeneID; 12345; -.
-            #
-            # We want to extract the 12345. Do not add an ID that has already
-            # been added.
-            #
-            if self.line[0:12] == 'DR   GeneID;':
-                id = re.split(';', self.line[5:])[1].strip()
-                if not self.record.hasEntrezGeneID(id):
-                    self.record.addEntrezGeneID(id)
+        handlers = self.tagHandlers
+        readline = self.fp.readline
 
-            #
-            # Save an EMBL ID. If the input line looks like this:
-            #
-            # DR   EMBL; 12345; -.
-            #
-            # We want to extract the 12345. Do not add an ID that has already
-            # been added.
-            #
-            if self.line[0:10] == 'DR   EMBL;':
-                if self.line.find('mRNA') >= 0:
-                  id = re.split(';', self.line[5:])[1].strip()
-                  if not self.record.hasEMBLID(id):
-                      self.record.addEMBLID(id)
+        while 1:
+            rec = UniProtRecord.Record()
+            self.record = rec
 
             #
-            # Save an PDB ID. If the input line looks like this:
-            #
-            # DR   PDB; 2PF4; X-ray; 3.10 A; A/B/C/D=1-589.
+            # Hold the lines in front of the OX line until the organism
+            # is known.
             #
-            # We want to extract the 2PF4.
-            #
-            if self.line[0:9] == 'DR   PDB;':
-                id = re.split(';', self.line[5:])[1].strip()
-                if not self.record.hasPDBID(id):
-                    self.record.addPDBID(id)
+            pending = []
+            line = readline()
+            while line and line[0:2] != '//' and line[0:5] != 'OX   ':
+                if line[0:5] in handlers:
+                    pending.append(line[:-1])
+                line = readline()
 
-            #
-            # Save an EC ID. If the input line looks like this:
-            #
-            # DE            EC=1.1.1.284;
-            # DE            EC=2.7.11.21 {....};
-            # note : the EC does not always appear at the same line number
-            #
-            # We want to extract the 2.3.1.41
-            #
-            # TR11817 : added "{...}" handling
-            #
-            if self.line[0:5] == 'DE   ':
-                #if self.record.isTrembl == 0 and
-                if self.line.find('EC=') >= 0:
-                  id = re.split('=', self.line)[1].strip()
-                  id = re.split(' {', id)[0]
-                  id = str.replace(id.strip(), ';', '')
-                  if not self.record.hasECID(id):
-                      self.record.addECID(id)
+            m = TAXON_PATTERN.match(line)
+            if m and m.group(1) == self.taxon:
+                for l in pending:
+                    handlers[l[0:5]](rec, l)
+                handler = handlers.get('OX   ')
+                if handler:
+                    handler(rec, line[:-1])
+                line = readline()
+                while line and line[0:2] != '//':
+                    handler = handlers.get(line[0:5])
+                    if handler:
+                        handler(rec, line[:-1])
+                    line = readline()
+                found = 1
+            else:
+                #
+                # Another organism: skip to the record terminator.
+                #
+                while line and line[0:2] != '//':
+                    line = readline()
+                found = 0
 
-            #
-            # Save an UniProt/SwissProt Keyword Name. If the input line looks like this:
-            #
-            # KW   Acetylation; Alternative initiation; Cytoplasm;
-            #
-            # We want to extract any keyword.
-            #
-            if self.line[0:5] == 'KW   ':
-                for s in re.split(';',self.line[5:]):
-                    s = str.replace(s.strip(), '.', '')
-                    if s.strip() != '':
-                        if not self.record.hasKWName(s.strip()):
-                            self.record.addKWName(s.strip())
+            self.line = line
 
-            #
-            # Save an InterPro ID. If the input line looks like this:
-            #
-            # DR   InterPro; IPR000308; 14-3-3.
-            #
-            # We want to extract the IPR000308. 
-            #
-            if self.line[0:14] == 'DR   InterPro;':
-                id = re.split(';', self.line[5:])[1].strip()
-                if not self.record.hasInterProID(id):
-                    self.record.addInterProID(id)
+            if not line:
+                return None
+
+            if found:
+                return rec.freeze()
+
+    #
+    # Purpose: Skip the records of other organisms than self.taxon in the
+    #          memory-mapped UniProt file.
+    # Returns: Nothing
+    # Assumes: mapFile() has been called
+    # Effects: Advances self.pos to the newline in front of the next record
+    #          for self.taxon (or to the end)
+    # Throws: Nothing
+    #
+    def skipMappedTaxa (self):
+
+        buffer = self.buffer
+        end = self.end
+        taxon = self.taxon.encode()
+
+        while 1:
+            start = max(self.pos, 0)
+            stop = buffer.find(b'\n//', start, end)
+            if stop < 0:
+                return
+
+            m = MAPPED_TAXON_PATTERN.search(buffer, start, stop)
+            if m and m.group(1) == taxon:
+                return
 
             #
-            # Read the next line from the UniProt file.
+            # self.pos -> the newline after "//"
             #
-            self.line = self.fp.readline()
+            self.pos = stop + 3
+
+    #
+    # Purpose: Memory-map the UniProt file (or use the given buffer) and
+    #          compile the pattern that finds the record terminators and
+    #          the lines that have an extractor.
+    # Returns: Nothing
+    # Assumes: self.fp is a regular file, or buffer is given
+    #          start is 0 or the first byte of a line
+    # Effects: Sets self.buffer, self.pos, self.end, self.linePattern
+    # Throws: Nothing
+    #
+    def mapFile (self, start=0, end=None, buffer=None):
+
+        if buffer is not None:
+            self.buffer = buffer
+        elif os.fstat(self.fp.fileno()).st_size == 0:
+            self.buffer = b''
+        else:
+            self.buffer = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.buffer.madvise(mmap.MADV_SEQUENTIAL)
 
         #
-        # If the record terminator was found, return the record object.
-        # Otherwise, EOF must have been reached, so return None.
+        # self.pos is the position of the newline in front of the next line
+        # to be searched; -1 means the start of the file.
         #
-        if self.line[0:2] == '//':
-            return self.record
-        else:
+        self.pos = start - 1
+        if end is None or end > len(self.buffer):
+            end = len(self.buffer)
+        self.end = end
+
+        #
+        # \n//
+        # \nID   ... | \nAC   ... | \nDE   ... | \nKW   ...
+        # \nDR   Ensembl; ... | \nDR   GeneID; ... | ...
+        #
+        # The leading newline (rather than "^") lets the regex engine skip
+        # quickly to the next line start.
+        #
+        tags = []
+        for t in self.tagHandlers:
+            if t != 'DR   ':
+                tags.append(re.escape(t.encode()))
+        lines = [b'//', b'(?:' + b'|'.join(tags) + b')[^\n]*']
+
+        dbs = []
+        for d in self.drHandlers:
+            dbs.append(re.escape(d.encode()))
+        if dbs:
+            lines.append(b'DR   (?:' + b'|'.join(dbs) + b');[^\n]*')
+
+        self.linePattern = re.compile(b'\n(' + b'|'.join(lines) + b')')
+
+    #
+    # Purpose: Parse the next record from the memory-mapped UniProt file.
+    # Returns: Next record object (frozen), or None at EOF
+    # Assumes: mapFile() has been called
+    # Effects: Advances self.pos to the end of the record terminator
+    # Throws: Nothing
+    #
+    def nextMappedRecord (self):
+
+        if self.taxon is not None:
+            self.skipMappedTaxa()
+
+        rec = UniProtRecord.Record()
+        self.record = rec
+
+        handlers = self.tagHandlers
+        search = self.linePattern.search
+        buffer = self.buffer
+        end = self.end
+        pos = self.pos
+
+        # first byte of the record
+        recordStart = pos + 1
+
+        #
+        # The first line of the file has no newline in front of it,
+        # so check it on its own.
+        #
+        if pos < 0:
+            pos = buffer.find(b'\n', 0, end)
+            if pos < 0:
+                pos = end
+            m = self.linePattern.match(b'\n' + buffer[0:pos])
+            if m:
+                line = m.group(1)
+                if line == b'//':
+                    self.pos = pos
+                    rec.setOffset(self.baseOffset, min(pos + 1, end))
+                    return rec.freeze()
+                line = line.decode()
+                handlers[line[0:5]](rec, line)
+
+        m = search(buffer, pos, end)
+        while m:
+            line = m.group(1)
+            if line == b'//':
+                self.pos = m.end()
+                rec.setOffset(self.baseOffset + recordStart,
+                              min(self.pos + 1, end) - recordStart)
+                return rec.freeze()
+            line = line.decode()
+            handlers[line[0:5]](rec, line)
+            m = search(buffer, m.end(), end)
+
+        #
+        # EOF was reached without a record terminator.
+        #
+        self.pos = end
+        return None
+
+    #
+    # Purpose: Read one entry of the UniProt file, using the accession index.
+    # Returns: The text of the entry (including the "//" line), or None if
+    #          the accession is not in the index
+    # Assumes: self.indexFile was written by writeIndex() for this file
+    #          self.fp is the plain UniProt file, or self.buffer is set
+    # Effects: Nothing
+    # Throws: OSError if the index cannot be read
+    #
+    def fetchText (self, accession):
+
+        location = lookupIndex(self.indexFile, accession)
+        if location is None:
+            return None
+
+        return self.readEntry(location).decode()
+
+    #
+    # Purpose: Read the bytes of one entry of the UniProt file.
+    # Returns: The entry (bytes)
+    # Assumes: See fetchText()
+    # Effects: Nothing
+    # Throws: OSError
+    #
+    def readEntry (self, location):
+
+        (offset, length) = location
+        if self.buffer is not None:
+            offset = offset - self.baseOffset
+            return self.buffer[offset:offset + length]
+
+        return os.pread(self.fp.fileno(), length, offset)
+
+    #
+    # Purpose: Read and parse one entry of the UniProt file, using the
+    #          accession index.  The accession may be primary or secondary.
+    # Returns: Record object (with the offset of the entry in the file), or
+    #          None if the accession is not in the index
+    # Assumes: See fetchText()
+    # Effects: Nothing
+    # Throws: OSError if the index cannot be read
+    #
+    def fetch (self, accession):
+
+        location = lookupIndex(self.indexFile, accession)
+        if location is None:
             return None
+
+        parser = Parser(None, buffer=self.readEntry(location),
+                        fields=self.fields, baseOffset=location[0])
+        return parser.nextRecord()
+
+    #
+    # Purpose: Release the memory map, if any.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Closes the memory map; does not close self.fp
+    # Throws: Nothing
+    #
+    def close (self):
+
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = None
+
+    #
+    # Purpose: Iterate over the records in the UniProt file.
+    # Returns: A generator of record objects
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def records (self):
+        rec = self.nextRecord()
+        while rec != None:
+            yield rec
+            rec = self.nextRecord()
+
+    #
+    # Extractors
+    #
+    # Purpose: Extract the attributes from one line of a UniProt record.
+    # Returns: Nothing
+    # Assumes: line does not include the trailing newline
+    # Effects: Adds the extracted attributes to the record object
+    # Throws: Nothing
+    #
+
+    #
+    # Determine if the UniProt ID is a TrEMBL ID or not
+    #
+    def parseID (self, rec, line):
+        if line.find('Unreviewed;') >= 0:
+            rec.isTrembl = 1
+
+    #
+    # Save the UniProt ID.
+    #
+    # AC   Q9CQV8; O70455; Q3TY33; Q3UAN6;
+    #
+    # The first accession of the record is the UniProt ID; the others
+    # are secondary accessions.
+    #
+    def parseAC (self, rec, line):
+        for id in line[5:].split(';'):
+            id = id.strip()
+            if id == '':
+                continue
+            if rec.getUniProtID() == '':
+                rec.setUniProtID(id)
+            elif id != rec.getUniProtID() and not rec.hasSecondaryID(id):
+                rec.addSecondaryID(id)
+
+    #
+    # Dispatch a cross-reference line on its database name:
+    #
+    # DR   Ensembl; ...
+    # DR   GeneID; ...
+    #
+    def parseDR (self, rec, line):
+        handler = self.drHandlers.get(line[5:line.find(';', 5)])
+        if handler:
+            handler(rec, line)
+
+    #
+    # Save an Ensembl ID. If the input line looks like this:
+    #
+    # DR   Ensembl; ID1; ID2; ID3; Mus musculus.
+    # DR   Ensembl; ID1; ID2; ID3; Mus musculus. [xxxxx]
+    #
+    # need to split by ";" and "."
+    #
+    # We want to extract any IDs that begin with 'ENSMUSG'. Do not
+    # add an ID that has already been added.
+    #
+    def parseEnsembl (self, rec, line):
+        for t1 in line[13:].split(';'):
+            if t1.strip()[0:7] == 'ENSMUSG':
+                for t2 in t1.split('.'):
+                    t2 = t2.strip()
+                    if t2[0:7] == 'ENSMUSG':
+                        if not rec.hasEnsemblID(t2):
+                            rec.addEnsemblID(t2)
+
+    #
+    # Save an EntrezGene ID. If the input line looks like this:
+    #
+    # DR   GeneID; 12345; -.
+    #
+    # We want to extract the 12345. Do not add an ID that has already
+    # been added.
+    #
+    def parseEntrezGene (self, rec, line):
+        id = line.split(';', 2)[1].strip()
+        if not rec.hasEntrezGeneID(id):
+            rec.addEntrezGeneID(id)
+
+    #
+    # Save an EMBL ID. If the input line looks like this:
+    #
+    # DR   EMBL; 12345; -.
+    #
+    # We want to extract the 12345. Do not add an ID that has already
+    # been added.
+    #
+    def parseEMBL (self, rec, line):
+        if line.find('mRNA') >= 0:
+            id = line.split(';', 2)[1].strip()
+            if not rec.hasEMBLID(id):
+                rec.addEMBLID(id)
+
+    #
+    # Save an PDB ID. If the input line looks like this:
+    #
+    # DR   PDB; 2PF4; X-ray; 3.10 A; A/B/C/D=1-589.
+    #
+    # We want to extract the 2PF4.
+    #
+    def parsePDB (self, rec, line):
+        id = line.split(';', 2)[1].strip()
+        if not rec.hasPDBID(id):
+            rec.addPDBID(id)
+
+    #
+    # Save an InterPro ID. If the input line looks like this:
+    #
+    # DR   InterPro; IPR000308; 14-3-3.
+    #
+    # We want to extract the IPR000308.
+    #
+    def parseInterPro (self, rec, line):
+        id = line.split(';', 2)[1].strip()
+        if not rec.hasInterProID(id):
+            rec.addInterProID(id)
+
+    #
+    # Save an MGI ID. If the input line looks like this:
+    #
+    # DR   MGI; MGI:98834; Trp53.
+    #
+    # We want to extract the MGI:98834.
+    #
+    def parseMGI (self, rec, line):
+        id = line.split(';', 2)[1].strip()
+        if not rec.hasMGIID(id):
+            rec.addMGIID(id)
+
+    #
+    # Save an EC ID. If the input line looks like this:
+    #
+    # DE            EC=1.1.1.284;
+    # DE            EC=2.7.11.21 {....};
+    # note : the EC does not always appear at the same line number
+    #
+    # We want to extract the 2.3.1.41
+    #
+    # TR11817 : added "{...}" handling
+    #
+    def parseDE (self, rec, line):
+        if line.find('EC=') >= 0:
+            id = line.split('=', 2)[1].strip()
+            id = id.split(' {', 1)[0]
+            id = id.strip().replace(';', '')
+            if not rec.hasECID(id):
+                rec.addECID(id)
+
+    #
+    # Save an UniProt/SwissProt Keyword Name. If the input line looks like this:
+    #
+    # KW   Acetylation; Alternative initiation; Cytoplasm;
+    #
+    # We want to extract any keyword.
+    #
+    def parseKW (self, rec, line):
+        for s in line[5:].split(';'):
+            s = s.strip().replace('.', '').strip()
+            if s != '':
+                if not rec.hasKWName(s):
+                    rec.addKWName(s)
+
+    #
+    # Save the sequence length and checksum. If the input line looks like this:
+    #
+    # SQ   SEQUENCE   871 AA;  99459 MW;  D1F1A8D8B4A1E8F3 CRC64;
+    #
+    # We want to extract the 871 and the D1F1A8D8B4A1E8F3
+    #
+    def parseSQ (self, rec, line):
+        for s in line[5:].split(';'):
+            s = s.split()
+            if len(s) == 2 and s[1] == 'CRC64':
+                rec.setCRC64(s[0])
+            elif len(s) == 3 and s[0] == 'SEQUENCE' and s[2] == 'AA':
+                rec.setSequenceLength(int(s[1]))
+
+    #
+    # Save the NCBI taxonomy ID. If the input line looks like this:
+    #
+    # OX   NCBI_TaxID=10090 {ECO:0000313|EMBL:BAE27360.1};
+    #
+    # We want to extract the 10090
+    #
+    def parseOX (self, rec, line):
+        m = TAXON_PATTERN.match(line)
+        if m:
+            rec.setTaxonID(m.group(1))
+
+    #
+    # Save the gene names. If the input lines look like this:
+    #
+    # GN   Name=Trp53 {ECO:0000312|MGI:MGI:98834}; Synonyms=p53, Tp53;
+    # GN   and
+    # GN   Name=Gm4951;
+    #
+    # We want to extract the Trp53 and the Gm4951
+    #
+    def parseGN (self, rec, line):
+        for s in line[5:].split(';'):
+            s = s.strip()
+            if s[0:5] == 'Name=':
+                id = s[5:].split(' {', 1)[0].strip()
+                if id != '' and not rec.hasGeneName(id):
+                    rec.addGeneName(id)
+
+#
+# Purpose: Split a UniProt file (from byte 'start', a record boundary, to
+#          the end) into byte ranges that begin and end on record
+#          boundaries.
+# Returns: List of (start, end) byte offsets, in file order
+# Assumes: fp is a regular file
+# Effects: Nothing
+# Throws: Nothing
+#
+def splitFile (fp, count, start=0):
+
+    size = os.fstat(fp.fileno()).st_size
+    if size <= start:
+        return []
+
+    buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    ranges = []
+    first = start
+    for i in range(1, count):
+        #
+        # The range ends after the first record terminator ("//") that
+        # follows its nominal end.
+        #
+        nominal = first + (size - first) * i // count
+        if nominal <= start:
+            continue
+        end = buffer.find(b'\n//\n', nominal - 1)
+        if end < 0:
+            break
+        end = end + 4
+        ranges.append((start, end))
+        start = end
+        if start >= size:
+            break
+
+    if start < size:
+        ranges.append((start, size))
+
+    buffer.close()
+
+    return ranges
+
+
+#
+# The accession index has one line per primary/secondary accession:
+#
+#   accession<tab>P|S<tab>offset<tab>length
+#
+# sorted, so that a primary accession comes before the same accession
+# used as a secondary accession, and so that lookupIndex() can find an
+# accession by binary search without reading the whole index.
+#
+
+#
+# Purpose: Write the accession index for the records of a UniProt file.
+# Returns: Nothing
+# Assumes: entries is a list of index lines (see indexEntries())
+# Effects: Writes indexFile (via a temporary file, then renamed)
+# Throws: OSError
+#
+def writeIndex (entries, indexFile):
+
+    entries.sort()
+
+    fp = open(indexFile + '.tmp', 'w')
+    fp.writelines(entries)
+    fp.close()
+
+    os.replace(indexFile + '.tmp', indexFile)
+
+
+#
+# Purpose: Get the accession index lines for one record.
+# Returns: List of index lines (empty if the record has no offset)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def indexEntries (rec):
+
+    offset = rec.getOffset()
+    if offset is None:
+        return []
+
+    location = '\t%d\t%d\n' % (offset, rec.getLength())
+
+    entries = [rec.getUniProtID() + '\tP' + location]
+    for id in rec.getSecondaryID():
+        entries.append(id + '\tS' + location)
+
+    return entries
+
+
+#
+# Purpose: Find an accession in the accession index.
+# Returns: (offset, length), or None if the accession is not in the index
+# Assumes: indexFile was written by writeIndex()
+# Effects: Nothing
+# Throws: OSError
+#
+def lookupIndex (indexFile, accession):
+
+    fp = open(indexFile, 'rb')
+    if os.fstat(fp.fileno()).st_size == 0:
+        fp.close()
+        return None
+    buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    key = accession.encode() + b'\t'
+
+    #
+    # Binary search for the first line >= key; lo and hi are line starts.
+    #
+    lo = 0
+    hi = len(buffer)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        lineStart = buffer.rfind(b'\n', 0, mid) + 1
+        lineEnd = buffer.find(b'\n', lineStart)
+        if lineEnd < 0:
+            lineEnd = len(buffer)
+        if buffer[lineStart:lineEnd] < key:
+            lo = lineEnd + 1
+        else:
+            hi = lineStart
+
+    location = None
+    lineEnd = buffer.find(b'\n', lo)
+    if lineEnd < 0:
+        lineEnd = len(buffer)
+    line = buffer[lo:lineEnd]
+    if line.startswith(key):
+        tokens = line.split(b'\t')
+        location = (int(tokens[2]), int(tokens[3]))
+
+    buffer.close()
+    fp.close()
+
+    return location
+
+
+#
+# CLASS: LineCounter
+# IS: A wrapper of a text file object.
+# HAS: The file object and the number of lines read
+# DOES: Counts the lines read by readline(); everything else is passed to
+#       the file object.
+#
+class LineCounter:
+
+    def __init__ (self, fp):
+        self.fp = fp
+        self.lines = 0
+
+    def readline (self):
+        self.lines = self.lines + 1
+        return self.fp.readline()
+
+    def __getattr__ (self, name):
+        return getattr(self.fp, name)
+
+
+#
+# CLASS: ParserStats
+# IS: Instrumentation of the UniProt parser.
+# HAS: The number of extracted lines per line code (the lines that have an
+#      extractor; the same in every parsing mode), the calls and time per
+#      extractor, the number of records and the total parse time, and the
+#      largest and the slowest entries.
+# DOES: Wraps extractors to collect the statistics, merges the statistics
+#       of several parsers (e.g. parser processes) and formats a summary.
+#
+class ParserStats:
+
+    #
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self, top=10):
+
+        self.top = top
+        self.tagLines = {}
+        self.calls = {}
+        self.times = {}
+        self.records = 0
+        self.seconds = 0.0
+
+        # heaps of (lines, UniProt ID) and (seconds, UniProt ID)
+        self.largest = []
+        self.slowest = []
+
+    #
+    # Purpose: Wrap an extractor to count its lines and time its calls.
+    # Returns: The wrapped extractor
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def wrap (self, tag, handler):
+
+        name = handler.__name__
+        self.calls.setdefault(name, 0)
+        self.times.setdefault(name, 0.0)
+        if tag:
+            self.tagLines.setdefault(tag, 0)
+
+        calls = self.calls
+        times = self.times
+        tagLines = self.tagLines
+        clock = time.perf_counter
+
+        def timed (rec, line):
+            start = clock()
+            handler(rec, line)
+            times[name] += clock() - start
+            calls[name] += 1
+            if tag:
+                tagLines[tag] += 1
+
+        timed.__name__ = name
+        return timed
+
+    #
+    # Purpose: Add one parsed record.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def addRecord (self, uniprotID, lines, seconds):
+
+        self.records = self.records + 1
+        self.seconds = self.seconds + seconds
+
+        for (heap, item) in ((self.largest, (lines, uniprotID)),
+                             (self.slowest, (seconds, uniprotID))):
+            if len(heap) < self.top:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    #
+    # Purpose: Add parse time that does not belong to a record (EOF).
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def addTime (self, seconds):
+        self.seconds = self.seconds + seconds
+
+    #
+    # Purpose: Add the statistics of another parser.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def merge (self, other):
+
+        for (mine, theirs) in ((self.tagLines, other.tagLines),
+                               (self.calls, other.calls),
+                               (self.times, other.times)):
+            for key in theirs:
+                mine[key] = mine.get(key, 0) + theirs[key]
+
+        self.records = self.records + other.records
+        self.seconds = self.seconds + other.seconds
+
+        self.largest = heapq.nlargest(self.top, self.largest + other.largest)
+        heapq.heapify(self.largest)
+        self.slowest = heapq.nlargest(self.top, self.slowest + other.slowest)
+        heapq.heapify(self.slowest)
+
+    #
+    # Purpose: Format the statistics.
+    # Returns: The summary (string)
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def summary (self):
+
+        lines = []
+        lines.append('UniProt parser statistics')
+        lines.append('records: %d  parse seconds: %.2f  records/sec: %.0f' %
+                     (self.records, self.seconds,
+                      self.records / max(self.seconds, 1e-9)))
+
+        lines.append('')
+        lines.append('extracted lines per line code:')
+        for tag in sorted(self.tagLines):
+            lines.append('  %-10s %12d' % (tag, self.tagLines[tag]))
+
+        #
+        # parseDR includes the time of the DR extractors it calls.
+        #
+        lines.append('')
+        lines.append('%-20s %12s %10s %10s' % ('extractor', 'calls', 'seconds', 'usec/call'))
+        extracted = 0.0
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            calls = self.calls[name]
+            lines.append('  %-18s %12d %10.3f %10.2f' % (name, calls, self.times[name],
+                         self.times[name] * 1e6 / max(calls, 1)))
+            if name != 'parseDR':
+                extracted = extracted + self.times[name]
+        lines.append('  %-18s %12s %10.3f' % ('(reading/scanning)', '',
+                     max(self.seconds - extracted, 0.0)))
+
+        lines.append('')
+        lines.append('largest entries (lines):')
+        for (count, uniprotID) in sorted(self.largest, reverse=True):
+            lines.append('  %-10s %12d' % (uniprotID, count))
+
+        lines.append('')
+        lines.append('slowest entries (msec):')
+        for (seconds, uniprotID) in sorted(self.slowest, reverse=True):
+            lines.append('  %-10s %12.3f' % (uniprotID, seconds * 1000))
+
+        return '\n'.join(lines)
+
@@ -0,0 +1,530 @@
+import os
+import io
+import sys
+import stat
+import bisect
+import gzip
+import zlib
+import struct
+import threading
+import queue
+
+#
+# Input readers for the UniProt parser.
+#
+# openInput() returns a text file object for the UniProt input file.  A
+# gzip-compressed file (*.gz) is decompressed on a background thread that
+# feeds the parser through a bounded queue of blocks, so decompression and
+# parsing overlap.  With readAhead, a plain file is read the same way, so
+# that reading (e.g. from network storage) and parsing overlap.  The
+# kernel is told that the file is read sequentially, where supported.
+#
+# openStream() reads the UniProt input from stdin ("-") or a named pipe as
+# it arrives (e.g. while it is being downloaded), plain or gzip-compressed.
+#
+# A gzip file that is made of several gzip members (e.g. written by bgzip
+# or "pigz --independent") can also be read in parallel: gzipIndex() lists
+# the compressed/uncompressed offset of each member, and readGzipRange()
+# decompresses a range of members and returns the part of it that holds
+# whole UniProt records, ready for UniProtParser.Parser(buffer=...).
+#
+
+# size of the blocks read by the background thread
+BLOCK_SIZE = 1024 * 1024
+
+# number of blocks that may be waiting in the queue
+QUEUE_DEPTH = 8
+
+#
+# CLASS: QueueReader
+# IS: A raw, read-only binary stream.
+# HAS: A source stream, a bounded queue of blocks and the background thread
+#      that fills the queue from the source stream.
+# DOES: Reads blocks from the source stream ahead of the consumer.
+#
+class QueueReader(io.RawIOBase):
+
+    #
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: source is a binary stream with a read() method
+    #          prefix holds bytes already read from source, if any
+    # Effects: Starts the background thread
+    # Throws: Nothing
+    #
+    def __init__ (self, source, blockSize=BLOCK_SIZE, depth=QUEUE_DEPTH,
+                  prefix=b''):
+
+        io.RawIOBase.__init__(self)
+
+        self.source = source
+        self.blockSize = blockSize
+        self.queue = queue.Queue(depth)
+        self.block = prefix
+        self.offset = 0
+        self.error = None
+        self.done = 0
+        self.stopped = 0
+
+        self.thread = threading.Thread(target=self.fill)
+        self.thread.daemon = True
+        self.thread.start()
+
+    #
+    # Purpose: Background thread; read blocks from the source stream into
+    #          the queue until EOF.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: An empty block marks EOF; a read error is saved in self.error
+    #          and re-raised to the consumer.
+    # Throws: Nothing
+    #
+    def fill (self):
+
+        try:
+            while not self.stopped:
+                block = self.source.read(self.blockSize)
+                self.queue.put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self.error = e
+            self.queue.put(b'')
+
+    def readable (self):
+        return True
+
+    #
+    # Purpose: Copy the next bytes from the queued blocks into b.
+    # Returns: Number of bytes copied (0 at EOF)
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: The exception raised by the source stream, if any
+    #
+    def readinto (self, b):
+
+        if self.offset >= len(self.block):
+            if self.done:
+                return 0
+            self.block = self.queue.get()
+            self.offset = 0
+            if not self.block:
+                self.done = 1
+                if self.error:
+                    raise self.error
+                return 0
+
+        n = min(len(b), len(self.block) - self.offset)
+        b[0:n] = self.block[self.offset:self.offset + n]
+        self.offset = self.offset + n
+
+        return n
+
+    #
+    # Purpose: Stop the background thread and close the source stream.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def close (self):
+
+        if not self.closed:
+            self.stopped = 1
+            #
+            # Unblock the thread if it is waiting on a full queue.
+            #
+            while self.thread.is_alive():
+                try:
+                    self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.source.close()
+        io.RawIOBase.close(self)
+
+
+#
+# Purpose: Is the file gzip-compressed?
+# Returns: 1 if the file starts with the gzip magic number, else 0
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: OSError if the file cannot be read
+#
+def isGzip (path):
+
+    fp = open(path, 'rb')
+    magic = fp.read(2)
+    fp.close()
+
+    if magic == b'\x1f\x8b':
+        return 1
+    else:
+        return 0
+
+
+#
+# Purpose: Tell the kernel that a file will be read sequentially (larger
+#          read-ahead), where supported.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def adviseSequential (fp):
+
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fp.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+#
+# Purpose: Open the UniProt input file for reading as text.
+# Returns: A text file object
+# Assumes: Nothing
+# Effects: For a gzip-compressed file, or a plain file if readAhead is set,
+#          starts a background thread that reads (and decompresses) the
+#          file ahead of the reader.
+# Throws: OSError if the file cannot be opened
+#
+def openInput (path, readAhead=0):
+
+    if not isGzip(path):
+        if not readAhead:
+            fp = open(path, 'r')
+            adviseSequential(fp)
+            return fp
+        source = open(path, 'rb', buffering=0)
+        adviseSequential(source)
+    else:
+        source = gzip.open(path, 'rb')
+        adviseSequential(source)
+
+    raw = QueueReader(source)
+    return io.TextIOWrapper(io.BufferedReader(raw, BLOCK_SIZE))
+
+
+#
+# Purpose: Is the UniProt input a stream (stdin or a named pipe) rather
+#          than a regular file?
+# Returns: 1 if path is "-" or a named pipe, else 0
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def isStream (path):
+
+    if path == '-':
+        return 1
+
+    try:
+        if stat.S_ISFIFO(os.stat(path).st_mode):
+            return 1
+    except OSError:
+        pass
+
+    return 0
+
+
+#
+# Purpose: Open the UniProt input stream (stdin or a named pipe) for
+#          reading as text.
+# Returns: A text file object
+# Assumes: Nothing
+# Effects: Starts a background thread that reads the stream ahead of the
+#          reader and, for a gzip-compressed stream, a second background
+#          thread that decompresses it.
+# Throws: OSError if the named pipe cannot be opened
+#
+def openStream (path):
+
+    if path == '-':
+        source = sys.stdin.buffer
+    else:
+        source = open(path, 'rb')
+
+    #
+    # The stream cannot be reopened, so the bytes read to check for the
+    # gzip magic number are handed back to the reader.
+    #
+    magic = source.read(2)
+    raw = QueueReader(source, prefix=magic)
+
+    if magic == b'\x1f\x8b':
+        compressed = gzip.GzipFile(fileobj=io.BufferedReader(raw, BLOCK_SIZE), mode='rb')
+        raw = QueueReader(compressed)
+
+    return io.TextIOWrapper(io.BufferedReader(raw, BLOCK_SIZE))
+
+
+#
+# Purpose: List the gzip members of a compressed file.
+# Returns: List of (compressed offset, uncompressed offset) of each member,
+#          in file order, or None if the file would have to be scanned and
+#          scan is 0
+# Assumes: path is a gzip-compressed file
+# Effects: If indexFile is given and is older than the compressed file (or
+#          does not exist), the index is built and saved to indexFile.
+# Throws: OSError, zlib.error
+#
+def gzipIndex (path, indexFile=None, scan=1):
+
+    if indexFile and os.path.exists(indexFile) \
+            and os.path.getmtime(indexFile) >= os.path.getmtime(path):
+        return readGzipIndex(indexFile)
+
+    index = bgzfIndex(path)
+
+    if index is None and scan:
+        index = scanGzip(path)
+
+    if index is not None and indexFile:
+        writeGzipIndex(index, indexFile)
+
+    return index
+
+
+#
+# Purpose: Read/write a gzip member index file.
+#          Each line is: compressed offset<tab>uncompressed offset
+# Returns: readGzipIndex: the index
+# Assumes: Nothing
+# Effects: writeGzipIndex: writes indexFile
+# Throws: OSError
+#
+def readGzipIndex (indexFile):
+
+    index = []
+    fp = open(indexFile, 'r')
+    for line in fp:
+        tokens = line[:-1].split('\t')
+        index.append((int(tokens[0]), int(tokens[1])))
+    fp.close()
+
+    return index
+
+def writeGzipIndex (index, indexFile):
+
+    fp = open(indexFile + '.tmp', 'w')
+    for (coffset, uoffset) in index:
+        fp.write('%d\t%d\n' % (coffset, uoffset))
+    fp.close()
+    os.replace(indexFile + '.tmp', indexFile)
+
+
+#
+# Purpose: List the members of any gzip file by decompressing it once.
+# Returns: List of (compressed offset, uncompressed offset)
+# Assumes: path is a gzip-compressed file
+# Effects: Nothing
+# Throws: OSError, zlib.error
+#
+def scanGzip (path):
+
+    index = []
+    fp = open(path, 'rb')
+
+    # compressed offset of the current member
+    mstart = 0
+
+    # compressed bytes given to the current member's decompressor
+    fed = 0
+
+    # uncompressed offset
+    uoffset = 0
+
+    d = None
+    data = fp.read(BLOCK_SIZE)
+    while data:
+        if d is None:
+            d = zlib.decompressobj(31)
+            index.append((mstart, uoffset))
+            fed = 0
+        fed = fed + len(data)
+        uoffset = uoffset + len(d.decompress(data))
+        data = b''
+
+        #
+        # End of this member; anything left over starts the next one.
+        #
+        if d.eof:
+            data = d.unused_data
+            mstart = mstart + fed - len(data)
+            d = None
+
+        if not data:
+            data = fp.read(BLOCK_SIZE)
+
+    fp.close()
+
+    return index
+
+
+#
+# Purpose: List the members of a BGZF file (blocked gzip, as written by
+#          bgzip) from the member headers alone, without decompressing.
+# Returns: List of (compressed offset, uncompressed offset), or None if
+#          the file is not BGZF
+# Assumes: path is a gzip-compressed file
+# Effects: Nothing
+# Throws: OSError
+#
+def bgzfIndex (path):
+
+    index = []
+    size = os.path.getsize(path)
+    fp = open(path, 'rb')
+
+    coffset = 0
+    uoffset = 0
+    while coffset < size:
+        fp.seek(coffset)
+        header = fp.read(18)
+
+        #
+        # gzip magic, deflate, FEXTRA set, 6 byte "BC" extra subfield
+        #
+        if len(header) < 18 or header[0:4] != b'\x1f\x8b\x08\x04' \
+                or header[12:14] != b'BC' or header[10:12] != b'\x06\x00':
+            fp.close()
+            return None
+
+        blockSize = struct.unpack('<H', header[16:18])[0] + 1
+
+        fp.seek(coffset + blockSize - 4)
+        isize = struct.unpack('<I', fp.read(4))[0]
+
+        if isize > 0:
+            index.append((coffset, uoffset))
+
+        coffset = coffset + blockSize
+        uoffset = uoffset + isize
+
+    fp.close()
+
+    return index
+
+
+#
+# Purpose: Decompress one gzip member.
+# Returns: The decompressed bytes
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: zlib.error
+#
+def readGzipMember (fp, index, i):
+
+    fp.seek(index[i][0])
+    if i + 1 < len(index):
+        data = fp.read(index[i + 1][0] - index[i][0])
+    else:
+        data = fp.read()
+
+    return zlib.decompressobj(31).decompress(data)
+
+
+#
+# Purpose: Decompress the gzip members [i, j) of a compressed UniProt file
+#          and find the records that start in them.
+# Returns: (buffer, start, end) where buffer[start:end] holds every record
+#          whose ID line starts in members [i, j), including the end of
+#          the last record if it continues into later members
+# Assumes: index is from gzipIndex(path)
+# Effects: Nothing
+# Throws: OSError, zlib.error
+#
+def readGzipRange (path, index, i, j):
+
+    fp = open(path, 'rb')
+
+    blocks = []
+    for k in range(i, j):
+        blocks.append(readGzipMember(fp, index, k))
+    buffer = b''.join(blocks)
+    owned = len(buffer)
+
+    #
+    # The first record that starts in this range.
+    #
+    if i == 0:
+        start = 0
+    elif buffer[0:5] == b'ID   ' and readGzipMember(fp, index, i - 1)[-1:] == b'\n':
+        start = 0
+    else:
+        start = buffer.find(b'\nID   ') + 1
+        if start == 0 or start >= owned:
+            fp.close()
+            return (b'', 0, 0)
+
+    #
+    # Read ahead until the last record that starts in this range is
+    # terminated ("//").
+    #
+    k = j
+    end = buffer.find(b'\n//\n', max(owned - 4, 0))
+    while end < 0 and k < len(index):
+        buffer = buffer + readGzipMember(fp, index, k)
+        k = k + 1
+        end = buffer.find(b'\n//\n', max(owned - 4, 0))
+
+    if end < 0:
+        end = len(buffer)
+    else:
+        end = end + 4
+
+    fp.close()
+
+    return (buffer, start, end)
+
+
+#
+# Purpose: Read bytes at an uncompressed offset of a compressed file.
+# Returns: The uncompressed bytes [offset, offset + length)
+# Assumes: index is from gzipIndex(path)
+# Effects: Nothing
+# Throws: OSError, zlib.error
+#
+def readGzipBytes (path, index, offset, length):
+
+    #
+    # The last member that starts at or before offset.
+    #
+    i = bisect.bisect_right([u for (c, u) in index], offset) - 1
+
+    fp = open(path, 'rb')
+
+    blocks = []
+    size = 0
+    start = offset - index[i][1]
+    while i < len(index) and size < start + length:
+        block = readGzipMember(fp, index, i)
+        blocks.append(block)
+        size = size + len(block)
+        i = i + 1
+
+    fp.close()
+
+    return b''.join(blocks)[start:start + length]
+
+
+#
+# Purpose: Split the members of a compressed UniProt file into ranges.
+# Returns: List of (i, j) member ranges, in file order
+# Assumes: index is from gzipIndex(path)
+# Effects: Nothing
+# Throws: Nothing
+#
+def splitGzip (index, count):
+
+    ranges = []
+    n = len(index)
+    count = min(count, n)
+
+    for r in range(count):
+        i = n * r // count
+        j = n * (r + 1) // count
+        if i < j:
+            ranges.append((i, j))
+
+    return ranges
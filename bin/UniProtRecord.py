@@ -1,4 +1,5 @@
 import os
+import hashlib
 
 #
 # 06/04/2012    lec
@@ -8,14 +9,27 @@ import os
 #       - TR11071/add 'uniprotName' parsing
 #
 
+# content hash version (change it when contentHash() changes, so that the
+# hashes of different versions never match)
+HASH_VERSION = 2
+
 #
 # CLASS: UniProtRecord
 # IS: An object that holds specific attributes from a UniProt record.
 # HAS: UniProt record attributes
+#      While a record is being parsed, each list of IDs is kept in an
+#      insertion-ordered dictionary (used as an ordered set) so that
+#      duplicate checks do not depend on the number of IDs; freeze()
+#      turns them into tuples.
 # DOES: Nothing
 #
 class Record:
 
+    __slots__ = ('uniprotID', 'isTrembl', 'ensemblID', 'entrezgeneID',
+                 'emblID', 'pdbID', 'ecID', 'kwName', 'interproID',
+                 'secondaryID', 'offset', 'length', 'crc64',
+                 'sequenceLength', 'taxonID', 'geneName', 'mgiID')
+
     #
     # Purpose: Constructor
     # Returns: Nothing
@@ -37,13 +51,70 @@ class Record:
     def clear (self):
         self.uniprotID = ''
         self.isTrembl = 0
-        self.ensemblID = []
-        self.entrezgeneID = []
-        self.emblID = []
-        self.pdbID = []
-        self.ecID = []
-        self.kwName = []
-        self.interproID = []
+        self.ensemblID = {}
+        self.entrezgeneID = {}
+        self.emblID = {}
+        self.pdbID = {}
+        self.ecID = {}
+        self.kwName = {}
+        self.interproID = {}
+        self.secondaryID = {}
+        self.offset = None
+        self.length = None
+        self.crc64 = ''
+        self.sequenceLength = 0
+        self.taxonID = ''
+        self.geneName = {}
+        self.mgiID = {}
+
+
+    #
+    # Purpose: Make the record read-only once parsing is complete.
+    # Returns: The record object
+    # Assumes: No more IDs will be added to the record
+    # Effects: Converts each set of IDs to a tuple so the record can be
+    #          buffered, queued or handed to another thread/process without
+    #          being changed by the parser.
+    # Throws: Nothing
+    #
+    def freeze (self):
+        self.ensemblID = tuple(self.ensemblID)
+        self.entrezgeneID = tuple(self.entrezgeneID)
+        self.emblID = tuple(self.emblID)
+        self.pdbID = tuple(self.pdbID)
+        self.ecID = tuple(self.ecID)
+        self.kwName = tuple(self.kwName)
+        self.interproID = tuple(self.interproID)
+        self.secondaryID = tuple(self.secondaryID)
+        self.geneName = tuple(self.geneName)
+        self.mgiID = tuple(self.mgiID)
+        return self
+
+
+    #
+    # Purpose: Compact pickling support (records are passed between
+    #          processes and cached).
+    # Returns: The attributes as one tuple (__getstate__)
+    # Assumes: Nothing
+    # Effects: Restores the attributes from the tuple (__setstate__)
+    # Throws: Nothing
+    #
+    def __getstate__ (self):
+        return (self.uniprotID, self.isTrembl, tuple(self.ensemblID),
+                tuple(self.entrezgeneID), tuple(self.emblID),
+                tuple(self.pdbID), tuple(self.ecID), tuple(self.kwName),
+                tuple(self.interproID), tuple(self.secondaryID),
+                self.offset, self.length, self.crc64,
+                self.sequenceLength, self.taxonID, tuple(self.geneName),
+                tuple(self.mgiID))
+
+    def __setstate__ (self, state):
+        (self.uniprotID, self.isTrembl, self.ensemblID,
+         self.entrezgeneID, self.emblID, self.pdbID, self.ecID,
+         self.kwName, self.interproID, self.secondaryID,
+         self.offset, self.length, self.crc64,
+         self.sequenceLength, self.taxonID, self.geneName,
+         self.mgiID) = state
 
 
     #
@@ -59,18 +130,95 @@ class Record:
     def getIsTrembl (self):
         return self.isTrembl
 
+    #
+    # Secondary UniProt accession ids (AC line, after the first)
+    #
+
+    def addSecondaryID (self, secondaryID):
+        self.secondaryID[secondaryID] = None
+
+    def getSecondaryID (self):
+        return tuple(self.secondaryID)
+
+    def hasSecondaryID (self, id):
+        if id in self.secondaryID:
+            return 1
+        else:
+            return 0
+
+    #
+    # Byte offset and length of the entry in the UniProt file
+    # (None if the file was not memory-mapped)
+    #
+
+    def setOffset (self, offset, length):
+        self.offset = offset
+        self.length = length
+
+    def getOffset (self):
+        return self.offset
+
+    def getLength (self):
+        return self.length
+
+    #
+    # Sequence checksum (SQ line)
+    #
+
+    def setCRC64 (self, crc64):
+        self.crc64 = crc64
+
+    def getCRC64 (self):
+        return self.crc64
+
+    #
+    # Sequence length (SQ line)
+    #
+
+    def setSequenceLength (self, sequenceLength):
+        self.sequenceLength = sequenceLength
+
+    def getSequenceLength (self):
+        return self.sequenceLength
+
+    #
+    # NCBI taxonomy ID (OX line)
+    #
+
+    def setTaxonID (self, taxonID):
+        self.taxonID = taxonID
+
+    def getTaxonID (self):
+        return self.taxonID
+
+    #
+    # Gene names (GN line)
+    #
+
+    def addGeneName (self, geneName):
+        self.geneName[geneName] = None
+
+    def getGeneName (self):
+        return tuple(self.geneName)
+
+    def hasGeneName (self, id):
+        if id in self.geneName:
+            return 1
+        else:
+            return 0
+
     #
     # Ensembl ids
     #
 
     def addEnsemblID (self, ensemblID):
-        self.ensemblID.append(ensemblID)
+        self.ensemblID[ensemblID] = None
 
     def getEnsemblID (self):
-        return self.ensemblID
+        return tuple(self.ensemblID)
 
     def hasEnsemblID (self, id):
-        if self.ensemblID.count(id) > 0:
+        if id in self.ensemblID:
             return 1
         else:
             return 0
@@ -80,13 +228,13 @@ class Record:
     #
 
     def addEntrezGeneID (self, entrezgeneID):
-        self.entrezgeneID.append(entrezgeneID)
+        self.entrezgeneID[entrezgeneID] = None
 
     def getEntrezGeneID (self):
-        return self.entrezgeneID
+        return tuple(self.entrezgeneID)
 
     def hasEntrezGeneID (self, id):
-        if self.entrezgeneID.count(id) > 0:
+        if id in self.entrezgeneID:
             return 1
         else:
             return 0
@@ -96,13 +244,13 @@ class Record:
     #
 
     def addEMBLID (self, emblID):
-        self.emblID.append(emblID)
+        self.emblID[emblID] = None
 
     def getEMBLID (self):
-        return self.emblID
+        return tuple(self.emblID)
 
     def hasEMBLID (self, id):
-        if self.emblID.count(id) > 0:
+        if id in self.emblID:
             return 1
         else:
             return 0
@@ -112,13 +260,13 @@ class Record:
     #
 
     def addPDBID (self, pdbID):
-        self.pdbID.append(pdbID)
+        self.pdbID[pdbID] = None
 
     def getPDBID (self):
-        return self.pdbID
+        return tuple(self.pdbID)
 
     def hasPDBID (self, id):
-        if self.pdbID.count(id) > 0:
+        if id in self.pdbID:
             return 1
         else:
             return 0
@@ -128,13 +276,13 @@ class Record:
     #
 
     def addECID (self, ecID):
-        self.ecID.append(ecID)
+        self.ecID[ecID] = None
 
     def getECID (self):
-        return self.ecID
+        return tuple(self.ecID)
 
     def hasECID (self, id):
-        if self.ecID.count(id) > 0:
+        if id in self.ecID:
             return 1
         else:
             return 0
@@ -144,13 +292,13 @@ class Record:
     #
 
     def addKWName (self, kwName):
-        self.kwName.append(kwName)
+        self.kwName[kwName] = None
 
     def getKWName (self):
-        return self.kwName
+        return tuple(self.kwName)
 
     def hasKWName (self, id):
-        if self.kwName.count(id) > 0:
+        if id in self.kwName:
             return 1
         else:
             return 0
@@ -160,17 +308,73 @@ class Record:
     #
 
     def addInterProID (self, interproID):
-        self.interproID.append(interproID)
+        self.interproID[interproID] = None
 
     def getInterProID (self):
-        return self.interproID
+        return tuple(self.interproID)
 
     def hasInterProID (self, id):
-        if self.interproID.count(id) > 0:
+        if id in self.interproID:
+            return 1
+        else:
+            return 0
+
+    #
+    # MGI ids (DR MGI cross-references)
+    #
+
+    def addMGIID (self, mgiID):
+        self.mgiID[mgiID] = None
+
+    def getMGIID (self):
+        return tuple(self.mgiID)
+
+    def hasMGIID (self, id):
+        if id in self.mgiID:
+            return 1
+        else:
+            return 0
+
+    #
+    # Purpose: Is the protein part of the UniProt reference proteome?
+    # Returns: 1 if the record has the "Reference proteome" key word, else 0
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def isReferenceProteome (self):
+        if 'Reference proteome' in self.kwName:
             return 1
         else:
             return 0
 
+    #
+    # Purpose: Hash the content of the record that the load writes, to find
+    #          the records that changed since the previous UniProt release.
+    # Returns: The hash (hex string)
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def contentHash (self):
+        content = '\t'.join((str(HASH_VERSION),
+                             self.uniprotID,
+                             str(self.isTrembl),
+                             ','.join(self.secondaryID),
+                             ','.join(self.ensemblID),
+                             ','.join(self.entrezgeneID),
+                             ','.join(self.emblID),
+                             ','.join(self.pdbID),
+                             ','.join(self.ecID),
+                             ','.join(self.kwName),
+                             ','.join(self.interproID),
+                             ','.join(self.mgiID),
+                             ','.join(self.geneName),
+                             self.taxonID,
+                             str(self.sequenceLength),
+                             self.crc64))
+        return hashlib.sha1(content.encode()).hexdigest()
+
     #
     # Purpose: Return all the attributes as one string(for debugging).
     # Returns: String of all objects.
@@ -187,3 +391,18 @@ class Record:
                '|kwName=' + ','.join(self.kwName) + '|' + \
                '|interproID=' + ','.join(self.interproID) + '|' + \
                '|emblID=' + ','.join(self.entrezgeneID)
+
+
+#
+# Purpose: Create a record from the attributes returned by __getstate__()
+#          (records are passed back from the parser processes this way,
+#          which is cheaper to pickle than the record objects).
+# Returns: The record object
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def fromState (state):
+    rec = Record.__new__(Record)
+    rec.__setstate__(state)
+    return rec
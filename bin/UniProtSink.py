@@ -0,0 +1,154 @@
+import os
+
+#
+# Derived output files written by makeUniProtAssocFile.py in the same pass
+# as the association files, so that later stages read a small file with
+# the one column they need instead of re-reading UNIPROT_ACC_ASSOC_FILE.
+#
+# A sink is a file name and a row function: the row function returns the
+# lines of the file for one record.  The lines are buffered and written in
+# batches to a temporary file, which is renamed to the file name when the
+# sink is closed, so that an incomplete file is never read.
+#
+
+# number of lines written per batch
+BATCH_SIZE = 10000
+
+# file buffer size
+BUFFER_SIZE = 1024 * 1024
+
+#
+# Purpose: Get the UniProt/InterPro lines of a record.
+# Returns: List of lines (uniprot id, interpro id)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def interproRows (rec):
+
+    uniprotID = rec.getUniProtID()
+    return [uniprotID + '\t' + id + '\n' for id in rec.getInterProID()]
+
+
+#
+# Purpose: Get the reference proteome line of a record.
+# Returns: List of lines (uniprot id), empty if the record is not in the
+#          reference proteome
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def refProteomeRows (rec):
+
+    if rec.isReferenceProteome():
+        return [rec.getUniProtID() + '\n']
+    return []
+
+
+#
+# Purpose: Get the UniProt/EC lines of a record.
+# Returns: List of lines (uniprot id, EC number)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def ecRows (rec):
+
+    uniprotID = rec.getUniProtID()
+    return [uniprotID + '\t' + id + '\n' for id in rec.getECID()]
+
+
+#
+# Purpose: Get the UniProt/PDB lines of a record.
+# Returns: List of lines (uniprot id, PDB id)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def pdbRows (rec):
+
+    uniprotID = rec.getUniProtID()
+    return [uniprotID + '\t' + id + '\n' for id in rec.getPDBID()]
+
+
+#
+# Purpose: Get the UniProt/MGI lines of a record (its DR MGI
+#          cross-references).
+# Returns: List of lines (uniprot id, MGI id)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def mgiRows (rec):
+
+    uniprotID = rec.getUniProtID()
+    return [uniprotID + '\t' + id + '\n' for id in rec.getMGIID()]
+
+
+#
+# CLASS: Sink
+# IS: A derived output file.
+# HAS: The file name, the row function and the lines not yet written
+# DOES: Writes the lines of each record to a temporary file in batches,
+#       then renames the temporary file to the file name.
+#
+class Sink:
+
+    #
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Opens the temporary file (path.tmp) with 'opener'
+    #          (default: open for writing)
+    # Throws: OSError
+    #
+    def __init__ (self, path, rows, opener=None):
+
+        self.path = path
+        self.rows = rows
+        self.lines = []
+
+        if opener:
+            self.fp = opener(path + '.tmp')
+        else:
+            self.fp = open(path + '.tmp', 'w', buffering=BUFFER_SIZE)
+
+    #
+    # Purpose: Add the lines of one record.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Writes a batch of lines to the temporary file when full
+    # Throws: OSError
+    #
+    def add (self, rec):
+
+        self.lines.extend(self.rows(rec))
+        if len(self.lines) >= BATCH_SIZE:
+            self.flush()
+
+    #
+    # Purpose: Write the buffered lines.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Writes to the temporary file
+    # Throws: OSError
+    #
+    def flush (self):
+
+        self.fp.writelines(self.lines)
+        self.lines = []
+        self.fp.flush()
+
+    #
+    # Purpose: Finish the file.
+    # Returns: Nothing
+    # Assumes: Every record has been added
+    # Effects: Replaces the file with the temporary file
+    # Throws: OSError
+    #
+    def close (self):
+
+        self.flush()
+        self.fp.close()
+
+        os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,210 @@
+import sqlite3
+
+#
+# SQLite database of the associations written by makeUniProtAssocFile.py
+# (UniProt IDs) and makeMGIAssocFile.py (MGI markers), so that the later
+# stages can look up an ID by any of its cross-references without reading
+# and splitting the association files.
+#
+# Tables:
+#
+#   uniprot (recordNum, uniprotID, isTrembl, hasAssoc, kwName)
+#       recordNum: order in UNIPROT_ACC_ASSOC_FILE/UNIPROT_ACC_ASSOC_ERR_FILE
+#       isTrembl: 1 if TrEMBL, 0 if Swiss-Prot
+#       hasAssoc: 1 if in UNIPROT_ACC_ASSOC_FILE, 0 if in the error file
+#       kwName: SwissProt key words (comma-separated)
+#
+#   uniprot_xref (uniprotID, xrefType, xrefID)
+#
+#   marker (recordNum, mgiID, symbol, markerType)
+#       recordNum: order in MGI_ACC_ASSOC_FILE
+#
+#   marker_xref (mgiID, xrefType, xrefID)
+#
+# xrefType is one of the XREF_* names below.  Each table is indexed on its
+# UniProt ID or MGI ID, and each xref table on (xrefID, xrefType).
+#
+
+XREF_ENTREZGENE = 'entrezgene'
+XREF_ENSEMBL = 'ensembl'
+XREF_EMBL = 'embl'
+XREF_EC = 'ec'
+XREF_PDB = 'pdb'
+XREF_INTERPRO = 'interpro'
+XREF_MGI = 'mgi'
+
+# table -> (columns, key column)
+TABLES = {
+    'uniprot' : ('recordNum INTEGER, uniprotID TEXT, isTrembl INTEGER, '
+                 'hasAssoc INTEGER, kwName TEXT', 'uniprotID'),
+    'marker' : ('recordNum INTEGER, mgiID TEXT, symbol TEXT, markerType INTEGER',
+                'mgiID'),
+}
+
+# number of rows inserted per batch
+BATCH_SIZE = 10000
+
+#
+# Purpose: Create the tables that do not exist.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Creates tables
+# Throws: sqlite3.Error
+#
+def createTables (conn):
+
+    for (table, (columns, key)) in TABLES.items():
+        conn.execute('create table if not exists %s (%s)' % (table, columns))
+        conn.execute('create table if not exists %s_xref (%s TEXT, xrefType TEXT, xrefID TEXT)'
+                     % (table, key))
+
+
+#
+# Purpose: Open the database for reading.
+# Returns: sqlite3 connection
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: sqlite3.Error if the database does not exist
+#
+def openStore (path):
+
+    return sqlite3.connect('file:%s?mode=ro' % path, uri=True)
+
+
+#
+# Purpose: Get the UniProt IDs that have a cross-reference.
+# Returns: List of UniProt IDs
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: sqlite3.Error
+#
+def uniprotIDs (conn, xrefType, xrefID):
+
+    cursor = conn.execute('select uniprotID from uniprot_xref '
+                          'where xrefID = ? and xrefType = ?', (xrefID, xrefType))
+    return [r[0] for r in cursor]
+
+
+#
+# Purpose: Get the MGI IDs of the markers that have a cross-reference.
+# Returns: List of MGI IDs
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: sqlite3.Error
+#
+def markerIDs (conn, xrefType, xrefID):
+
+    cursor = conn.execute('select mgiID from marker_xref '
+                          'where xrefID = ? and xrefType = ?', (xrefID, xrefType))
+    return [r[0] for r in cursor]
+
+
+#
+# CLASS: StoreWriter
+# IS: A writer of one table (and its xref table) of the database.
+# HAS: The database connection and the rows not yet inserted
+# DOES: Replaces the rows of the table, inserting them in batches, and
+#       indexes the table when it is complete.
+#
+class StoreWriter:
+
+    #
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Creates the database and its tables if they do not exist.
+    #          Deletes the rows of the table, except the first 'keep' rows
+    #          when resuming a table written up to a commit().
+    #          Drops the indexes of the table until close().
+    # Throws: sqlite3.Error
+    #
+    def __init__ (self, path, table, keep=0):
+
+        (columns, key) = TABLES[table]
+
+        self.table = table
+        self.key = key
+        self.columns = columns.count(',') + 1
+        self.count = keep
+        self.rows = []
+        self.xrefs = []
+
+        self.conn = sqlite3.connect(path)
+        createTables(self.conn)
+
+        for suffix in ('key', 'xref_key', 'xref_id'):
+            self.conn.execute('drop index if exists %s_%s' % (table, suffix))
+
+        self.conn.execute('delete from %s_xref where %s in '
+                          '(select %s from %s where recordNum >= ?)'
+                          % (table, key, key, table), (keep,))
+        self.conn.execute('delete from %s where recordNum >= ?' % table, (keep,))
+
+    #
+    # Purpose: Add one row and its cross-references.
+    # Returns: Nothing
+    # Assumes: row has the columns of the table after recordNum, starting
+    #          with the key
+    # Effects: Inserts a batch of rows when full
+    # Throws: sqlite3.Error
+    #
+    def add (self, row, xrefs):
+
+        self.rows.append((self.count,) + tuple(row))
+        self.count = self.count + 1
+
+        for (xrefType, ids) in xrefs:
+            for id in ids:
+                self.xrefs.append((row[0], xrefType, id))
+
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    #
+    # Purpose: Insert the rows not yet inserted.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Inserts rows (not committed)
+    # Throws: sqlite3.Error
+    #
+    def flush (self):
+
+        self.conn.executemany('insert into %s values (%s)'
+                              % (self.table, ','.join('?' * self.columns)), self.rows)
+        self.conn.executemany('insert into %s_xref values (?,?,?)' % self.table,
+                              self.xrefs)
+        self.rows = []
+        self.xrefs = []
+
+    #
+    # Purpose: Commit the rows added so far.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Inserts and commits rows
+    # Throws: sqlite3.Error
+    #
+    def commit (self):
+
+        self.flush()
+        self.conn.commit()
+
+    #
+    # Purpose: Finish the table.
+    # Returns: Nothing
+    # Assumes: Every row has been added
+    # Effects: Inserts the remaining rows, indexes the table and commits
+    # Throws: sqlite3.Error
+    #
+    def close (self):
+
+        self.flush()
+
+        self.conn.execute('create index %s_key on %s (%s)'
+                          % (self.table, self.table, self.key))
+        self.conn.execute('create index %s_xref_key on %s_xref (%s)'
+                          % (self.table, self.table, self.key))
+        self.conn.execute('create index %s_xref_id on %s_xref (xrefID, xrefType)'
+                          % (self.table, self.table))
+
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,100 @@
+#
+# The MGI/UniProt 1:1 pairs that are confirmed by the DR MGI
+# cross-references of the UniProt records (makeBuckets.py, BUCKET_MGI_XREF).
+#
+# The rows are the tab-delimited fields of MGI_ACC_ASSOC_FILE and of
+# UNIPROT_ACC_ASSOC_FILE; the cross-references are read from
+# UNIPROT_MGI_XREF_FILE (see UniProtSink.mgiRows).
+#
+
+# MGI ID (or UniProt ID) fields that are compared by the bucketizer:
+# index of the field in the MGI association file -> index of the
+# same field in the UniProt association file
+XREF_FIELDS = { 3 : 1, 4 : 2, 5 : 3 }
+
+#
+# Purpose: Read the DR MGI cross-references of the UniProt records.
+# Returns: Dictionary of UniProt ID -> set of MGI IDs
+# Assumes: Nothing
+# Effects: Reads the file
+# Throws: OSError
+#
+def readXrefs (path):
+
+    xrefs = {}
+
+    fp = open(path, 'r')
+    for line in fp:
+        (uniprotID, mgiID) = line[:-1].split('\t')
+        xrefs.setdefault(uniprotID, set()).add(mgiID)
+    fp.close()
+
+    return xrefs
+
+
+#
+# Purpose: Find the MGI/UniProt 1:1 pairs that the cross-references
+#          confirm: a UniProt record that only shares IDs with the MGI
+#          record of one of its MGI cross-references, where that MGI
+#          record only shares IDs with this UniProt record.
+#          These are pairs the bucketizer would put in the 1:1 bucket.
+# Returns: List of (MGI row number, UniProt row number), in UniProt row
+#          order
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def resolvePairs (mgiRows, uniprotRows, xrefs):
+
+    #
+    # Index the compared IDs of each file:
+    # (field, ID) -> row numbers
+    #
+    mgiIndex = {}
+    for (i, row) in enumerate(mgiRows):
+        for f in XREF_FIELDS:
+            for id in row[f].split(','):
+                if id != '':
+                    mgiIndex.setdefault((f, id), set()).add(i)
+
+    uniprotIndex = {}
+    for (i, row) in enumerate(uniprotRows):
+        for (f, u) in XREF_FIELDS.items():
+            for id in row[u].split(','):
+                if id != '':
+                    uniprotIndex.setdefault((f, id), set()).add(i)
+
+    mgiRowLookup = {}
+    for (i, row) in enumerate(mgiRows):
+        mgiRowLookup[row[0]] = i
+
+    pairs = []
+
+    for (u, row) in enumerate(uniprotRows):
+        mgiIDs = xrefs.get(row[0])
+        if not mgiIDs:
+            continue
+
+        matches = set()
+        for (f, uf) in XREF_FIELDS.items():
+            for id in row[uf].split(','):
+                if id != '':
+                    matches.update(mgiIndex.get((f, id), ()))
+        if len(matches) != 1:
+            continue
+
+        m = matches.pop()
+        if mgiRowLookup[mgiRows[m][0]] != m or mgiRows[m][0] not in mgiIDs:
+            continue
+
+        matches = set()
+        for f in XREF_FIELDS:
+            for id in mgiRows[m][f].split(','):
+                if id != '':
+                    matches.update(uniprotIndex.get((f, id), ()))
+        if matches != {u}:
+            continue
+
+        pairs.append((m, u))
+
+    return pairs
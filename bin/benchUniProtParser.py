@@ -0,0 +1,202 @@
+#
+#  benchUniProtParser.py
+###########################################################################
+#
+#  Purpose:
+#
+#      This script will measure the speed of the UniProt parser on a
+#      UniProt file (e.g. one written by makeTestUniProtFile.py):
+#
+#      1) UniProtParser.Parser.nextRecord(), read line by line (text),
+#         memory-mapped (mapped) and memory-mapped extracting only the
+#         EntrezGene/Ensembl/EMBL ids (mapped-ids)
+#
+#      2) makeUniProtAssocFile.py (getAssociations()), for each number of
+#         parser processes (PARSER_WORKERS)
+#
+#      and report the records/sec, MB/sec and peak memory (RSS) of each.
+#      Each measurement runs in a separate process, so that the peak memory
+#      of one does not hide the next.  The best of --repeat runs is
+#      reported.
+#
+#  Usage:
+#
+#      benchUniProtParser.py [--repeat n] [--workers 1,4] inputfile
+#
+#  Inputs:
+#
+#      - UniProt file (not compressed; the parser is measured alone)
+#
+#  Outputs:
+#
+#      - Report (stdout)
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+
+import UniProtParser
+import UniProtReader
+
+# parser settings measured by parserCase()
+PARSER_CASES = {
+    'text' : { 'mapped' : 0 },
+    'mapped' : { 'mapped' : 1 },
+    'mapped-ids' : { 'mapped' : 1, 'fields' : { 'entrezgene', 'ensembl', 'embl' } },
+}
+
+# output files of makeUniProtAssocFile.py
+ASSOC_FILES = [ 'UNIPROT_ACC_ASSOC_FILE', 'UNIPROT_ACC_ASSOC_ERR_FILE',
+                'UNIPROT_SP_ASSOC_FILE', 'UNIPROT_SP_ASSOC_ERR_FILE',
+                'UNIPROT_TR_ASSOC_FILE', 'UNIPROT_TR_ASSOC_ERR_FILE',
+                'UNIPROT_PROTEIN_FILE', 'UNIPROT_INTERPRO_FILE',
+                'UNIPROT_REFPROTEOME_FILE', 'UNIPROT_EC_FILE', 'UNIPROT_PDB_FILE',
+                'UNIPROT_MGI_XREF_FILE', 'UNIPROT_STORE' ]
+
+#
+# Purpose: Parse the UniProt file with one parser setting (child process).
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Prints the number of records and the parse time
+# Throws: Nothing
+#
+def parserCase(name, inputFile):
+
+    fp = open(inputFile, 'r')
+    start = time.perf_counter()
+
+    parser = UniProtParser.Parser(fp, **PARSER_CASES[name])
+    count = 0
+    while parser.nextRecord():
+        count = count + 1
+    parser.close()
+
+    elapsed = time.perf_counter() - start
+    fp.close()
+
+    print('%d %f' % (count, elapsed))
+
+
+#
+# Purpose: Run a command and measure it.
+# Returns: (stdout, seconds, peak RSS in KB)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: RuntimeError if the command fails
+#
+def measure(command, env=None):
+
+    start = time.perf_counter()
+    child = subprocess.Popen(command, env=env, stdout=subprocess.PIPE,
+                             universal_newlines=True)
+    output = child.stdout.read()
+    (pid, status, usage) = os.wait4(child.pid, 0)
+    elapsed = time.perf_counter() - start
+    child.returncode = os.waitstatus_to_exitcode(status)
+
+    if child.returncode != 0:
+        raise RuntimeError('Failed: ' + ' '.join(command) + '\n' + output)
+
+    return (output, elapsed, usage.ru_maxrss)
+
+
+#
+# Purpose: Print one line of the report.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def report(name, records, seconds, size, rss):
+
+    print('%-24s %10d %10.2f %10.1f %10.1f %10.0f' % (name, records, seconds,
+          records / seconds, size / seconds / 1048576, rss / 1024.0))
+
+
+#
+#  MAIN
+#
+
+if len(sys.argv) == 4 and sys.argv[1] == '--case':
+    parserCase(sys.argv[2], sys.argv[3])
+    sys.exit(0)
+
+parser = argparse.ArgumentParser(description='Measure the UniProt parser.')
+parser.add_argument('inputfile')
+parser.add_argument('--repeat', type=int, default=3)
+parser.add_argument('--workers', default='1,4')
+args = parser.parse_args()
+
+inputFile = os.path.abspath(args.inputfile)
+
+if UniProtReader.isGzip(inputFile):
+    print('Compressed input file; uncompress it first: ' + inputFile)
+    sys.exit(1)
+
+size = os.path.getsize(inputFile)
+script = os.path.abspath(__file__)
+bindir = os.path.dirname(script)
+
+print('%s: %.1f MB' % (inputFile, size / 1048576.0))
+print('%-24s %10s %10s %10s %10s %10s' % ('', 'records', 'seconds', 'records/s', 'MB/s', 'peak MB'))
+
+#
+# The parser alone.  The time is measured by the child, around the parse.
+#
+for name in PARSER_CASES:
+    best = None
+    for i in range(args.repeat):
+        (output, elapsed, rss) = measure([sys.executable, script, '--case', name, inputFile])
+        (records, seconds) = output.split()
+        if best is None or float(seconds) < best[1]:
+            best = (int(records), float(seconds), rss)
+    report('Parser ' + name, best[0], best[1], size, best[2])
+
+#
+# makeUniProtAssocFile.py, writing its output files to a temporary directory.
+#
+outputDir = tempfile.mkdtemp()
+
+try:
+    for workers in args.workers.split(','):
+        env = dict(os.environ)
+        env['INPUTFILE'] = inputFile
+        env['PARSER_MMAP'] = 'true'
+        env['PARSER_WORKERS'] = workers
+        for name in ASSOC_FILES:
+            env[name] = os.path.join(outputDir, name.lower() + '.txt')
+        for name in [ 'PARSER_CACHE', 'PARSER_TAXON', 'UNIPROT_INDEX_FILE',
+                      'UNIPROT_HASH_FILE', 'PARSER_GZ_INDEX', 'PARSER_CHECKPOINT' ]:
+            env.pop(name, None)
+
+        best = None
+        for i in range(args.repeat):
+            (output, elapsed, rss) = measure([sys.executable,
+                os.path.join(bindir, 'makeUniProtAssocFile.py')], env)
+            if best is None or elapsed < best[0]:
+                best = (elapsed, rss)
+
+        fp = open(env['UNIPROT_PROTEIN_FILE'], 'r')
+        records = len(fp.readlines())
+        fp.close()
+
+        report('makeUniProtAssocFile ' + workers, records, best[0], size, best[1])
+finally:
+    shutil.rmtree(outputDir)
+
+sys.exit(0)
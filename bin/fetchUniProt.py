@@ -0,0 +1,106 @@
+#
+#  fetchUniProt.py
+###########################################################################
+#
+#  Purpose:
+#
+#      This script will print the UniProt input file entries for the given
+#      accession ids, using the accession index written by
+#      makeUniProtAssocFile.py, without scanning the input file.
+#
+#  Usage:
+#
+#      fetchUniProt.py accession [accession ...]
+#
+#      (source the configuration file first)
+#
+#  Env Vars:
+#
+#      The following environment variables are set by the configuration
+#      file:
+#
+#          INPUTFILE
+#          UNIPROT_INDEX_FILE
+#
+#      Optional:
+#
+#          PARSER_GZ_INDEX (gzip member index of a compressed INPUTFILE)
+#
+#  Inputs:
+#
+#      - UniProt file ($INPUTFILE), plain or gzip-compressed
+#      - Accession index ($UNIPROT_INDEX_FILE)
+#
+#  Outputs:
+#
+#      - The UniProt entry of each accession id (stdout)
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred, or an accession id was not found
+#
+#  Assumes:  The accession index is current with the UniProt file
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import os
+import UniProtParser
+import UniProtReader
+
+uniprotFile = os.getenv('INPUTFILE')
+uniprotIndexFile = os.getenv('UNIPROT_INDEX_FILE')
+gzIndexFile = os.getenv('PARSER_GZ_INDEX')
+
+if not uniprotFile:
+    print('Environment variable not set: INPUTFILE')
+    sys.exit(1)
+
+if not uniprotIndexFile:
+    print('Environment variable not set: UNIPROT_INDEX_FILE')
+    sys.exit(1)
+
+if len(sys.argv) < 2:
+    print('Usage: fetchUniProt.py accession [accession ...]')
+    sys.exit(1)
+
+#
+# The index holds offsets into the uncompressed file; a compressed file
+# is read through its gzip member index.
+#
+if UniProtReader.isGzip(uniprotFile):
+    gzIndex = UniProtReader.gzipIndex(uniprotFile, gzIndexFile)
+    fp = None
+else:
+    gzIndex = None
+    fp = open(uniprotFile, 'r')
+    parser = UniProtParser.Parser(fp, indexFile=uniprotIndexFile)
+
+rc = 0
+
+for accession in sys.argv[1:]:
+
+    if gzIndex is None:
+        text = parser.fetchText(accession)
+    else:
+        location = UniProtParser.lookupIndex(uniprotIndexFile, accession)
+        if location is None:
+            text = None
+        else:
+            (offset, length) = location
+            text = UniProtReader.readGzipBytes(uniprotFile, gzIndex,
+                                               offset, length).decode()
+
+    if text is None:
+        sys.stderr.write('Accession not found: ' + accession + '\n')
+        rc = 1
+    else:
+        sys.stdout.write(text)
+
+if fp:
+    fp.close()
+
+sys.exit(rc)
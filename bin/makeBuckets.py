@@ -25,6 +25,12 @@
 #          BUCKET_PREFIX
 #          MGI_UNIPROT_LOAD_FILE
 #
+#      Optional:
+#
+#          BUCKET_MGI_XREF (true: resolve the MGI cross-reference 1:1 pairs
+#                           before bucketizing; see Notes)
+#          UNIPROT_MGI_XREF_FILE (required if BUCKET_MGI_XREF is true)
+#
 #  Inputs:
 #
 #      - MGI association file ($MGI_ACC_ASSOC_FILE)
@@ -48,6 +54,13 @@
 #        6) PDB IDs (comma-separated)
 #        7) InterPro IDs (comma-separated)
 #        8) SPKW Names (comma-separated)
+#        9) EMBL IDs (comma-separated)
+#
+#      - UniProt/MGI cross-reference file ($UNIPROT_MGI_XREF_FILE), read if
+#        BUCKET_MGI_XREF is true. It has the following tab-delimited fields:
+#
+#        1) UniProt ID
+#        2) MGI ID (DR MGI cross-reference)
 #
 #      - SwissProt association file ($UNIPROT_SP_ASSOC_FILE) 
 #        to be used to generate a lookup file of SwissProt associations.
@@ -103,7 +116,19 @@
 #      6) Write the MGI/UniProt associations from the 1:1, N:1 and 1:N buckets to a file.
 #      7) Close files.
 #
-#  Notes:  None
+#  Notes:
+#
+#      If BUCKET_MGI_XREF is true, a UniProt ID that has a DR MGI
+#      cross-reference to an MGI ID, and that shares EntrezGene/Ensembl/EMBL
+#      IDs with that MGI ID only (and the MGI ID with that UniProt ID only),
+#      is a 1:1 pair before bucketizing (see UniProtXref.py).  These pairs are removed from
+#      working copies of the association files
+#      (${BUCKETDIR}/${BUCKET_PREFIX}.*.xref.txt, removed once they are
+#      read) so that the bucketizer only has to compare the remaining
+#      records, and are added to the MGI/UniProt associations and, in a
+#      section of their own, to the 1:1 bucket file.
+#      The 1:1 pairs found this way are the ones the bucketizer would find,
+#      so the associations are the same either way.
 #
 # 05/26/2010    lec
 #       - TR 10231/output should contain marker type 'gene' only
@@ -115,6 +140,7 @@ import sys
 import os
 import db
 import tabledatasetlib
+import UniProtXref
 
 DEFAULT_BUCKETDIR = os.getcwd()
 DEFAULT_BUCKET_PREFIX = 'bucket'
@@ -168,6 +194,18 @@ bucketDir = None
 # BUCKET_PREFIX
 bucketPrefix = None
 
+# BUCKET_MGI_XREF
+bucketMGIXref = 0
+
+# UNIPROT_MGI_XREF_FILE
+uniprotMGIXrefFile = None
+
+# the MGI/UniProt 1:1 pairs that are resolved by the MGI cross-references
+# before bucketizing
+# looks like:  [(mgi association row, uniprot association row), ...]
+# (each row is a list of the tab-delimited fields)
+xrefPairs = []
+
 # file pointers
 bucketRpt = None
 fpSPAssoc = None
@@ -184,7 +222,7 @@ def initialize():
     global mgiAssocFile
     global uniprotAccAssocFile, uniprotSPAssocFile, uniprotTRAssocFile
     global bucketRptFile
-    global bucketDir, bucketPrefix
+    global bucketDir, bucketPrefix, bucketMGIXref, uniprotMGIXrefFile
     global bucket, bucketRpt
     global fpSPAssoc, fpTRAssoc
 
@@ -195,6 +233,10 @@ def initialize():
     bucketDir = os.getenv('BUCKETDIR')
     bucketPrefix = os.getenv('BUCKET_PREFIX')
     bucketRptFile = os.getenv('MGI_UNIPROT_LOAD_FILE')
+    uniprotMGIXrefFile = os.getenv('UNIPROT_MGI_XREF_FILE')
+
+    if os.getenv('BUCKET_MGI_XREF') == 'true':
+        bucketMGIXref = 1
 
     rc = 0
 
@@ -221,6 +263,10 @@ def initialize():
         print('Environment variable not set: MGI_UNIPROT_LOAD_FILE')
         rc = 1
 
+    if bucketMGIXref and not uniprotMGIXrefFile:
+        print('Environment variable not set: UNIPROT_MGI_XREF_FILE')
+        rc = 1
+
     #
     # Use defaults for optional environment variables that are not set.
     #
@@ -326,6 +372,79 @@ def closeFiles():
     return 0
 
 
+#
+# Purpose: Resolve the MGI/UniProt 1:1 pairs that are confirmed by the
+#          DR MGI cross-references of the UniProt records, and remove them
+#          from the association files that are bucketized.
+# Returns: 1 if file does not exist or is not readable, else 0
+# Assumes: Nothing
+# Effects: Sets xrefPairs; writes the remaining records to copies of the
+#          association files and uses the copies as mgiAssocFile and
+#          uniprotAccAssocFile
+# Throws: Nothing
+#
+def resolveXrefs():
+    global mgiAssocFile, uniprotAccAssocFile
+
+    try:
+        fp = open(mgiAssocFile, 'r')
+        mgiRows = [line[:-1].split('\t') for line in fp.readlines()]
+        fp.close()
+    except:
+        print('Cannot open MGI association file: ' + mgiAssocFile)
+        return 1
+
+    try:
+        fp = open(uniprotAccAssocFile, 'r')
+        uniprotRows = [line[:-1].split('\t') for line in fp.readlines()]
+        fp.close()
+    except:
+        print('Cannot open UniProt association file: ' + uniprotAccAssocFile)
+        return 1
+
+    try:
+        xrefs = UniProtXref.readXrefs(uniprotMGIXrefFile)
+    except:
+        print('Cannot open UniProt/MGI cross-reference file: ' + uniprotMGIXrefFile)
+        return 1
+
+    mgiResolved = set()
+    uniprotResolved = set()
+
+    for (m, u) in UniProtXref.resolvePairs(mgiRows, uniprotRows, xrefs):
+        mgiResolved.add(m)
+        uniprotResolved.add(u)
+        xrefPairs.append((mgiRows[m], uniprotRows[u]))
+
+    print('1:1 MGI cross-references: ' + str(len(xrefPairs)))
+
+    #
+    # Write the remaining records to the files that are bucketized.
+    #
+    prefix = bucketDir + '/' + bucketPrefix + '.'
+
+    try:
+        fp = open(prefix + 'mgi.xref.txt', 'w')
+        for (i, row) in enumerate(mgiRows):
+            if i not in mgiResolved:
+                fp.write('\t'.join(row) + '\n')
+        fp.close()
+
+        fp = open(prefix + 'uniprot.xref.txt', 'w')
+        for (i, row) in enumerate(uniprotRows):
+            if i not in uniprotResolved:
+                fp.write('\t'.join(row) + '\n')
+        fp.close()
+    except:
+        print('Cannot write association files: ' + prefix + '*.xref.txt')
+        return 1
+
+    mgiAssocFile = prefix + 'mgi.xref.txt'
+    uniprotAccAssocFile = prefix + 'uniprot.xref.txt'
+
+    return 0
+
+
 #
 # Purpose: Bucketize the MGI/UniProt IDs from the association files.
 # Returns: 1 if file does not exist or is not readable, else 0
@@ -366,6 +485,16 @@ def bucketize():
 
     dsUniProt.addIndexes( [ 'EntrezGene ID', 'Ensembl ID', 'EMBL ID' ] )
 
+    #
+    # The working copies written by resolveXrefs() have been read.
+    #
+    if bucketMGIXref:
+        for path in (mgiAssocFile, uniprotAccAssocFile):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
     #
     # Create a bucketizer for the two datasets and run it.
     #
@@ -423,6 +552,18 @@ def writeBuckets_format1():
                        [ 'MGI ID', 'Symbol', 'Marker Type', 'EntrezGene ID', 'Ensembl ID', 'EMBL ID' ],
                        [ 'UniProt ID', 'EntrezGene ID', 'Ensembl ID', 'EMBL ID' ])
 
+    #
+    # The 1:1 pairs resolved by the MGI cross-references (not bucketized).
+    #
+    if bucketMGIXref:
+        bucket[B1_1].write('\n1:1 pairs resolved by the MGI cross-references\n')
+        bucket[B1_1].write('total number of unique records:  %s\n\n' % (len(xrefPairs)))
+        bucket[B1_1].write('MGI ID\tSymbol\tMarker Type\tEntrezGene ID\tEnsembl ID\tEMBL ID\t')
+        bucket[B1_1].write('UniProt ID\tEntrezGene ID\tEnsembl ID\tEMBL ID\n')
+        for (mgiRow, uniprotRow) in xrefPairs:
+            bucket[B1_1].write('\t'.join(mgiRow[:6]) + '\t' + '\t'.join(uniprotRow[:4]) + '\n')
+        bucket[B1_1].write('\n')
+
     reporter.write_1_n(bucket[B1_N],
                        [ 'MGI ID', 'Symbol', 'Marker Type', 'EntrezGene ID', 'Ensembl ID', 'EMBL ID' ],
                        [ 'UniProt ID', 'EntrezGene ID', 'Ensembl ID', 'EMBL ID' ])
@@ -564,6 +705,40 @@ def writeReport():
             if pdbID not in pdbLookup[mgiID]:
                 pdbLookup[mgiID].append(pdbID)
 
+    #
+    # Find unique MGI/UniProt associations in the 1:1 pairs resolved by
+    # the MGI cross-references.
+    #
+
+    for (mgiRow, uniprotRow) in xrefPairs:
+
+        mgiID = mgiRow[0]
+        uniprotID = uniprotRow[0]
+        ecID = uniprotRow[4] or None
+        pdbID = uniprotRow[5] or None
+
+        if mgiID in mgiDict:
+            list = mgiDict[mgiID]
+        else:
+            list = []
+        if list.count(uniprotID) == 0:
+            list.append(uniprotID)
+            mgiDict[mgiID] = list
+
+        # create a lookup of mgiID/ecIDs
+        if ecID is not None:
+            if mgiID not in ecLookup:
+                ecLookup[mgiID] = []
+            if ecID not in ecLookup[mgiID]:
+                ecLookup[mgiID].append(ecID)
+
+        # create a lookup of mgiID/pdbIDs
+        if pdbID is not None:
+            if mgiID not in pdbLookup:
+                pdbLookup[mgiID] = []
+            if pdbID not in pdbLookup[mgiID]:
+                pdbLookup[mgiID].append(pdbID)
+
     #
     # Find unique MGI/UniProt associations in the 1:N bucket.
     #
@@ -682,6 +857,10 @@ if initialize() != 0:
 if openFiles() != 0:
     sys.exit(1)
 
+if bucketMGIXref and resolveXrefs() != 0:
+    closeFiles()
+    sys.exit(1)
+
 if bucketize() != 0:
     closeFiles()
     sys.exit(1)
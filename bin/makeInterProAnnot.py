@@ -18,7 +18,7 @@
 #      file that is sourced by the wrapper script:
 #
 #	  MGI_UNIPROT_LOAD_FILE
-#	  UNIPROT_ACC_ASSOC_FILE
+#	  UNIPROT_INTERPRO_FILE
 #
 #         MARKER_IP_ASSOC_FILE
 #         MARKER_IP_ANNOT_REF
@@ -34,7 +34,9 @@
 #	  2: swiss-prot id
 #	  3: trembl id
 #
-#       - UniProt/Acc files (${UNIPROT_ACC_ASSOC_FILE})
+#       - UniProt/InterPro file (${UNIPROT_INTERPRO_FILE})
+#	  1: uniprot id
+#	  2: interpro id
 #
 #	- Marker/InterPro Reference (${MARKER_IP_ANNOT_REF})
 #
@@ -91,7 +93,7 @@ import db
 # file name MGI_UNIPROT_LOAD_FILE
 mgi_to_uniprotFile = None
 
-# file name UNIPROT_ACC_ASSOC_FILE
+# file name UNIPROT_INTERPRO_FILE
 uniprotFile = None
 
 # file name MARKER_IP_ASSOC_FILE
@@ -138,7 +140,7 @@ def initialize():
 
     mgi_to_uniprotFile = os.getenv('MGI_UNIPROT_LOAD_FILE')
 
-    uniprotFile = os.getenv('UNIPROT_ACC_ASSOC_FILE')
+    uniprotFile = os.getenv('UNIPROT_INTERPRO_FILE')
 
     markerIPFile = os.getenv('MARKER_IP_ASSOC_FILE')
     markerIPRef = os.environ['MARKER_IP_ANNOT_REF']
@@ -157,7 +159,7 @@ def initialize():
         rc = 1
 
     if not uniprotFile:
-        print('Environment variable not set: UNIPROT_ACC_ASSOC')
+        print('Environment variable not set: UNIPROT_INTERPRO_FILE')
         rc = 1
 
     if not markerIPFile:
@@ -244,7 +246,7 @@ def readMGI2UNIPROT():
     return 0
 
 #
-# Purpose: Read UniProt-to-Acc file & create lookup
+# Purpose: Read UniProt-to-InterPro file & create lookup
 # Returns: 1 if file does not exist or is not readable, else 0
 # Assumes: Nothing
 # Effects: Nothing
@@ -254,7 +256,8 @@ def readMGI2UNIPROT():
 def readUNIPROTACC():
 
     #
-    # parse UniProt-to-InterPro associations via the UniProt/Acc file
+    # parse UniProt-to-InterPro associations via the UniProt/InterPro file
+    # (one line per association, written by makeUniProtAssocFile.py)
     #
     # dictionary contains:
     #	key = uniprot id
@@ -263,20 +266,13 @@ def readUNIPROTACC():
 
     fp = open(uniprotFile,'r')
 
-    for line in fp.readlines():
+    for line in fp:
         tokens = str.split(line[:-1], '\t')
         key = tokens[0]
 
-        # not all uniprot ids have interpro ids...
-        if len(tokens[6]) == 0:
-            continue
-
-        values = str.split(tokens[6], ',')
-
         if key not in uniprot_to_ip:
             uniprot_to_ip[key] = []
-        for v in values:
-            uniprot_to_ip[key].append(v)
+        uniprot_to_ip[key].append(tokens[1])
 
     fp.close()
 
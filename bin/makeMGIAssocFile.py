@@ -19,6 +19,17 @@
 #
 #          MGI_ACC_ASSOC_FILE
 #
+#      Optional:
+#
+#          UNIPROT_STORE (SQLite database; see UniProtStore.py)
+#          DB_COPY_EXPORT (true: extract the associations with COPY
+#                          (query) TO STDOUT; see PgStream.py)
+#          MGI_ASSOC_WORKERS (number of marker key ranges extracted in
+#                             parallel, each on its own connection, from
+#                             one snapshot of the database)
+#          MGI_ACC_ASSOC_CACHE (copy of the association file from the
+#                               previous run; see Notes)
+#
 #  Inputs:  None
 #
 #  Outputs:
@@ -33,6 +44,14 @@
 #        5) Ensembl gene model IDs (comma-separated)
 #        6) EMBL IDs (comma-separated)
 #
+#      - The marker and marker_xref tables of the SQLite database
+#        ($UNIPROT_STORE): the markers of the association file and their
+#        cross-references, indexed on the MGI ID and on each
+#        cross-reference ID
+#
+#      - Cache of the association file ($MGI_ACC_ASSOC_CACHE) and its
+#        database fingerprint ($MGI_ACC_ASSOC_CACHE.fingerprint)
+#
 #  Exit Codes:
 #
 #      0:  Successful completion
@@ -47,12 +66,21 @@
 #      1) Initialize variables.
 #      2) Open files.
 #      3) Query the database to get a list of MGI markers and the
-#         EntrezGene IDs and Ensembl gene model IDs that are associated
-#         with those markers.
+#         EntrezGene IDs, Ensembl gene model IDs and EMBL IDs that are
+#         associated with those markers (one query, aggregated per marker).
 #      4) Write each MGI ID and its associated IDs to the association file.
 #      5) Close files.
 #
-#  Notes:  None
+#  Notes:
+#
+#      If MGI_ACC_ASSOC_CACHE is set, the script first gets a fingerprint
+#      of the database: the number of rows and the latest modification
+#      date of the marker accession ids (ACC_Accession, logical DBs 1, 9,
+#      55 and 60) and of MRK_Marker.  If it is the fingerprint saved with
+#      the cache, the markers and their IDs have not changed since the
+#      cache was written, and the association file is copied from the cache
+#      instead of being extracted (the withdrawn markers are not reported).
+#      Otherwise the association file is extracted and saved as the cache.
 #
 # 05/26/2010    lec
 #       - TR 10231/output should contain marker type 'gene' only
@@ -62,11 +90,76 @@
 
 import sys 
 import os
-import db
+import shutil
+import PgStream
+import UniProtStore
 
 # file name MGI_ACC_ASSOC_FILE
 mgiAssocFile = None
 
+# file name UNIPROT_STORE
+storeFile = None
+
+# UniProtStore.StoreWriter of the marker table
+store = None
+
+# DB_COPY_EXPORT
+dbCopy = 0
+
+# MGI_ASSOC_WORKERS
+mgiWorkers = 1
+
+# MGI_ACC_ASSOC_CACHE
+cacheFile = None
+
+# fingerprint format version (change it when the association file changes)
+FINGERPRINT_VERSION = 1
+
+# the row count and latest modification date of each table/logical DB
+# that the association file is extracted from
+FINGERPRINT_QUERY = '''
+        select 'ACC_Accession ' || _LogicalDB_key as source,
+               count(*) as counter, max(modification_date) as modified
+        from ACC_Accession
+        where _MGIType_key = 2
+        and _LogicalDB_key in (1, 9, 55, 60)
+        group by _LogicalDB_key
+        union all
+        select 'MRK_Marker', count(*), max(modification_date)
+        from MRK_Marker
+        order by 1
+        '''
+
+# the EntrezGene (55), Ensembl (60) and EMBL (9) IDs of the mouse markers
+# (with their MGI IDs); {a1}, {a2}, {m} are the table aliases
+ASSOC_JOIN = '''
+        from ACC_Accession {a1}, ACC_Accession {a2}, MRK_Marker {m}
+        where {a1}._MGIType_key = 2
+        and {a1}._LogicalDB_key in (9, 55, 60)
+        and {a1}.preferred = 1
+        and {a1}._Object_key = {m}._Marker_key
+        and {m}._Organism_key = 1
+        and {a1}._Object_key = {a2}._Object_key
+        and {a2}._MGIType_key = 2
+        and {a2}._LogicalDB_Key = 1
+        and {a2}.preferred = 1
+        and {a2}.prefixPart = \'MGI:\'
+        '''
+
+# the IDs of each marker (from assoc), in MGI ID (byte) order
+ASSOC_SELECT = '''
+        select mgiID, symbol, _Marker_Type_key, _Marker_Status_key,
+            string_agg(distinct accID, \',\' order by accID)
+                filter (where _LogicalDB_key = 55) as entrezgeneIDs,
+            string_agg(distinct accID, \',\' order by accID)
+                filter (where _LogicalDB_key = 60) as ensemblIDs,
+            string_agg(distinct accID, \',\' order by accID)
+                filter (where _LogicalDB_key = 9 and accCount = 1) as emblIDs
+        from assoc
+        group by mgiID, symbol, _Marker_Type_key, _Marker_Status_key
+        order by mgiID collate "C"
+        '''
+
 # file pointer
 fpAssoc = None
 
@@ -78,13 +171,25 @@ fpAssoc = None
 # Throws: Nothing
 #
 def initialize():
-    global mgiAssocFile
+    global mgiAssocFile, storeFile, dbCopy, mgiWorkers, cacheFile
     global fpAssoc
 
     mgiAssocFile = os.getenv('MGI_ACC_ASSOC_FILE')
+    storeFile = os.getenv('UNIPROT_STORE')
+    cacheFile = os.getenv('MGI_ACC_ASSOC_CACHE')
+
+    if os.getenv('DB_COPY_EXPORT') == 'true':
+        dbCopy = 1
 
     rc = 0
 
+    if os.getenv('MGI_ASSOC_WORKERS'):
+        try:
+            mgiWorkers = int(os.getenv('MGI_ASSOC_WORKERS'))
+        except:
+            print('Invalid MGI_ASSOC_WORKERS: ' + os.getenv('MGI_ASSOC_WORKERS'))
+            rc = 1
+
     #
     # Make sure the environment variables are set.
     #
@@ -108,7 +213,7 @@ def initialize():
 # Throws: Nothing
 #
 def openFiles():
-    global fpAssoc
+    global fpAssoc, store
 
     #
     # Open the association file.
@@ -119,6 +224,16 @@ def openFiles():
         print('Cannot open association file: ' + mgiAssocFile)
         return 1
 
+    #
+    # Open the SQLite database.
+    #
+    if storeFile:
+        try:
+            store = UniProtStore.StoreWriter(storeFile, 'marker')
+        except:
+            print('Cannot open database: ' + storeFile)
+            return 1
+
     return 0
 
 
@@ -138,155 +253,250 @@ def closeFiles():
 
 
 #
-# Purpose: Query the database to get associations to MGI markers and create the association file.
-# Returns: 1 if file does not exist or is not readable, else 0
+# Purpose: Get the database fingerprint of the association file.
+# Returns: The fingerprint (string)
+# Assumes: Nothing
+# Effects: Queries the database
+# Throws: psycopg2.Error
+#
+def getFingerprint():
+
+    fingerprint = 'version\t%d\n' % FINGERPRINT_VERSION
+    for r in PgStream.stream(FINGERPRINT_QUERY, raw=1):
+        fingerprint = fingerprint + '\t'.join([str(c) for c in r]) + '\n'
+
+    return fingerprint
+
+
+#
+# Purpose: Read the fingerprint saved with the cache.
+# Returns: The fingerprint, or None if there is no cache
 # Assumes: Nothing
 # Effects: Nothing
 # Throws: Nothing
 #
-def getAssociations():
+def readFingerprint():
 
-    #
-    # Get all of the EntrezGene IDs, Ensembl gene model IDs, EMBL sequences
-    # that are associated with markers and load them into a temp table.
-    #
-    db.sql('''
-        create temp table assoc as
-        select a1.accID, a1._Object_key, a1._LogicalDB_key, a2.accID as mgiID, m.symbol, m._Marker_Type_key, m._Marker_Status_key
-        from ACC_Accession a1, ACC_Accession a2, MRK_Marker m 
-        where a1._MGIType_key = 2 
-        and a1._LogicalDB_key in (9, 55, 60) 
-        and a1.preferred = 1 
-        and a1._Object_key = m._Marker_key 
-        and m._Organism_key = 1 
-        and a1._Object_key = a2._Object_key 
-        and a2._MGIType_key = 2 
-        and a2._LogicalDB_Key = 1 
-        and a2.preferred = 1 
-        and a2.prefixPart = \'MGI:\'
-        ''', None)
+    if not os.path.exists(cacheFile):
+        return None
 
-    #
-    # Add indexes to the temp table.
-    #
-    db.sql('create index idx_accID on assoc (accID)', None)
-    db.sql('create index idx_object on assoc (_Object_key)', None)
-    db.sql('create index idx_logicalDB on assoc (_LogicalDB_key)', None)
+    try:
+        fp = open(cacheFile + '.fingerprint', 'r')
+        fingerprint = fp.read()
+        fp.close()
+    except:
+        return None
 
-    #
-    # Get the MGI ID of the marker and the unique EntrezGene IDs
-    # that are associated with each marker.
-    #
-    cmd = '''
-        select distinct mgiID, accID 
-        from assoc 
-        where _LogicalDB_key = 55 
-        order by mgiID
-        '''
-    results = db.sql(cmd, 'auto')
+    return fingerprint
+
+
+#
+# Purpose: Save the association file as the cache.
+# Returns: Nothing
+# Assumes: The association file is complete
+# Effects: Replaces the cache and its fingerprint (via temporary files)
+# Throws: OSError
+#
+def saveCache(fingerprint):
 
     #
-    # Create a dictionary lookup where the key is the MGI ID and the value
-    # is a list of associated EntrezGene IDs.
+    # The old fingerprint is removed first, so that it never matches a
+    # partly written cache.
     #
-    entrezgeneDict = {}
-    for r in results:
-        mgiID = r['mgiID']
-        accID = r['accID']
-        if mgiID not in entrezgeneDict:
-            entrezgeneDict[mgiID] = []
-        entrezgeneDict[mgiID].append(accID)
+    if os.path.exists(cacheFile + '.fingerprint'):
+        os.remove(cacheFile + '.fingerprint')
+
+    fpAssoc.flush()
+    shutil.copyfile(mgiAssocFile, cacheFile + '.tmp')
+    os.replace(cacheFile + '.tmp', cacheFile)
+
+    fp = open(cacheFile + '.fingerprint.tmp', 'w')
+    fp.write(fingerprint)
+    fp.close()
+    os.replace(cacheFile + '.fingerprint.tmp', cacheFile + '.fingerprint')
+
+
+#
+# Purpose: Write the association file from the cache.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Copies the cache to the association file, and adds its
+#          markers to the SQLite database
+# Throws: OSError
+#
+def readCache():
+
+    fp = open(cacheFile, 'r')
+    for line in fp:
+        fpAssoc.write(line)
+
+        if store:
+            tokens = line[:-1].split('\t')
+            store.add((tokens[0], tokens[1], tokens[2]),
+                      ((UniProtStore.XREF_ENTREZGENE, splitIDs(tokens[3])),
+                       (UniProtStore.XREF_ENSEMBL, splitIDs(tokens[4])),
+                       (UniProtStore.XREF_EMBL, splitIDs(tokens[5]))))
+    fp.close()
+
+
+#
+# Purpose: Split a comma-separated list of IDs.
+# Returns: List of IDs (empty if 'ids' is empty or None)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def splitIDs(ids):
+
+    if ids:
+        return ids.split(',')
+    return []
+
+
+#
+# Purpose: Get the query of the markers and their associated IDs.
+# Returns: The query
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def assocQuery():
 
     #
-    # Get the MGI ID of the marker and the unique Ensembl gene model IDs
-    # that are associated with each marker.
+    # assoc: the EntrezGene IDs, Ensembl gene model IDs, EMBL sequences
+    # that are associated with markers; accCount is the number of rows
+    # with the same ID, so that only the EMBL IDs associated with at most
+    # one marker are used.
     #
-    cmd = '''
-        select distinct mgiID, accID 
-        from assoc 
-        where _LogicalDB_key = 60 
-        order by mgiID
-        '''
-    results = db.sql(cmd, 'auto')
+    return '''
+        with assoc as (
+        select a1.accID, a1._LogicalDB_key, a2.accID as mgiID,
+               m.symbol, m._Marker_Type_key, m._Marker_Status_key,
+               count(*) over (partition by a1.accID) as accCount
+        ''' + ASSOC_JOIN.format(a1='a1', a2='a2', m='m') + '''
+        )
+        ''' + ASSOC_SELECT
+
+
+#
+# Purpose: Get the query of the markers in one range of marker keys and
+#          their associated IDs.
+# Returns: The query
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def rangeQuery(keyRange):
+
+    (low, high) = keyRange
+
+    condition = ''
+    if low is not None:
+        condition = condition + 'and a1._Object_key >= %d ' % low
+    if high is not None:
+        condition = condition + 'and a1._Object_key < %d ' % high
 
     #
-    # Create a dictionary lookup where the key is the MGI ID and the value
-    # is a list of association Ensembl gene model IDs.
+    # As in assocQuery(), but accCount counts the rows with the same ID
+    # for all markers, not only the markers in the range.
     #
-    ensemblDict = {}
+    return '''
+        with assoc as (
+        select a1.accID, a1._LogicalDB_key, a2.accID as mgiID,
+               m.symbol, m._Marker_Type_key, m._Marker_Status_key,
+               case when a1._LogicalDB_key = 9 then
+                   (select count(*)
+                   ''' + ASSOC_JOIN.format(a1='x1', a2='x2', m='xm') + '''
+                   and x1.accID = a1.accID)
+               end as accCount
+        ''' + ASSOC_JOIN.format(a1='a1', a2='a2', m='m') + condition + '''
+        )
+        ''' + ASSOC_SELECT
+
+
+#
+# Purpose: Split the mouse markers into ranges of marker keys with about
+#          the same number of markers.
+# Returns: List of (low, high) marker keys (low <= key < high; None for
+#          no limit)
+# Assumes: Nothing
+# Effects: Queries the database
+# Throws: psycopg2.Error
+#
+def markerRanges(count):
+
+    fractions = ','.join([str(i / count) for i in range(1, count)])
+    results = PgStream.stream('''
+        select percentile_disc(array[%s]) within group (order by _Marker_key)
+        from MRK_Marker
+        where _Organism_key = 1
+        ''' % fractions, raw=1)
+
+    bounds = []
     for r in results:
-        mgiID = r['mgiID']
-        accID = r['accID']
-        if mgiID not in ensemblDict:
-            ensemblDict[mgiID] = []
-        ensemblDict[mgiID].append(accID)
+        bounds = sorted(set([b for b in r[0] if b is not None]))
+
+    return list(zip([None] + bounds, bounds + [None]))
 
-    #
-    # Get the MGI ID of the marker and the unique EMBL IDs
-    # that are associated with each marker.
-    #
-    # EMBL IDs associated with at most one marker
-    #
-    db.sql('''create temp table tmp_assoc as select accID from assoc group by accID having count(*) = 1''', None)
-    db.sql('create index idx_accID2 on tmp_assoc (accID)', None)
-
-    cmd = '''
-        select distinct a.mgiID, a.accID
-        from assoc a, tmp_assoc t
-        where a._LogicalDB_key = 9
-	and a.accID = t.accID
-        order by a.mgiID
-        '''
-    results = db.sql(cmd, 'auto')
+
+#
+# Purpose: Query the database to get associations to MGI markers and create the association file.
+# Returns: 1 if file does not exist or is not readable, else 0
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getAssociations():
 
     #
-    # Create a dictionary lookup where the key is the MGI ID and the value
-    # is a list of association EMBL gene IDs.
+    # If the markers and their IDs have not changed since the cache was
+    # written, use the cache.
     #
-    emblDict = {}
-    for r in results:
-        mgiID = r['mgiID']
-        accID = r['accID']
-        if mgiID not in emblDict:
-            emblDict[mgiID] = []
-        emblDict[mgiID].append(accID)
+    fingerprint = None
+    if cacheFile:
+        try:
+            fingerprint = getFingerprint()
+        except:
+            print('Cannot get the database fingerprint; not using the cache')
+
+        if fingerprint is not None and fingerprint == readFingerprint():
+            print('The markers have not changed; using the association file cached in ' + cacheFile)
+            try:
+                readCache()
+            except:
+                print('Cannot read cache file: ' + cacheFile)
+                return 1
+            return closeStore()
 
     #
-    # Get a unique list of all MGI IDs from the temp table.
+    # Get each marker with its EntrezGene IDs, Ensembl gene model IDs and
+    # EMBL IDs (comma-separated), aggregated by the server in one pass,
+    # or in one pass per range of marker keys (in parallel).
     #
-    cmd = '''
-        select distinct mgiID, symbol, _Marker_Type_key, _Marker_Status_key
-        from assoc 
-        order by mgiID
-        '''
-    results = db.sql(cmd, 'auto')
+    # The rows are in column order: strings from the COPY text, or typed
+    # values from the cursor.
+    #
+    if mgiWorkers > 1:
+        cmds = [rangeQuery(r) for r in markerRanges(mgiWorkers)]
+        print('Extracting %d marker key ranges in parallel' % len(cmds))
+        results = PgStream.merge(cmds, key=lambda r: r[0], useCopy=dbCopy)
+    elif dbCopy:
+        results = PgStream.copy(assocQuery())
+    else:
+        results = PgStream.stream(assocQuery(), raw=1)
 
     #
-    # For each MGI ID, get the associated IDs from the dictionaries and
-    # write them to the association file.
+    # For each MGI ID (as it is fetched), write the associated IDs to the
+    # association file.
     #
     print("\nWithdrawn Markers")
-    for r in results:
+    for (mgiID, symbol, markerType, markerStatus,
+         entrezgeneIDs, ensemblIDs, emblIDs) in results:
 
-        mgiID = r['mgiID']
-        symbol = r['symbol']
-        markerType = r['_Marker_Type_key']
-        markerStatus = r['_Marker_Status_key']
-
-        if mgiID in entrezgeneDict:
-            entrezgeneID = entrezgeneDict[mgiID]
-        else:
-            entrezgeneID = []
-
-        if mgiID in ensemblDict:
-            ensemblID = ensemblDict[mgiID]
-        else:
-            ensemblID = []
-
-        if mgiID in emblDict:
-            emblID = emblDict[mgiID]
-        else:
-            emblID = []
+        markerStatus = int(markerStatus)
+        entrezgeneID = splitIDs(entrezgeneIDs)
+        ensemblID = splitIDs(ensemblIDs)
+        emblID = splitIDs(emblIDs)
 
         #
         # Write the IDs to the association file. If there is more than one
@@ -309,7 +519,42 @@ def getAssociations():
                       ','.join(ensemblID) + '\t' + \
                       ','.join(emblID) + '\n')
 
+            if store:
+                store.add((mgiID, symbol, markerType),
+                          ((UniProtStore.XREF_ENTREZGENE, entrezgeneID),
+                           (UniProtStore.XREF_ENSEMBL, ensemblID),
+                           (UniProtStore.XREF_EMBL, emblID)))
+
     print("\n")
+
+    #
+    # Save the association file for the next run.
+    #
+    if fingerprint is not None:
+        try:
+            saveCache(fingerprint)
+        except:
+            print('Cannot write cache file: ' + cacheFile)
+
+    return closeStore()
+
+
+#
+# Purpose: Index the SQLite database.
+# Returns: 1 if the database cannot be written, else 0
+# Assumes: Nothing
+# Effects: Closes the store
+# Throws: Nothing
+#
+def closeStore():
+
+    if store:
+        try:
+            store.close()
+        except:
+            print('Cannot write database: ' + storeFile)
+            return 1
+
     return 0
 
 
@@ -328,4 +573,5 @@ if getAssociations() != 0:
     sys.exit(1)
 
 closeFiles()
+PgStream.close()
 sys.exit(0)
@@ -0,0 +1,196 @@
+#
+#  makeTestUniProtFile.py
+###########################################################################
+#
+#  Purpose:
+#
+#      This script will write a synthetic UniProt flat file, for measuring
+#      the speed of the UniProt parser (see benchUniProtParser.py) without
+#      a production-size input file.
+#
+#      The entries have the line types that the parser reads (ID, AC, DE,
+#      GN, OX, DR, KW, SQ) and the ones that it skips (DT, OS, OC, RN..RL,
+#      CC, FT, sequence), with random cross-references.
+#
+#  Usage:
+#
+#      makeTestUniProtFile.py [options] outputfile
+#
+#      options (defaults in parentheses):
+#
+#      -n entries          number of entries (100000)
+#      --trembl fraction   fraction of TrEMBL (unreviewed) entries (0.6)
+#      --other-taxa fraction
+#                          fraction of non-mouse entries (0)
+#      --embl n            maximum number of DR EMBL lines per entry (4)
+#      --pdb n             maximum number of DR PDB lines per entry (3)
+#      --pdb-heavy fraction
+#                          fraction of entries with --pdb-heavy-count
+#                          DR PDB lines (0.01)
+#      --pdb-heavy-count n (300)
+#      --ensembl n         maximum number of DR Ensembl lines per entry (2)
+#      --interpro n        maximum number of DR InterPro lines per entry (3)
+#      --ec n              maximum number of DE EC lines per entry (2)
+#      --kw n              maximum number of key words per entry (5)
+#      --seed n            random seed (1)
+#
+#      An output file name ending in .gz is gzip-compressed.
+#
+#  Inputs:  None
+#
+#  Outputs:
+#
+#      - Synthetic UniProt file
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Notes:  None
+#
+###########################################################################
+
+import sys
+import gzip
+import random
+import argparse
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+KEYWORDS = [ '3D-structure', 'Acetylation', 'Alternative initiation',
+             'Cytoplasm', 'Reference proteome', 'Phosphoprotein', 'Nucleus',
+             'Zinc', 'Metal-binding', 'Membrane' ]
+
+OTHER_TAXA = [ '9606', '10116' ]
+
+#
+# Purpose: Write one synthetic entry.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to fp
+# Throws: Nothing
+#
+def writeEntry(fp, i, args):
+
+    acc = 'Q%05d' % i
+    trembl = random.random() < args.trembl
+    seqlen = random.randint(50, 900)
+    if random.random() < args.other_taxa:
+        taxon = random.choice(OTHER_TAXA)
+    else:
+        taxon = '10090'
+
+    if trembl:
+        status = 'Unreviewed'
+    else:
+        status = 'Reviewed'
+
+    lines = []
+    lines.append('ID   P%05d_MOUSE             %s;         %d AA.' % (i, status, seqlen))
+    lines.append('AC   %s;%s' % (acc, ''.join([' A%05d;' % random.randint(0, 99999)
+                                   for k in range(random.randint(0, 3))])))
+    if random.random() < 0.3:
+        lines.append('AC   B%05d; B%05d;' % (i, i + 1))
+    lines.append('DT   01-JAN-2001, integrated into UniProtKB/Swiss-Prot.')
+    lines.append('DE   RecName: Full=Protein %d;' % i)
+    for k in range(random.randint(0, args.ec)):
+        lines.append('DE            EC=%d.%d.%d.%d%s;' % (random.randint(1, 6),
+                     random.randint(1, 9), random.randint(1, 9), random.randint(1, 99),
+                     random.choice(['', ' {ECO:0000256|ARBA:ARBA00012513}'])))
+    if random.random() < 0.8:
+        lines.append('GN   Name=Gene%d; Synonyms=Gs%d, Gx%d;' % (i, i, i))
+    lines.append('OS   Mus musculus (Mouse).')
+    lines.append('OC   Eukaryota; Metazoa; Chordata.')
+    lines.append('OX   NCBI_TaxID=%s;' % taxon)
+    lines.append('RN   [1]')
+    lines.append('RA   Someone A.;')
+    lines.append('RT   "A title.";')
+    lines.append('RL   J. Biol. 1:1-2(2000).')
+    lines.append('CC   -!- FUNCTION: Does things.')
+
+    for k in range(random.randint(0, args.embl)):
+        lines.append('DR   EMBL; AK%06d; BAB%05d.1; -; %s.' % (random.randint(0, 5000), i,
+                     random.choice(['mRNA', 'Genomic_DNA'])))
+
+    if random.random() < args.pdb_heavy:
+        npdb = args.pdb_heavy_count
+    else:
+        npdb = random.randint(0, args.pdb)
+    for k in range(npdb):
+        lines.append('DR   PDB; %dX%02d; X-ray; 3.10 A; A/B=1-589.' % (k % 10, k))
+        lines.append('DR   PDBsum; %dX%02d; -.' % (k % 10, k))
+
+    if random.random() < 0.7:
+        lines.append('DR   GeneID; %d; -.' % random.randint(10000, 12000))
+
+    for k in range(random.randint(0, args.ensembl)):
+        g = random.randint(0, 3000)
+        lines.append('DR   Ensembl; ENSMUST%011d.4; ENSMUSP%011d.4; ENSMUSG%011d.%d.%s' % (g, g, g,
+                     random.randint(1, 5), random.choice(['', ' [%s-1]' % acc])))
+
+    for k in range(random.randint(0, args.interpro)):
+        lines.append('DR   InterPro; IPR%06d; Domain.' % random.randint(0, 999))
+
+    if random.random() < 0.5:
+        lines.append('DR   MGI; MGI:%d; Gene%d.' % (random.randint(1, 3000), i))
+
+    lines.append('DR   Pfam; PF00244; 14-3-3; 1.')
+
+    if args.kw > 0:
+        lines.append('KW   %s.' % '; '.join(random.sample(KEYWORDS,
+                     random.randint(1, min(args.kw, len(KEYWORDS))))))
+
+    lines.append('FT   CHAIN           1..%d' % seqlen)
+    lines.append('FT                   /note="x"')
+    lines.append('SQ   SEQUENCE   %d AA;  %d MW;  %016X CRC64;' % (seqlen, seqlen * 110,
+                 random.getrandbits(64)))
+
+    seq = ''.join([random.choice(AMINO_ACIDS) for k in range(seqlen)])
+    for p in range(0, seqlen, 60):
+        s = seq[p:p + 60]
+        lines.append('     ' + ' '.join([s[j:j + 10] for j in range(0, len(s), 10)]))
+
+    lines.append('//')
+
+    fp.write('\n'.join(lines) + '\n')
+
+
+#
+#  MAIN
+#
+
+parser = argparse.ArgumentParser(description='Write a synthetic UniProt file.')
+parser.add_argument('outputfile')
+parser.add_argument('-n', type=int, default=100000, dest='entries')
+parser.add_argument('--trembl', type=float, default=0.6)
+parser.add_argument('--other-taxa', type=float, default=0.0)
+parser.add_argument('--embl', type=int, default=4)
+parser.add_argument('--pdb', type=int, default=3)
+parser.add_argument('--pdb-heavy', type=float, default=0.01)
+parser.add_argument('--pdb-heavy-count', type=int, default=300)
+parser.add_argument('--ensembl', type=int, default=2)
+parser.add_argument('--interpro', type=int, default=3)
+parser.add_argument('--ec', type=int, default=2)
+parser.add_argument('--kw', type=int, default=5)
+parser.add_argument('--seed', type=int, default=1)
+args = parser.parse_args()
+
+random.seed(args.seed)
+
+try:
+    if args.outputfile.endswith('.gz'):
+        fp = gzip.open(args.outputfile, 'wt')
+    else:
+        fp = open(args.outputfile, 'w')
+except:
+    print('Cannot open output file: ' + args.outputfile)
+    sys.exit(1)
+
+for i in range(args.entries):
+    writeEntry(fp, i, args)
+
+fp.close()
+sys.exit(0)
@@ -8,7 +8,7 @@
 #      output files that contain:
 #
 #      1) all of the EntrezGene IDs, Ensembl gene model IDs, EMBL IDs,
-#         EC ids, PDB ids, InterPro ids, SwissProt key words
+#         EC ids, PDB ids, InterPro ids, SwissProt key words, MGI ids
 #         that are associated with each UniProt ID.
 #         (all)
 #
@@ -20,10 +20,22 @@
 #         no EMBL ids (error file)
 #	  formats:  all, SwissProt and TrEMBL
 #
+#      5) the protein attributes of all of the UniProt IDs (protein file)
+#
+#      6) files derived from 1) with one column each (InterPro, reference
+#         proteome, EC, PDB), for the later stages that need only that column
+#
 #  Usage:
 #
 #      makeUniProtAssocFile.py
 #
+#      INPUTFILE may be "-" (stdin) or a named pipe, e.g.
+#
+#          curl -s ${URL} | INPUTFILE=- makeUniProtAssocFile.py
+#
+#      so that the entries are parsed as they are downloaded.  A stream is
+#      parsed line by line in one process, and is not cached.
+#
 #  Env Vars:
 #
 #      The following environment variables are set by the configuration
@@ -36,10 +48,37 @@
 #          UNIPROT_SP_ASSOC_ERR_FILE
 #          UNIPROT_TR_ASSOC_FILE
 #          UNIPROT_TR_ASSOC_ERR_FILE
+#          UNIPROT_PROTEIN_FILE
+#
+#      Optional:
+#
+#          PARSER_MMAP (true: memory-map the UniProt input file)
+#          PARSER_WORKERS (number of parser processes; default 1)
+#          PARSER_GZ_INDEX (gzip member index of a compressed INPUTFILE)
+#          PARSER_TAXON (NCBI taxonomy ID; parse only the records for this
+#                        organism, e.g. 10090 to read a full UniProtKB release)
+#          UNIPROT_INDEX_FILE (accession index of INPUTFILE; see fetchUniProt.py)
+#          PARSER_CACHE (cache of the parsed records; see Notes)
+#          PARSER_STATS (true: print parser statistics at the end)
+#          PARSER_READAHEAD (true: read a plain INPUTFILE on a background
+#                            thread when it is parsed line by line)
+#          PARSER_CHECKPOINT (checkpoint file; see Notes)
+#          PARSER_CHECKPOINT_RECORDS (records between checkpoints)
+#          PARSER_RESUME (true: resume from PARSER_CHECKPOINT)
+#          UNIPROT_HASH_FILE (content hash of each record)
+#          UNIPROT_HASH_PREV_FILE (content hashes from the previous load)
+#          UNIPROT_DELTA_FILE (records added/changed/removed since then)
+#          UNIPROT_INTERPRO_FILE
+#          UNIPROT_REFPROTEOME_FILE
+#          UNIPROT_EC_FILE
+#          UNIPROT_PDB_FILE
+#          UNIPROT_MGI_XREF_FILE
+#          UNIPROT_STORE (SQLite database; see UniProtStore.py)
 #
 #  Inputs:
 #
-#      - Mouse-only UniProt file ($INPUTFILE)
+#      - Mouse-only UniProt file ($INPUTFILE), plain or gzip-compressed,
+#        or a stream of it (stdin or a named pipe)
 #
 #  Outputs:
 #
@@ -57,6 +96,7 @@
 #        6) PDB IDs (comma-separated)
 #        7) InterPro IDs (comma-separated)
 #        8) SPKW Names (comma-separated)
+#        9) EMBL IDs (comma-separated)
 #
 #      - SwissProt association file ($UNIPROT_SP_ASSOC_FILE) 
 #      - SwissProt association file ($UNIPROT_SP_ASSOC_ERR_FILE) 
@@ -68,6 +108,63 @@
 #	 It has the following tab-delimited fields:
 #        1) UniProt ID (TrEMBL)
 #
+#      - Protein file ($UNIPROT_PROTEIN_FILE)
+#	 It has the following tab-delimited fields:
+#        1) UniProt ID
+#        2) Secondary UniProt accession ids (comma-separated)
+#        3) NCBI taxonomy ID
+#        4) Gene names (comma-separated)
+#        5) Sequence length
+#        6) 1 if the protein is in the reference proteome, else 0
+#
+#      - Accession index ($UNIPROT_INDEX_FILE), if the UniProt file is
+#        parsed memory-mapped or in parallel
+#	 It has the following tab-delimited fields:
+#        1) UniProt ID or secondary accession
+#        2) P (UniProt ID) or S (secondary accession)
+#        3) byte offset of the entry in the (uncompressed) UniProt file
+#        4) length of the entry
+#
+#      - Content hash file ($UNIPROT_HASH_FILE)
+#	 It has the following tab-delimited fields:
+#        1) UniProt ID
+#        2) hash of the record's ids, key words, gene names, taxon,
+#           sequence length and sequence checksum (every field written by
+#           the load)
+#
+#      - Delta file ($UNIPROT_DELTA_FILE), if $UNIPROT_HASH_PREV_FILE exists
+#	 It has the following tab-delimited fields:
+#        1) UniProt ID
+#        2) added, changed or removed (since the previous load)
+#
+#      - Derived files, for the UniProt IDs in $UNIPROT_ACC_ASSOC_FILE
+#        (see UniProtSink.py); each is written to a temporary file that is
+#        renamed when the file is complete:
+#
+#        UniProt/InterPro file ($UNIPROT_INTERPRO_FILE)
+#        1) UniProt ID
+#        2) InterPro ID
+#
+#        Reference proteome file ($UNIPROT_REFPROTEOME_FILE)
+#        1) UniProt ID (SPKW "Reference proteome")
+#
+#        UniProt/EC file ($UNIPROT_EC_FILE)
+#        1) UniProt ID
+#        2) EC ID
+#
+#        UniProt/PDB file ($UNIPROT_PDB_FILE)
+#        1) UniProt ID
+#        2) PDB ID
+#
+#        UniProt/MGI file ($UNIPROT_MGI_XREF_FILE), read by makeBuckets.py
+#        1) UniProt ID
+#        2) MGI ID (DR MGI cross-reference)
+#
+#      - The uniprot and uniprot_xref tables of the SQLite database
+#        ($UNIPROT_STORE): every UniProt ID of the association and error
+#        files, its Swiss-Prot/TrEMBL status and its cross-references,
+#        indexed on the UniProt ID and on each cross-reference ID
+#
 #  Exit Codes:
 #
 #      0:  Successful completion
@@ -86,7 +183,32 @@
 #      4) Write each UniProt ID and its associated ids to the association file.
 #      5) Close files.
 #
-#  Notes:  None
+#  Notes:
+#
+#      If PARSER_CACHE is set, the parsed records are saved to that file,
+#      keyed by the size, modification time and checksum of INPUTFILE
+#      (and the parser settings, including whether the records have input
+#      offsets).  When the script is run again on the same input file
+#      (e.g. after a later step of the load failed), the output files are
+#      written from the cache instead of parsing INPUTFILE.  If the cache
+#      file cannot be written, the script continues without it.
+#
+#      UNIPROT_HASH_PREV_FILE is replaced by UNIPROT_HASH_FILE by
+#      uniprotload.sh at the end of a successful load, so that a rerun
+#      after a failure reports the same delta.
+#
+#      If PARSER_CHECKPOINT is set and INPUTFILE is a plain file that is
+#      memory-mapped or parsed in parallel, a checkpoint is saved every
+#      PARSER_CHECKPOINT_RECORDS records: the input byte offset after the
+#      last record written, the size of each output file and the number of
+#      records.  If the script dies and is run again with PARSER_RESUME=true,
+#      the output files are truncated to the checkpoint and parsing continues
+#      from the checkpoint offset, so the output files are the same as after
+#      an uninterrupted run (the parsed records are not cached by a resumed
+#      run).  The checkpoint is removed when the script completes.  If an
+#      output file is missing or shorter than at the checkpoint, parsing
+#      starts from the beginning.  uniprotload.sh does not archive OUTPUTDIR
+#      when it resumes, so keep PARSER_CHECKPOINT outside OUTPUTDIR.
 #
 #  05/09/2012	lec
 #	- TR11037/add UniProt association error file ($UNIPROT_ACC_ASSOC_ERR_FILE)
@@ -95,7 +217,13 @@
 
 import sys 
 import os
+import multiprocessing
 import UniProtParser
+import UniProtRecord
+import UniProtReader
+import UniProtCache
+import UniProtSink
+import UniProtStore
 
 # INPUTFILE
 uniprotFile = None
@@ -118,6 +246,87 @@ uniprotTRAssocFile = None
 # UNIPROT_TR_ASSOC_ERR_FILE
 uniprotTRAssocErrFile = None
 
+# UNIPROT_PROTEIN_FILE
+uniprotProteinFile = None
+
+# PARSER_MMAP
+parserMapped = 0
+
+# PARSER_WORKERS
+parserWorkers = 1
+
+# PARSER_GZ_INDEX
+gzIndexFile = None
+
+# PARSER_TAXON
+parserTaxon = None
+
+# UNIPROT_INDEX_FILE
+uniprotIndexFile = None
+
+# PARSER_CACHE
+parserCacheFile = None
+
+# PARSER_STATS: the parser statistics, or None
+parserStats = None
+
+# UNIPROT_HASH_FILE
+uniprotHashFile = None
+
+# UNIPROT_HASH_PREV_FILE
+uniprotHashPrevFile = None
+
+# UNIPROT_DELTA_FILE
+uniprotDeltaFile = None
+
+# previous content hash of each UniProt ID (UNIPROT_HASH_PREV_FILE);
+# None if there is no previous hash file
+prevHash = None
+
+# PARSER_CHECKPOINT
+checkpointFile = None
+
+# PARSER_CHECKPOINT_RECORDS
+checkpointRecords = 100000
+
+# PARSER_RESUME
+parserResume = 0
+
+# 1 if checkpoints are saved (see openFiles())
+checkpointing = 0
+
+# the checkpoint that this run resumes from, or None
+# looks like:  {'offset' : '123', 'records' : '4', 'files' : {path : size, ...}, ...}
+checkpoint = None
+
+# output file name -> file pointer (the files saved by a checkpoint)
+outputFiles = {}
+
+# derived files: environment variable -> row function (see UniProtSink.py)
+SINK_FILES = [ ('UNIPROT_INTERPRO_FILE', UniProtSink.interproRows),
+               ('UNIPROT_REFPROTEOME_FILE', UniProtSink.refProteomeRows),
+               ('UNIPROT_EC_FILE', UniProtSink.ecRows),
+               ('UNIPROT_PDB_FILE', UniProtSink.pdbRows),
+               ('UNIPROT_MGI_XREF_FILE', UniProtSink.mgiRows) ]
+
+# the UniProtSink.Sink of each derived file that is set
+sinks = []
+
+# UNIPROT_STORE
+uniprotStoreFile = None
+
+# UniProtStore.StoreWriter of the uniprot table
+store = None
+
+# 1 if INPUTFILE is gzip-compressed
+inputGzip = 0
+
+# 1 if INPUTFILE is a stream (stdin or a named pipe)
+inputStream = 0
+
+# gzip member index of INPUTFILE, for parallel parsing
+gzIndex = None
+
 # file pointers
 fpUniProt = None
 fpAccAssoc = None
@@ -126,6 +335,10 @@ fpSPAssoc = None
 fpSPAssocErr = None
 fpTRAssoc = None
 fpTRAssocErr = None
+fpProtein = None
+fpHash = None
+fpDelta = None
+fpIndex = None
 
 #
 # Purpose: Initialization
@@ -137,7 +350,12 @@ fpTRAssocErr = None
 def initialize():
     global uniprotFile, uniprotAccAssocFile, uniprotAccAssocErrFile
     global uniprotSPAssocFile, uniprotSPAssocErrFile
-    global uniprotTRAssocFile, uniprotTRAssocErrFile
+    global uniprotTRAssocFile, uniprotTRAssocErrFile, uniprotProteinFile
+    global parserMapped, parserWorkers, gzIndexFile, parserTaxon
+    global uniprotIndexFile, parserCacheFile, parserStats
+    global uniprotHashFile, uniprotHashPrevFile, uniprotDeltaFile
+    global checkpointFile, checkpointRecords, parserResume
+    global uniprotStoreFile
     global fpUniProt, fpAccAssoc, fpAccAssocErr, fpSPAssoc, fpTRAssoc
 
     uniprotFile = os.getenv('INPUTFILE')
@@ -147,9 +365,43 @@ def initialize():
     uniprotSPAssocErrFile = os.getenv('UNIPROT_SP_ASSOC_ERR_FILE')
     uniprotTRAssocFile = os.getenv('UNIPROT_TR_ASSOC_FILE')
     uniprotTRAssocErrFile = os.getenv('UNIPROT_TR_ASSOC_ERR_FILE')
+    uniprotProteinFile = os.getenv('UNIPROT_PROTEIN_FILE')
+
+    gzIndexFile = os.getenv('PARSER_GZ_INDEX')
+    parserTaxon = os.getenv('PARSER_TAXON') or None
+    uniprotIndexFile = os.getenv('UNIPROT_INDEX_FILE')
+    parserCacheFile = os.getenv('PARSER_CACHE')
+    uniprotHashFile = os.getenv('UNIPROT_HASH_FILE')
+    uniprotHashPrevFile = os.getenv('UNIPROT_HASH_PREV_FILE')
+    uniprotDeltaFile = os.getenv('UNIPROT_DELTA_FILE')
+    checkpointFile = os.getenv('PARSER_CHECKPOINT')
+    uniprotStoreFile = os.getenv('UNIPROT_STORE')
 
     rc = 0
 
+    if os.getenv('PARSER_RESUME') == 'true':
+        parserResume = 1
+
+    if os.getenv('PARSER_CHECKPOINT_RECORDS'):
+        try:
+            checkpointRecords = int(os.getenv('PARSER_CHECKPOINT_RECORDS'))
+        except:
+            print('Invalid PARSER_CHECKPOINT_RECORDS: ' + os.getenv('PARSER_CHECKPOINT_RECORDS'))
+            rc = 1
+
+    if os.getenv('PARSER_MMAP') == 'true':
+        parserMapped = 1
+
+    if os.getenv('PARSER_STATS') == 'true':
+        parserStats = UniProtParser.ParserStats()
+
+    if os.getenv('PARSER_WORKERS'):
+        try:
+            parserWorkers = int(os.getenv('PARSER_WORKERS'))
+        except:
+            print('Invalid PARSER_WORKERS: ' + os.getenv('PARSER_WORKERS'))
+            rc = 1
+
     #
     # Make sure the environment variables are set.
     #
@@ -181,6 +433,10 @@ def initialize():
         print('Environment variable not set: UNIPROT_TR_ASSOC_ERR_FILE')
         rc = 1
 
+    if not uniprotProteinFile:
+        print('Environment variable not set: UNIPROT_PROTEIN_FILE')
+        rc = 1
+
     #
     # Initialize file pointers.
     #
@@ -207,21 +463,56 @@ def openFiles():
     global fpSPAssoc, fpSPAssocErr
     global fpTRAssoc, fpTRAssocErr
     global fpPDBAssoc, fpECAssoc, fpIPAssoc, fpKWAssoc
+    global fpProtein, fpHash, fpDelta, fpIndex, prevHash
+    global inputGzip, inputStream
+    global checkpointing, checkpoint, store
 
     #
     # Open the UniProt file.
+    # A gzip-compressed file is decompressed on a background thread.
+    # A plain file that is read line by line is read ahead on a background
+    # thread if PARSER_READAHEAD is true (a memory-mapped file is not).
     #
+    readAhead = os.getenv('PARSER_READAHEAD') == 'true' \
+                and not parserMapped and parserWorkers <= 1
+
+    # A stream (stdin or a named pipe) is read ahead, and decompressed if
+    # necessary, as it arrives.
+    #
+    inputStream = UniProtReader.isStream(uniprotFile)
+
     try:
-        fpUniProt = open(uniprotFile, 'r')
+        if inputStream:
+            fpUniProt = UniProtReader.openStream(uniprotFile)
+        else:
+            inputGzip = UniProtReader.isGzip(uniprotFile)
+            fpUniProt = UniProtReader.openInput(uniprotFile, readAhead)
     except:
         print('Cannot open file: ' + uniprotFile)
         return 1
 
+    #
+    # Checkpoints need the byte offset of each record in the input file.
+    # When resuming, the output files are opened at the checkpoint.
+    #
+    checkpointing = checkpointFile and not inputStream and not inputGzip \
+                    and (parserMapped or parserWorkers > 1)
+
+    if checkpointFile and not checkpointing:
+        print('Not saving checkpoints: INPUTFILE is not parsed from a plain, memory-mapped file')
+
+    if checkpointing and parserResume:
+        try:
+            checkpoint = readCheckpoint()
+        except:
+            print('Cannot read checkpoint file: ' + checkpointFile)
+            return 1
+
     #
     # Open the acc association file.
     #
     try:
-        fpAccAssoc = open(uniprotAccAssocFile, 'w')
+        fpAccAssoc = openOutput(uniprotAccAssocFile)
     except:
         print('Cannot open association file: ' + uniprotAccAssocFile)
         return 1
@@ -230,7 +521,7 @@ def openFiles():
     # Open the acc association error file.
     #
     try:
-        fpAccAssocErr = open(uniprotAccAssocErrFile, 'w')
+        fpAccAssocErr = openOutput(uniprotAccAssocErrFile)
     except:
         print('Cannot open association error file: ' + uniprotAccAssocErrFile)
         return 1
@@ -239,7 +530,7 @@ def openFiles():
     # Open the acc association file.
     #
     try:
-        fpSPAssoc = open(uniprotSPAssocFile, 'w')
+        fpSPAssoc = openOutput(uniprotSPAssocFile)
     except:
         print('Cannot open association file: ' + uniprotSPAssocFile)
         return 1
@@ -248,7 +539,7 @@ def openFiles():
     # Open the acc association file.
     #
     try:
-        fpSPAssocErr = open(uniprotSPAssocErrFile, 'w')
+        fpSPAssocErr = openOutput(uniprotSPAssocErrFile)
     except:
         print('Cannot open association file: ' + uniprotSPAssocErrFile)
         return 1
@@ -257,7 +548,7 @@ def openFiles():
     # Open the acc association file.
     #
     try:
-        fpTRAssoc = open(uniprotTRAssocFile, 'w')
+        fpTRAssoc = openOutput(uniprotTRAssocFile)
     except:
         print('Cannot open association file: ' + uniprotTRAssocFile)
         return 1
@@ -266,14 +557,204 @@ def openFiles():
     # Open the acc association file.
     #
     try:
-        fpTRAssocErr = open(uniprotTRAssocErrFile, 'w')
+        fpTRAssocErr = openOutput(uniprotTRAssocErrFile)
     except:
         print('Cannot open association file: ' + uniprotTRAssocErrFile)
         return 1
 
+    #
+    # Open the protein file.
+    #
+    try:
+        fpProtein = openOutput(uniprotProteinFile)
+    except:
+        print('Cannot open protein file: ' + uniprotProteinFile)
+        return 1
+
+    #
+    # Open the content hash file, and read the previous content hashes
+    # and open the delta file if there are previous hashes.
+    #
+    if uniprotHashFile:
+        try:
+            fpHash = openOutput(uniprotHashFile)
+        except:
+            print('Cannot open hash file: ' + uniprotHashFile)
+            return 1
+
+        if uniprotHashPrevFile and uniprotDeltaFile \
+                and os.path.exists(uniprotHashPrevFile):
+            try:
+                prevHash = {}
+                fp = open(uniprotHashPrevFile, 'r')
+                for line in fp:
+                    tokens = line[:-1].split('\t')
+                    prevHash[tokens[0]] = tokens[1]
+                fp.close()
+            except:
+                print('Cannot read hash file: ' + uniprotHashPrevFile)
+                return 1
+
+            #
+            # When resuming, the records before the checkpoint have
+            # already been compared.
+            #
+            if checkpoint:
+                fpHash.flush()
+                fp = open(uniprotHashFile, 'r')
+                for line in fp:
+                    prevHash.pop(line.split('\t', 1)[0], None)
+                fp.close()
+
+            try:
+                fpDelta = openOutput(uniprotDeltaFile)
+            except:
+                print('Cannot open delta file: ' + uniprotDeltaFile)
+                return 1
+
+    #
+    # Open the derived files.
+    #
+    for (name, rows) in SINK_FILES:
+        path = os.getenv(name)
+        if not path:
+            continue
+        try:
+            sinks.append(UniProtSink.Sink(path, rows, openOutput))
+        except:
+            print('Cannot open file: ' + path)
+            return 1
+
+    #
+    # Open the accession index entries file (sorted into the index at
+    # the end).
+    #
+    if uniprotIndexFile:
+        try:
+            fpIndex = openOutput(uniprotIndexFile + '.entries')
+        except:
+            print('Cannot open index file: ' + uniprotIndexFile + '.entries')
+            return 1
+
+    #
+    # Open the SQLite database (the rows committed by the checkpoint are
+    # kept when resuming).
+    #
+    if uniprotStoreFile:
+        if checkpoint:
+            keep = int(checkpoint['records'])
+        else:
+            keep = 0
+        try:
+            store = UniProtStore.StoreWriter(uniprotStoreFile, 'uniprot', keep)
+        except:
+            print('Cannot open database: ' + uniprotStoreFile)
+            return 1
+
     return 0
 
 
+#
+# Purpose: Open an output file for writing; when resuming from a
+#          checkpoint, open it at the size saved by the checkpoint.
+# Returns: File pointer
+# Assumes: Nothing
+# Effects: Adds the file to outputFiles
+# Throws: OSError, KeyError if the checkpoint has no size for the file
+#
+def openOutput(path):
+
+    if checkpoint:
+        fp = open(path, 'r+')
+        fp.truncate(checkpoint['files'][path])
+        fp.seek(0, 2)
+    else:
+        fp = open(path, 'w')
+
+    outputFiles[path] = fp
+
+    return fp
+
+
+#
+# Purpose: Read the checkpoint file.
+# Returns: The checkpoint, or None if there is no checkpoint for INPUTFILE
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: OSError, ValueError
+#
+def readCheckpoint():
+
+    if not os.path.exists(checkpointFile):
+        print('No checkpoint; parsing from the beginning')
+        return None
+
+    state = { 'files' : {} }
+    fp = open(checkpointFile, 'r')
+    for line in fp:
+        tokens = line[:-1].split('\t')
+        if tokens[0] == 'file':
+            state['files'][tokens[1]] = int(tokens[2])
+        else:
+            state[tokens[0]] = tokens[1]
+    fp.close()
+
+    stat = os.stat(uniprotFile)
+    if state['input'] != uniprotFile \
+            or int(state['size']) != stat.st_size \
+            or int(state['mtime']) != stat.st_mtime_ns \
+            or state['taxon'] != (parserTaxon or ''):
+        print('The checkpoint is for another input file; parsing from the beginning')
+        return None
+
+    #
+    # The output files must still hold the records before the checkpoint
+    # (e.g. they were not archived).
+    #
+    for (path, size) in state['files'].items():
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            print('The output files of the checkpoint are missing or short (' + path + '); parsing from the beginning')
+            return None
+
+    return state
+
+
+#
+# Purpose: Save a checkpoint.
+# Returns: Nothing
+# Assumes: Every record before 'offset' has been written
+# Effects: Flushes the output files to disk and replaces the checkpoint
+#          file (via a temporary file)
+# Throws: OSError
+#
+def writeCheckpoint(offset, records):
+
+    stat = os.stat(uniprotFile)
+
+    for sink in sinks:
+        sink.flush()
+
+    if store:
+        store.commit()
+
+    fp = open(checkpointFile + '.tmp', 'w')
+    fp.write('input\t%s\n' % uniprotFile)
+    fp.write('size\t%d\n' % stat.st_size)
+    fp.write('mtime\t%d\n' % stat.st_mtime_ns)
+    fp.write('taxon\t%s\n' % (parserTaxon or ''))
+    fp.write('offset\t%d\n' % offset)
+    fp.write('records\t%d\n' % records)
+    for (path, fpOutput) in outputFiles.items():
+        fpOutput.flush()
+        os.fsync(fpOutput.fileno())
+        fp.write('file\t%s\t%d\n' % (path, fpOutput.tell()))
+    fp.flush()
+    os.fsync(fp.fileno())
+    fp.close()
+
+    os.replace(checkpointFile + '.tmp', checkpointFile)
+
+
 #
 # Purpose: Close files.
 # Returns: 1 if file does not exist or is not readable, else 0
@@ -304,9 +785,246 @@ def closeFiles():
     if fpTRAssocErr:
         fpTRAssocErr.close()
 
+    if fpProtein:
+        fpProtein.close()
+
+    if fpHash:
+        fpHash.close()
+
+    if fpDelta:
+        fpDelta.close()
+
+    if fpIndex:
+        fpIndex.close()
+
     return 0
 
 
+#
+# Purpose: Parse the UniProt input file in parallel.  The file is split
+#          into ranges on record boundaries and each range is parsed by
+#          a UniProtParser object in a separate process.
+#          A compressed file is split on its gzip members (gzIndex).
+# Returns: A generator of record objects, in input file order
+# Assumes: INPUTFILE is a regular file
+# Effects: Nothing
+# Throws: Nothing
+#
+def parallelRecords(start=0):
+
+    #
+    # Every parsed record is pickled back to this process, so the ranges
+    # are kept large: two per worker, so that the workers parse the second
+    # half of the file while the records of the first are written.
+    #
+    if inputGzip:
+        ranges = UniProtReader.splitGzip(gzIndex, parserWorkers * 2)
+        worker = parseGzipRange
+    else:
+        ranges = UniProtParser.splitFile(fpUniProt, parserWorkers * 2, start)
+        worker = parseRange
+
+    pool = multiprocessing.get_context('fork').Pool(parserWorkers)
+    for (states, stats) in pool.imap(worker, ranges):
+        if stats:
+            parserStats.merge(stats)
+        for state in states:
+            yield UniProtRecord.fromState(state)
+    pool.close()
+    pool.join()
+
+
+#
+# Purpose: Parse one byte range of the UniProt input file (worker process).
+# Returns: (list of record attribute tuples (Record.__getstate__()),
+#           parser statistics or None)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def parseRange(range):
+
+    (start, end) = range
+
+    if parserStats:
+        stats = UniProtParser.ParserStats()
+    else:
+        stats = None
+
+    fp = open(uniprotFile, 'r')
+    parser = UniProtParser.Parser(fp, mapped=1, start=start, end=end,
+                                  taxon=parserTaxon, stats=stats)
+    states = [rec.__getstate__() for rec in parser.records()]
+    parser.close()
+    fp.close()
+
+    return (states, stats)
+
+
+#
+# Purpose: Parse the records that start in a range of gzip members of the
+#          compressed UniProt input file (worker process).
+# Returns: (list of record attribute tuples (Record.__getstate__()),
+#           parser statistics or None)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def parseGzipRange(range):
+
+    (i, j) = range
+
+    if parserStats:
+        stats = UniProtParser.ParserStats()
+    else:
+        stats = None
+
+    (buffer, start, end) = UniProtReader.readGzipRange(uniprotFile, gzIndex, i, j)
+    parser = UniProtParser.Parser(None, buffer=buffer, start=start, end=end,
+                                  taxon=parserTaxon, baseOffset=gzIndex[i][1],
+                                  stats=stats)
+
+    return ([rec.__getstate__() for rec in parser.records()], stats)
+
+
+#
+# Purpose: Write one UniProt record to the association files.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to the association/error files
+# Throws: Nothing
+#
+def writeRecord(rec):
+
+    #
+    # Get the IDs from the record.
+    #
+    uniprotID = rec.getUniProtID()
+    entrezgeneID = rec.getEntrezGeneID()
+    ensemblID = rec.getEnsemblID()
+    isTrembl = rec.getIsTrembl()
+    pdbID = rec.getPDBID()
+    ecID = rec.getECID()
+    ipID = rec.getInterProID()
+    kwName = rec.getKWName()
+    emblID = rec.getEMBLID()
+    mgiID = rec.getMGIID()
+
+    #
+    # protein attributes
+    #
+    fpProtein.write(uniprotID + '\t' + \
+                    ','.join(rec.getSecondaryID()) + '\t' + \
+                    rec.getTaxonID() + '\t' + \
+                    ','.join(rec.getGeneName()) + '\t' + \
+                    str(rec.getSequenceLength()) + '\t' + \
+                    str(rec.isReferenceProteome()) + '\n')
+
+    if fpIndex:
+        fpIndex.writelines(UniProtParser.indexEntries(rec))
+
+    #
+    # content hash, and the change since the previous load
+    #
+    if fpHash:
+        contentHash = rec.contentHash()
+        fpHash.write(uniprotID + '\t' + contentHash + '\n')
+
+        if fpDelta:
+            previous = prevHash.pop(uniprotID, None)
+            if previous is None:
+                fpDelta.write(uniprotID + '\tadded\n')
+            elif previous != contentHash:
+                fpDelta.write(uniprotID + '\tchanged\n')
+
+    #
+    # construct the report rows
+    # multiple accession ids are comma-separated
+    #
+
+    reportRow = ''
+
+    #
+    # uniprot ids
+    # entrezgene id
+    # ensembl id
+    # embl id
+    #
+    reportRow = uniprotID + '\t' + \
+                  ','.join(entrezgeneID) + '\t' + \
+                  ','.join(ensemblID) + '\t' + \
+                  ','.join(emblID) + '\t'
+
+    # EC
+    if len(ecID) > 0:
+        reportRow = reportRow + ','.join(ecID)
+    reportRow = reportRow + '\t'
+
+    # PDB
+    if len(pdbID) > 0:
+        reportRow = reportRow + ','.join(pdbID)
+    reportRow = reportRow + '\t'
+
+    # InterPro
+    if len(ipID) > 0:
+        reportRow = reportRow + ','.join(ipID)
+    reportRow = reportRow + '\t'
+
+    # UniProt/SwissProt key word
+    if len(kwName) > 0:
+        reportRow = reportRow + ','.join(kwName)
+    reportRow = reportRow + '\t'
+
+    # EMBL ID
+    if len(emblID) > 0:
+        reportRow = reportRow + ','.join(emblID)
+    reportRow = reportRow + '\n'
+
+    hasAssoc = len(entrezgeneID) > 0 or len(ensemblID) > 0 or len(emblID) > 0
+
+    if store:
+        store.add((uniprotID, isTrembl, hasAssoc, ','.join(kwName)),
+                  ((UniProtStore.XREF_ENTREZGENE, entrezgeneID),
+                   (UniProtStore.XREF_ENSEMBL, ensemblID),
+                   (UniProtStore.XREF_EMBL, emblID),
+                   (UniProtStore.XREF_EC, ecID),
+                   (UniProtStore.XREF_PDB, pdbID),
+                   (UniProtStore.XREF_INTERPRO, ipID),
+                   (UniProtStore.XREF_MGI, mgiID)))
+
+    #
+    # if exists either EnterzGene id or Ensembl id or EMBL id...
+    #
+    if hasAssoc:
+
+        fpAccAssoc.write(reportRow)
+
+        for sink in sinks:
+            sink.add(rec)
+
+        # swiss-prot
+        if not isTrembl:
+            fpSPAssoc.write(uniprotID + '\n')
+
+        # trembl 
+        else:
+            fpTRAssoc.write(uniprotID + '\n')
+
+    #
+    # else, write reportRow to error files
+    #
+    else:
+        fpAccAssocErr.write(reportRow)
+
+        # swiss-prot
+        if not isTrembl:
+            fpSPAssocErr.write(uniprotID + '\t' + ','.join(emblID) + '\n')
+
+        # trembl 
+        else:
+            fpTRAssocErr.write(uniprotID + '\t' + ','.join(emblID) + '\n')
+
+
 #
 # Purpose: Use a UniProtParser object to get IDs from the UniProt input
 #          file and create the association file.
@@ -318,109 +1036,178 @@ def closeFiles():
 def getAssociations():
 
     #
-    # Create a UniProtParser object.
+    # Process each record returned by the cache or the parser(s).
     #
-    parser = UniProtParser.Parser(fpUniProt)
+    global gzIndex
+
+    cache = None
+    parser = None
 
     #
-    # Get the first record from the parser.
+    # A compressed file can be parsed in parallel only if it has more than
+    # one gzip member and its index is available without a full scan.
     #
-    rec = parser.nextRecord()
+    workers = parserWorkers
+    if inputStream:
+        workers = 1
+    if workers > 1 and inputGzip:
+        gzIndex = UniProtReader.gzipIndex(uniprotFile, gzIndexFile, scan=0)
+        if gzIndex is None or len(gzIndex) < 2:
+            print('No gzip member index for ' + uniprotFile + '; parsing in one process')
+            workers = 1
 
     #
-    # Process each record returned by the parser.
+    # The parsed records have input offsets (for UNIPROT_INDEX_FILE and the
+    # checkpoints) only if the file is memory-mapped or parsed in parallel,
+    # so a cache is only used by a run that parses records with the same
+    # offsets.
     #
-    while rec != None:
+    offsets = bool(not inputStream and ((parserMapped and not inputGzip) or workers > 1))
 
-        #
-        # Get the IDs from the record.
-        #
-        uniprotID = rec.getUniProtID()
-        entrezgeneID = rec.getEntrezGeneID()
-        ensemblID = rec.getEnsemblID()
-        isTrembl = rec.getIsTrembl()
-        pdbID = rec.getPDBID()
-        ecID = rec.getECID()
-        ipID = rec.getInterProID()
-        kwName = rec.getKWName()
-        emblID = rec.getEMBLID()
+    #
+    # A stream cannot be checksummed before it is parsed, so it is not
+    # cached.
+    #
+    useCache = parserCacheFile and not inputStream and not checkpoint
+
+    if useCache:
+        try:
+            cacheKey = UniProtCache.cacheKey(uniprotFile, parserTaxon, offsets)
+        except:
+            print('Cannot read file: ' + uniprotFile)
+            return 1
+        reader = UniProtCache.openCache(parserCacheFile, uniprotFile, cacheKey)
+    else:
+        reader = None
 
+    #
+    # Resume parsing after the last record saved by the checkpoint.
+    #
+    if checkpoint:
+        start = int(checkpoint['offset'])
+        count = int(checkpoint['records'])
+        print('Resuming from the checkpoint at byte %d (%d records)' % (start, count))
+    else:
+        start = 0
+        count = 0
+
+    if reader is not None:
+        print('Using the parsed records cached in ' + parserCacheFile)
+        records = reader.records()
+    elif workers > 1:
+        records = parallelRecords(start)
+    else:
         #
-        # construct the report rows
-        # multiple accession ids are comma-separated
+        # A compressed file or a stream cannot be memory-mapped.
         #
+        parser = UniProtParser.Parser(fpUniProt,
+                                      mapped=parserMapped and not inputGzip
+                                             and not inputStream,
+                                      start=start,
+                                      taxon=parserTaxon, stats=parserStats)
+        records = parser.records()
 
-        reportRow = ''
+    #
+    # The load does not need the cache: if it cannot be written, the load
+    # continues without it.
+    #
+    if reader is None and useCache:
+        try:
+            cache = UniProtCache.CacheWriter(parserCacheFile, uniprotFile, cacheKey)
+        except OSError:
+            print('Cannot write cache file (not caching): ' + parserCacheFile)
 
-        #
-        # uniprot ids
-        # entrezgene id
-        # ensembl id
-        # embl id
-        #
-        reportRow = uniprotID + '\t' + \
-                      ','.join(entrezgeneID) + '\t' + \
-                      ','.join(ensemblID) + '\t' + \
-                      ','.join(emblID) + '\t'
-
-        # EC
-        if len(ecID) > 0:
-            reportRow = reportRow + ','.join(ecID)
-        reportRow = reportRow + '\t'
-
-        # PDB
-        if len(pdbID) > 0:
-            reportRow = reportRow + ','.join(pdbID)
-        reportRow = reportRow + '\t'
-
-        # InterPro
-        if len(ipID) > 0:
-            reportRow = reportRow + ','.join(ipID)
-        reportRow = reportRow + '\t'
-
-        # UniProt/SwissProt key word
-        if len(kwName) > 0:
-            reportRow = reportRow + ','.join(kwName)
-        reportRow = reportRow + '\t'
-
-        # EMBL ID
-        if len(emblID) > 0:
-            reportRow = reportRow + ','.join(emblID)
-        reportRow = reportRow + '\n'
+    #
+    # Cached records may have no offsets (and a resumed run does not read
+    # the cache), so checkpoints are saved only for parsed records.
+    #
+    saving = checkpointing and reader is None
+
+    for rec in records:
+        writeRecord(rec)
+        if cache:
+            try:
+                cache.add(rec)
+            except OSError:
+                cache.discard()
+                cache = None
+                print('Cannot write cache file (not caching): ' + parserCacheFile)
+        count = count + 1
+        if saving and count % checkpointRecords == 0:
+            try:
+                writeCheckpoint(rec.getOffset() + rec.getLength(), count)
+            except:
+                print('Cannot write checkpoint file: ' + checkpointFile)
+                return 1
+
+    if parser:
+        parser.close()
+
+    if cache:
+        try:
+            cache.close()
+        except OSError:
+            cache.discard()
+            print('Cannot write cache file (not caching): ' + parserCacheFile)
 
-        #
-        # if exists either EnterzGene id or Ensembl id or EMBL id...
-        #
-        if len(entrezgeneID) > 0 or len(ensemblID) > 0 or len(emblID) > 0:
+    #
+    # Print the parser statistics (to the log).
+    #
+    if parserStats and reader is None:
+        print(parserStats.summary())
 
-            fpAccAssoc.write(reportRow)
+    #
+    # The previous records that are not in this input file.
+    #
+    if fpDelta:
+        for uniprotID in sorted(prevHash):
+            fpDelta.write(uniprotID + '\tremoved\n')
 
-            # swiss-prot
-            if not isTrembl:
-                fpSPAssoc.write(uniprotID + '\n')
-    
-            # trembl 
-            else:
-                fpTRAssoc.write(uniprotID + '\n')
+    #
+    # Save the accession index (records have offsets only when the file
+    # was memory-mapped or parsed in parallel).
+    #
+    if fpIndex:
+        try:
+            fpIndex.flush()
+            fp = open(uniprotIndexFile + '.entries', 'r')
+            entries = fp.readlines()
+            fp.close()
+            if entries:
+                UniProtParser.writeIndex(entries, uniprotIndexFile)
+            os.remove(uniprotIndexFile + '.entries')
+        except:
+            print('Cannot write index file: ' + uniprotIndexFile)
+            return 1
 
-        #
-        # else, write reportRow to error files
-        #
-        else:
-            fpAccAssocErr.write(reportRow)
+    #
+    # Rename the derived files.
+    #
+    for sink in sinks:
+        try:
+            sink.close()
+        except:
+            print('Cannot write file: ' + sink.path)
+            return 1
 
-            # swiss-prot
-            if not isTrembl:
-                fpSPAssocErr.write(uniprotID + '\t' + ','.join(emblID) + '\n')
-    
-            # trembl 
-            else:
-                fpTRAssocErr.write(uniprotID + '\t' + ','.join(emblID) + '\n')
+    #
+    # Index the SQLite database.
+    #
+    if store:
+        try:
+            store.close()
+        except:
+            print('Cannot write database: ' + uniprotStoreFile)
+            return 1
 
-        #
-        # Get the next record from the parser.
-        #
-        rec = parser.nextRecord()
+    #
+    # The output files are complete; a later run starts from the beginning.
+    #
+    if checkpointing:
+        try:
+            os.remove(checkpointFile)
+        except OSError:
+            pass
 
     return 0
 
@@ -11,6 +11,16 @@
 #
 #      mgi_uniprot.1_0.py
 #
+#  Env Vars:
+#
+#      INFILE_1_0
+#      OUTPUT_1_0_PROTEINCODING
+#
+#      Optional:
+#
+#      DB_COPY_EXPORT (true: extract the protein coding genes with COPY
+#                      (query) TO STDOUT; see PgStream.py)
+#
 #  Inputs:
 #
 #      - The 1-0 bucket
@@ -40,12 +50,16 @@
 import sys 
 import os
 import db
+import PgStream
 
 inputFileName = None
 outputFileName = None
 inputFile = None
 outputFile = None
 
+# DB_COPY_EXPORT
+dbCopy = 0
+
 #
 # Purpose: Initialization
 # Returns: 1 if file does not exist or is not readable, else 0
@@ -55,12 +69,16 @@ outputFile = None
 #
 def initialize():
     global inputFileName, outputFileName, inputFile, outputFile
+    global dbCopy
 
     db.set_sqlLogFunction(db.sqlLogAll)
 
     inputFileName = os.getenv('INFILE_1_0')
     outputFileName = os.getenv('OUTPUT_1_0_PROTEINCODING')
 
+    if os.getenv('DB_COPY_EXPORT') == 'true':
+        dbCopy = 1
+
     #
     # Make sure the required environment variables are set.
     #
@@ -120,11 +138,11 @@ def closeFiles():
 #
 def generateReport():
 
-    mgiID = []
+    mgiID = set()
 
     # select all protein coding genes
 
-    results = db.sql('''
+    cmd = '''
                 select distinct a.accID
                 from ACC_Accession a, VOC_Annot v
                 where a._MGIType_key = 2
@@ -134,10 +152,16 @@ def generateReport():
                 and v._Term_key = 6238161
                 and v._AnnotType_key = 1011
                 and v._Qualifier_key = 1614158
-                ''', 'auto')
-                
-    for r in results:
-        mgiID.append(r['accID'])
+                '''
+
+    if dbCopy:
+        for r in PgStream.copy(cmd):
+            mgiID.add(r[0])
+        PgStream.close()
+    else:
+        results = db.sql(cmd, 'auto')
+        for r in results:
+            mgiID.add(r['accID'])
 
     for line in inputFile.readlines():
 
@@ -60,6 +60,7 @@
 import sys
 import os
 import db
+import PgStream
 
 #
 #  CONSTANTS
@@ -201,9 +202,9 @@ def init ():
     global markerLookup 
     openFiles()
    
-    # load lookups 
+    # load lookups (the rows are streamed, not held in a list)
     # lookup of existing uniprot load associations
-    results = db.sql('''
+    results = PgStream.stream('''
         select a1.accid as uniprotID, a1._LogicalDB_key, m.symbol, a2.accid as mgiID
         from ACC_Accession a1, MRK_Marker m, ACC_Accession a2
         where a1. _MGIType_key = 2
@@ -217,7 +218,7 @@ def init ():
         and a2._LogicalDB_key = 1
         and a2.preferred = 1
         and a2.prefixPart = 'MGI:' 
-        ''', 'auto')
+        ''')
  
     for r in results:
         a = Association()
@@ -231,14 +232,14 @@ def init ():
         markerToUniprotLookup[mgiID].append(a)
     
     # load lookup of all marker MGI IDs
-    results = db.sql('''
+    results = PgStream.stream('''
         select m.symbol, m._Organism_key, m._Marker_Status_key, a.accid as mgiID, a.preferred
         from ACC_Accession a, MRK_Marker m
         where a. _MGIType_key = 2
         and a._LogicalDB_key = 1
         and a.prefixPart = 'MGI:'
         and a._Object_key = m._Marker_key
-        ''', 'auto')
+        ''')
     for r in results:
         m = Marker()
         m.markerID = str.lower(r['mgiID'])
@@ -248,6 +249,8 @@ def init ():
 
         markerLookup[m.markerID] = m
 
+    PgStream.close()
+
     return
 
 # end init() -------------------------------------
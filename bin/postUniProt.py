@@ -4,11 +4,26 @@
 #
 #  Purpose:
 #
-#  This script will use the records in the UNIPROT_ACC_ASSOC_FILE file
+#  This script will use the records in the UNIPROT_REFPROTEOME_FILE file
 #
-#   If the UNIPROT_ACC_ASSOC_FILE/field 8 contains "Reference proteome", 
+#   If the UniProt id is in the UNIPROT_REFPROTEOME_FILE (its key words
+#   contain "Reference proteome"), 
 #   then add row for ACC_Accession._logicaldb_key = 234
 #
+#   The single GCRP ids are read from the headers of the GCRP_FILE fasta file.
+#   If a marker has > 1 such accession id, the one with the longest sequence
+#   (UNIPROT_PROTEIN_FILE/field 5) is used.
+#
+#   Notes:
+#
+#   The UniProt flat file only marks the reference proteome ("Reference
+#   proteome" key word); which of a gene's reference proteome proteins is
+#   its gene-centric (GCRP) protein is only in the GCRP fasta file, so its
+#   headers are still read.
+#
+#   The sequence length of an accession id that is not in the protein
+#   file is taken from SEQ_Sequence, as before the protein file existed.
+#
 #  Usage:
 #
 #      postUniProt.py
@@ -18,10 +33,14 @@
 #      The following environment variables are set by the configuration
 #      file that is sourced by the wrapper script:
 #
-#          UNIPROT_ACC_ASSOC_FILE
+#          UNIPROT_REFPROTEOME_FILE
+#          UNIPROT_PROTEIN_FILE
+#          GCRP_FILE
 #
 #  Inputs:
-#      - UniProt association file ($UNIPROT_ACC_ASSOC_FILE) 
+#      - UniProt reference proteome file ($UNIPROT_REFPROTEOME_FILE) 
+#      - UniProt protein file ($UNIPROT_PROTEIN_FILE) 
+#      - GCRP fasta file ($GCRP_FILE) 
 #
 #  Exit Codes:
 #
@@ -34,21 +53,29 @@
 
 import sys 
 import os
+import gzip
 import db
+import PgStream
 
 #db.setTrace()
 
-# UNIPROT_ACC_ASSOC_FILE
-uniprotAccAssocFile = None
+# UNIPROT_REFPROTEOME_FILE
+uniprotRefProteomeFile = None
+
+# UNIPROT_PROTEIN_FILE
+uniprotProteinFile = None
 
 # file pointers
-fpAccAssoc = None
+fpRefProteome = None
 
 # single GCRP ids
 gcrpFile = None
-gcrpLookup = []
+gcrpLookup = set()
 fpGcrp = None
 
+# sequence length of each UniProt ID
+lengthLookup = {}
+
 #
 # Purpose: Initialization
 # Returns: 1 if file does not exist or is not readable, else 0
@@ -57,45 +84,63 @@ fpGcrp = None
 # Throws: Nothing
 #
 def initialize():
-    global uniprotAccAssocFile, gcrpFile
-    global fpAccAssoc, fpGcrp
-    global gcrpLookup
+    global uniprotRefProteomeFile, uniprotProteinFile, gcrpFile
+    global fpRefProteome, fpGcrp
+    global gcrpLookup, lengthLookup
 
-    uniprotAccAssocFile = os.getenv('UNIPROT_ACC_ASSOC_FILE')
-    gcrpFile = os.getenv('GCRP_IDS_TXT')
+    uniprotRefProteomeFile = os.getenv('UNIPROT_REFPROTEOME_FILE')
+    uniprotProteinFile = os.getenv('UNIPROT_PROTEIN_FILE')
+    gcrpFile = os.getenv('GCRP_FILE')
 
     rc = 0
 
     #
     # Make sure the environment variables are set.
     #
-    if not uniprotAccAssocFile:
-        print('Environment variable not set: UNIPROT_ACC_ASSOC_FILE')
+    if not uniprotRefProteomeFile:
+        print('Environment variable not set: UNIPROT_REFPROTEOME_FILE')
+        rc = 1
+
+    if not uniprotProteinFile:
+        print('Environment variable not set: UNIPROT_PROTEIN_FILE')
         rc = 1
 
     if not gcrpFile:
-        print('Environment variable not set: GCRP_IDS_TXT')
+        print('Environment variable not set: GCRP_FILE')
         rc = 1
 
-    # Open the acc association file.
+    # Open the reference proteome file.
     try:
-        fpAccAssoc = open(uniprotAccAssocFile, 'r')
+        fpRefProteome = open(uniprotRefProteomeFile, 'r')
     except:
-        print('Cannot open association file: ' + uniprotAccAssocFile)
+        print('Cannot open reference proteome file: ' + uniprotRefProteomeFile)
         return 1
 
-    # Open the gcrp file & save in gcrpLookup
+    # Open the gcrp fasta file & save the ids in gcrpLookup
+    # >sp|Q9CQV8|1433B_MOUSE 14-3-3 protein beta/alpha ...
+    # (only the header lines are decoded)
     try:
-        fpGcrp = open(gcrpFile, 'r')
+        fpGcrp = gzip.open(gcrpFile, 'rb')
+        for line in fpGcrp:
+            if line[0:1] == b'>':
+                gcrpLookup.add(line.split(b'|')[1].decode())
+        fpGcrp.close()
     except:
-        print('Cannot open GCRP file: ' + gcrpFile)
+        print('Cannot read GCRP file: ' + gcrpFile)
         return 1
-
-    for line in fpGcrp.readlines():
-        gcrpLookup.append(line[:-1])
-    fpGcrp.close()
     #print(gcrpLookup)
 
+    # Open the protein file & save the sequence lengths in lengthLookup
+    try:
+        fp = open(uniprotProteinFile, 'r')
+        for line in fp:
+            tokens = line[:-1].split('\t')
+            lengthLookup[tokens[0]] = int(tokens[4])
+        fp.close()
+    except:
+        print('Cannot read protein file: ' + uniprotProteinFile)
+        return 1
+
     return 0
 
 #
@@ -107,8 +152,8 @@ def initialize():
 #
 def closeFiles():
 
-    if fpAccAssoc:
-        fpAccAssoc.close()
+    if fpRefProteome:
+        fpRefProteome.close()
 
     return 0
 
@@ -130,55 +175,92 @@ def processUpdates():
     accKey = results[0]['maxKey']
 
     # list of accids that contain 'Reference proteome'
-    accLookup = {}
-    for line in fpAccAssoc.readlines():
-        tokens = line[:-1].split('\t')
-        accid = tokens[0]
-        info = tokens[7]
-
-        if 'Reference proteome' in info:
-            if accid in gcrpLookup:
-                accLookup[accid] = []
-                accLookup[accid].append(info)
+    accLookup = set()
+    for line in fpRefProteome:
+        accid = line[:-1]
+        if accid in gcrpLookup:
+            accLookup.add(accid)
     print('count of accLookup: ' + str(len(accLookup)))
     #print(accLookup)
 
     # search for accids that exist for markers/SWISS-PROT/TrEMBL
     # user = uniprotload_assocload (1442), uniprot_override_assocload (1555)
-    results = db.sql('''
-            select a._accession_key, a.accid, m._marker_key, m.symbol, s.length
-            from acc_accession a, mrk_marker m, acc_accession a2, seq_sequence s
+    # the rows are streamed, in accid order for each marker
+    results = PgStream.stream('''
+            select a._accession_key, a.accid, m._marker_key, m.symbol
+            from acc_accession a, mrk_marker m
             where a._mgitype_key = 2 
             and a._logicaldb_key in (13,41) 
             and a._createdby_key in (1442,1555)
             and a._object_key = m._marker_key
-            and a.accid = a2.accid
-            and a2._mgitype_key = 19
-            and a2._object_key = s._sequence_key
             --and a.accid in ('Q6PIU9', 'Q3UHJ0')
-            order by m._marker_key, s.length desc
-            ''', 'auto')
-    print('count of acc_accession: ' + str(len(results)))
+            order by m._marker_key, a.accid
+            ''')
 
-    addSQL = ''
-    geneLookup  = []
+    # marker key -> accids in accLookup (then the accid that is used)
+    markerLookup = {}
+    counter = 0
     for r in results:
+        counter += 1
         accid = r['accid']
         markerKey = r['_marker_key']
 
         # if accid in database exists in accLookup, then set preferred = 0
         if accid in accLookup:
-
-            # if > 1 accession per gene, use the first accession id found
-            if markerKey in geneLookup:
+            markerLookup.setdefault(markerKey, []).append(accid)
+
+    print('count of acc_accession: ' + str(counter))
+    PgStream.close()
+
+    # the sequence length of an accid that is not in the protein file
+    # is read from the database
+    missing = set()
+    for accids in markerLookup.values():
+        for accid in accids:
+            if accid not in lengthLookup:
+                missing.add(accid)
+    print('count of accids not in protein file: ' + str(len(missing)))
+
+    if missing:
+        results = db.sql('''
+            select a.accid, max(s.length) as length
+            from acc_accession a, seq_sequence s
+            where a._mgitype_key = 19
+            and a._object_key = s._sequence_key
+            and a.accid in ('%s')
+            group by a.accid
+            ''' % "','".join(sorted(missing)), 'auto')
+        for r in results:
+            lengthLookup[r['accid']] = r['length']
+            missing.discard(r['accid'])
+        for accid in sorted(missing):
+            print('accid not in protein file or SEQ_Sequence (skipped): ' + accid)
+
+    # if > 1 accession per gene, use the longest sequence, and of accids
+    # with the same length, the first in accid order
+    for markerKey in list(markerLookup):
+        best = None
+        for accid in markerLookup[markerKey]:
+            if accid in missing:
                 continue
-            geneLookup.append(markerKey)
+            if best is None or lengthLookup[accid] > lengthLookup[best]:
+                best = accid
+        if best is None:
+            del markerLookup[markerKey]
+        else:
+            markerLookup[markerKey] = best
 
-            addSQL = '''insert into ACC_Accession values(%s,'%s',null,null,234,%d,2,0,1,1442,1442,now(),now());\n''' % (accKey, accid, markerKey)
-            addSQL += '''insert into ACC_AccessionReference values(%s,53672,1442,1442,now(),now());\n''' % (accKey)
-            db.sql(addSQL, None)
-            db.commit()
-            accKey += 1
+    addSQL = ''
+    geneLookup  = []
+    for markerKey in sorted(markerLookup):
+        accid = markerLookup[markerKey]
+        geneLookup.append(markerKey)
+
+        addSQL = '''insert into ACC_Accession values(%s,'%s',null,null,234,%d,2,0,1,1442,1442,now(),now());\n''' % (accKey, accid, markerKey)
+        addSQL += '''insert into ACC_AccessionReference values(%s,53672,1442,1442,now(),now());\n''' % (accKey)
+        db.sql(addSQL, None)
+        db.commit()
+        accKey += 1
            
     print('length of geneLookup: ' + str(len(geneLookup)))
     results = db.sql('select count(*) as counter from acc_accession where _logicaldb_key = 234', 'auto')
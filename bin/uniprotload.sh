@@ -91,13 +91,21 @@ touch ${LOG}
 #
 # createArchive
 #
-echo "archiving..." >> ${LOG}
-date >> ${LOG}
-preload ${OUTPUTDIR}
-rm -rf ${OUTPUTDIR}/*.diagnostics
-rm -rf ${OUTPUTDIR}/*.error
-echo "archiving complete" >> ${LOG}
-date >> ${LOG}
+# When a failed parse is resumed from its checkpoint, the partial output
+# files in OUTPUTDIR are continued, so they are not archived.
+#
+if [ "${PARSER_RESUME}" = "true" -a -f "${PARSER_CHECKPOINT}" ]
+then
+    echo "resuming from ${PARSER_CHECKPOINT}; not archiving ${OUTPUTDIR}" >> ${LOG}
+else
+    echo "archiving..." >> ${LOG}
+    date >> ${LOG}
+    preload ${OUTPUTDIR}
+    rm -rf ${OUTPUTDIR}/*.diagnostics
+    rm -rf ${OUTPUTDIR}/*.error
+    echo "archiving complete" >> ${LOG}
+    date >> ${LOG}
+fi
 
 #
 # Create the UniProt association file.
@@ -188,6 +196,15 @@ echo "Post UniProt postUniProt.sh (uniprotload.sh)" | tee -a ${LOG}
 STAT=$?
 checkStatus ${STAT} "postUniProt.sh (uniprotload.sh)"
 
+#
+# Save the UniProt record content hashes; the next load reports the
+# records that changed since this one.
+#
+if [ -f ${UNIPROT_HASH_FILE} ]
+then
+    cp ${UNIPROT_HASH_FILE} ${UNIPROT_HASH_PREV_FILE}
+fi
+
 #
 # run postload cleanup and email logs
 #
@@ -0,0 +1,90 @@
+#
+# Shared fixtures of the uniprotload tests.
+#
+# The scripts in bin are run as the wrapper scripts run them (in a
+# subprocess, configured by environment variables), on the synthetic
+# UniProt file tests/data/uniprot.dat (100 entries written by
+# makeTestUniProtFile.py -n 100 --pdb-heavy 0).
+#
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bin')
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+sys.path.insert(0, BIN)
+
+# the association files written by makeUniProtAssocFile.py:
+# environment variable -> file name
+ASSOC_FILES = {
+    'UNIPROT_ACC_ASSOC_FILE' : 'acc.txt',
+    'UNIPROT_ACC_ASSOC_ERR_FILE' : 'accerr.txt',
+    'UNIPROT_SP_ASSOC_FILE' : 'sp.txt',
+    'UNIPROT_SP_ASSOC_ERR_FILE' : 'sperr.txt',
+    'UNIPROT_TR_ASSOC_FILE' : 'tr.txt',
+    'UNIPROT_TR_ASSOC_ERR_FILE' : 'trerr.txt',
+    'UNIPROT_PROTEIN_FILE' : 'protein.txt',
+}
+
+
+#
+# Purpose: Run makeUniProtAssocFile.py.
+# Returns: subprocess.CompletedProcess (stdout and stderr as text)
+# Assumes: Nothing
+# Effects: Writes the association files (ASSOC_FILES) to outputDir;
+#          'stdin' (a file object) is the standard input of the script
+# Throws: Nothing
+#
+def runAssoc(inputFile, outputDir, stdin=None, **settings):
+
+    os.makedirs(outputDir, exist_ok=True)
+
+    #
+    # The caller's PARSER_* and UNIPROT_* settings are not used.
+    #
+    env = {}
+    for (name, value) in os.environ.items():
+        if not name.startswith(('PARSER_', 'UNIPROT_')):
+            env[name] = value
+    env['INPUTFILE'] = str(inputFile)
+    for (name, fileName) in ASSOC_FILES.items():
+        env[name] = os.path.join(outputDir, fileName)
+    for (name, value) in settings.items():
+        env[name] = str(value)
+
+    return subprocess.run([sys.executable, 'makeUniProtAssocFile.py'], cwd=BIN,
+                          env=env, stdin=stdin, capture_output=True, text=True)
+
+
+#
+# Purpose: Read the association files of a directory.
+# Returns: file name -> contents
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: OSError
+#
+def readAssoc(outputDir):
+
+    files = {}
+    for fileName in ASSOC_FILES.values():
+        fp = open(os.path.join(outputDir, fileName), 'r')
+        files[fileName] = fp.read()
+        fp.close()
+    return files
+
+
+# the synthetic UniProt file
+@pytest.fixture(scope='session')
+def uniprotFile():
+    return os.path.join(DATA, 'uniprot.dat')
+
+
+# the association files written for uniprotFile by the line-by-line
+# parser of the original makeUniProtAssocFile.py
+@pytest.fixture(scope='session')
+def expected():
+    return readAssoc(DATA)
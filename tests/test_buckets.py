@@ -0,0 +1,109 @@
+#
+# makeBuckets.py with BUCKET_MGI_XREF: the 1:1 pairs resolved by the DR MGI
+# cross-references are counted and listed in their own section of the 1:1
+# bucket file, and the associations are the same as without them.
+#
+# makeBuckets.py needs the MGI libraries (db, tabledatasetlib).
+#
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+from conftest import BIN
+
+pytest.importorskip('db')
+pytest.importorskip('tabledatasetlib')
+
+# MGI ID, symbol, marker type, EntrezGene, Ensembl, EMBL
+MGI_ASSOC = [
+    'MGI:1\tGene1\t1\t100\t\t',
+    'MGI:2\tGene2\t1\t200\t\t',
+    'MGI:3\tGene3\t1\t300\t\t',
+]
+
+# UniProt ID, EntrezGene, Ensembl, EMBL, EC, PDB, InterPro, key words,
+# EMBL
+UNIPROT_ASSOC = [
+    'Q00001\t100\t\t\t\t\t\t\t',
+    'Q00002\t200\t\t\t\t\t\t\t',
+    'Q00003\t300\t\t\t\t\t\t\t',
+    'Q00004\t300\t\t\t\t\t\t\t',
+]
+
+# UniProt ID, MGI ID (DR MGI cross-reference)
+MGI_XREF = [
+    'Q00001\tMGI:1',
+]
+
+COUNT = 'total number of unique records:'
+
+
+def writeLines(path, lines):
+    fp = open(path, 'w')
+    fp.write(''.join([line + '\n' for line in lines]))
+    fp.close()
+
+
+def runBuckets(tmp_path, xref):
+
+    bucketDir = tmp_path / xref
+    os.makedirs(bucketDir)
+
+    writeLines(tmp_path / 'mgi.txt', MGI_ASSOC)
+    writeLines(tmp_path / 'acc.txt', UNIPROT_ASSOC)
+    writeLines(tmp_path / 'xref.txt', MGI_XREF)
+    writeLines(tmp_path / 'sp.txt', ['Q00001', 'Q00002'])
+    writeLines(tmp_path / 'tr.txt', ['Q00003', 'Q00004'])
+
+    env = dict(os.environ)
+    env.update({ 'MGI_ACC_ASSOC_FILE' : str(tmp_path / 'mgi.txt'),
+                 'UNIPROT_ACC_ASSOC_FILE' : str(tmp_path / 'acc.txt'),
+                 'UNIPROT_SP_ASSOC_FILE' : str(tmp_path / 'sp.txt'),
+                 'UNIPROT_TR_ASSOC_FILE' : str(tmp_path / 'tr.txt'),
+                 'UNIPROT_MGI_XREF_FILE' : str(tmp_path / 'xref.txt'),
+                 'MGI_UNIPROT_LOAD_FILE' : str(bucketDir / 'load.txt'),
+                 'BUCKETDIR' : str(bucketDir),
+                 'BUCKET_PREFIX' : 'bucket',
+                 'BUCKET_MGI_XREF' : xref })
+
+    result = subprocess.run([sys.executable, 'makeBuckets.py'], cwd=BIN, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    return bucketDir
+
+
+def test_xref(tmp_path):
+
+    bucketDir = runBuckets(tmp_path, 'true')
+
+    fp = open(bucketDir / 'bucket.1_1.txt', 'r')
+    lines = fp.read().split('\n')
+    fp.close()
+
+    #
+    # MGI:2/Q00002 is bucketized; MGI:1/Q00001 is resolved by its DR MGI.
+    #
+    counts = [line[len(COUNT):].strip() for line in lines if line.startswith(COUNT)]
+    assert counts == ['1', '1']
+
+    section = lines.index('1:1 pairs resolved by the MGI cross-references')
+    pairs = [line for line in lines[section:] if line.startswith('MGI:')]
+    assert pairs[0].split('\t')[0] == 'MGI:1'
+    assert pairs[0].split('\t')[6] == 'Q00001'
+
+    assert [f for f in os.listdir(bucketDir) if f.endswith('.xref.txt')] == []
+
+
+def test_same_associations(tmp_path):
+
+    files = []
+    for xref in ('true', 'false'):
+        fp = open(runBuckets(tmp_path, xref) / 'load.txt', 'r')
+        files.append(fp.read())
+        fp.close()
+
+    assert files[0] == files[1]
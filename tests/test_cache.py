@@ -0,0 +1,109 @@
+#
+# The parsed-record cache (PARSER_CACHE) is only used for the same input
+# file, parsed into records with the same offsets.
+#
+
+import os
+import shutil
+
+import UniProtCache
+
+from conftest import runAssoc, readAssoc
+
+CACHED = 'Using the parsed records cached in '
+
+
+def test_offsets(uniprotFile, expected, tmp_path):
+
+    cacheFile = tmp_path / 'uniprot.cache'
+    indexFile = tmp_path / 'uniprot.idx'
+
+    #
+    # Records parsed line by line have no offsets, so no index.
+    #
+    result = runAssoc(uniprotFile, tmp_path / 'text', PARSER_MMAP='false',
+                      PARSER_CACHE=cacheFile, UNIPROT_INDEX_FILE=indexFile)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert CACHED not in result.stdout
+    assert not indexFile.exists()
+
+    #
+    # A parallel run (with the same PARSER_MMAP) does not use them.
+    #
+    for run in ('parallel', 'cached'):
+        result = runAssoc(uniprotFile, tmp_path / run, PARSER_MMAP='false',
+                          PARSER_WORKERS=2, PARSER_CACHE=cacheFile,
+                          UNIPROT_INDEX_FILE=indexFile)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert (CACHED in result.stdout) == (run == 'cached')
+        assert readAssoc(tmp_path / run) == expected
+
+        fp = open(indexFile, 'r')
+        index = fp.read()
+        fp.close()
+        os.remove(indexFile)
+        if run == 'parallel':
+            parsedIndex = index
+        else:
+            assert index == parsedIndex
+
+
+def test_key(uniprotFile, tmp_path, monkeypatch):
+
+    inputFile = str(tmp_path / 'uniprot.dat')
+    shutil.copyfile(uniprotFile, inputFile)
+    cacheFile = str(tmp_path / 'uniprot.cache')
+
+    checksums = []
+    fileChecksum = UniProtCache.fileChecksum
+    monkeypatch.setattr(UniProtCache, 'fileChecksum',
+                        lambda path: checksums.append(path) or fileChecksum(path))
+
+    #
+    # The input file is checksummed when the cache file is finished.
+    #
+    key = UniProtCache.cacheKey(inputFile, None, True)
+    cache = UniProtCache.CacheWriter(cacheFile, inputFile, key)
+    cache.add('record')
+    assert checksums == []
+    cache.close()
+    assert checksums == [inputFile]
+
+    reader = UniProtCache.openCache(cacheFile, inputFile, key)
+    assert list(reader.records()) == ['record']
+    del checksums[:]
+
+    #
+    # The input file is only checksummed when its size and modification
+    # time match.
+    #
+    assert UniProtCache.openCache(cacheFile, inputFile,
+                                  UniProtCache.cacheKey(inputFile, None, False)) is None
+    stat = os.stat(inputFile)
+    os.utime(inputFile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert UniProtCache.openCache(cacheFile, inputFile,
+                                  UniProtCache.cacheKey(inputFile, None, True)) is None
+    assert checksums == []
+
+    #
+    # Same size and modification time, different content.
+    #
+    fp = open(inputFile, 'r+b')
+    fp.write(b'X')
+    fp.close()
+    os.utime(inputFile, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert UniProtCache.openCache(cacheFile, inputFile, key) is None
+    assert checksums == [inputFile]
+
+
+def test_unwritable(uniprotFile, expected, tmp_path):
+
+    #
+    # A cache file that cannot be written does not stop the load.
+    #
+    cacheFile = tmp_path / 'missing' / 'uniprot.cache'
+    result = runAssoc(uniprotFile, tmp_path, PARSER_CACHE=cacheFile)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'not caching' in result.stdout
+    assert readAssoc(tmp_path) == expected
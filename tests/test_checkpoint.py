@@ -0,0 +1,110 @@
+#
+# Checkpoint and resume (PARSER_CHECKPOINT, PARSER_RESUME).
+#
+# An interrupted run is reproduced exactly: the output files of the first
+# records (written by a run on those records only, plus a partial line
+# written after the checkpoint) and the checkpoint that a run of the
+# whole file saves after them.
+#
+
+import os
+
+import pytest
+
+from conftest import ASSOC_FILES, runAssoc, readAssoc
+
+# number of records before the checkpoint
+RECORDS = 50
+
+
+#
+# Purpose: Write the outputs and the checkpoint of a run interrupted after
+#          RECORDS records.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes the files to outputDir, and the checkpoint
+# Throws: OSError
+#
+def interrupt(uniprotFile, outputDir, checkpointFile):
+
+    fp = open(uniprotFile, 'rb')
+    data = fp.read()
+    fp.close()
+
+    offset = 0
+    for i in range(RECORDS):
+        offset = data.index(b'\n//\n', offset) + 4
+
+    partFile = str(outputDir) + '.dat'
+    fp = open(partFile, 'wb')
+    fp.write(data[:offset])
+    fp.close()
+
+    result = runAssoc(partFile, outputDir)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    stat = os.stat(uniprotFile)
+    fp = open(checkpointFile, 'w')
+    fp.write('input\t%s\n' % uniprotFile)
+    fp.write('size\t%d\n' % stat.st_size)
+    fp.write('mtime\t%d\n' % stat.st_mtime_ns)
+    fp.write('taxon\t\n')
+    fp.write('offset\t%d\n' % offset)
+    fp.write('records\t%d\n' % RECORDS)
+    for fileName in ASSOC_FILES.values():
+        path = os.path.join(outputDir, fileName)
+        fp.write('file\t%s\t%d\n' % (path, os.path.getsize(path)))
+    fp.close()
+
+    fp = open(os.path.join(outputDir, 'acc.txt'), 'a')
+    fp.write('Q99999\tpartial')
+    fp.close()
+
+
+@pytest.mark.parametrize('mmap, workers', [('true', 1), ('false', 2)])
+def test_resume(uniprotFile, expected, tmp_path, mmap, workers):
+
+    checkpointFile = tmp_path / 'ckpt'
+    interrupt(uniprotFile, tmp_path / 'out', checkpointFile)
+
+    result = runAssoc(uniprotFile, tmp_path / 'out', PARSER_MMAP=mmap,
+                      PARSER_WORKERS=workers, PARSER_CHECKPOINT=checkpointFile,
+                      PARSER_CHECKPOINT_RECORDS=20, PARSER_RESUME='true')
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'Resuming from the checkpoint' in result.stdout
+    assert readAssoc(tmp_path / 'out') == expected
+    assert not checkpointFile.exists()
+
+
+def test_short_output(uniprotFile, expected, tmp_path):
+
+    checkpointFile = tmp_path / 'ckpt'
+    interrupt(uniprotFile, tmp_path / 'out', checkpointFile)
+    os.remove(tmp_path / 'out' / 'acc.txt')
+
+    result = runAssoc(uniprotFile, tmp_path / 'out', PARSER_MMAP='true',
+                      PARSER_CHECKPOINT=checkpointFile, PARSER_RESUME='true')
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'missing or short' in result.stdout
+    assert readAssoc(tmp_path / 'out') == expected
+
+
+#
+# Records read from the cache are not checkpointed (they may have no
+# offsets, and a resumed run does not read the cache).
+#
+def test_cache(uniprotFile, expected, tmp_path):
+
+    cacheFile = tmp_path / 'uniprot.cache'
+    checkpointFile = tmp_path / 'ckpt'
+
+    for run in ('parsed', 'cached'):
+        result = runAssoc(uniprotFile, tmp_path / run, PARSER_MMAP='true',
+                          PARSER_CACHE=cacheFile, PARSER_CHECKPOINT=checkpointFile,
+                          PARSER_CHECKPOINT_RECORDS=20)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert ('Using the parsed records cached' in result.stdout) == (run == 'cached')
+        assert readAssoc(tmp_path / run) == expected
+        assert not checkpointFile.exists()
@@ -0,0 +1,57 @@
+#
+# The content hash of a record changes when a field written by the load
+# changes, and only then.
+#
+
+import pytest
+
+import UniProtParser
+
+ENTRY = '''ID   P00001_MOUSE             Reviewed;         120 AA.
+AC   Q00001; A00002;
+DE   RecName: Full=Protein 1;
+DE            EC=1.2.3.4;
+GN   Name=Gene1; Synonyms=Gs1;
+OS   Mus musculus (Mouse).
+OX   NCBI_TaxID=10090;
+CC   -!- FUNCTION: Does things.
+DR   EMBL; AK000001; BAB00001.1; -; mRNA.
+DR   PDB; 1X01; X-ray; 3.10 A; A/B=1-589.
+DR   GeneID; 11001; -.
+DR   Ensembl; ENSMUST00000000001.4; ENSMUSP00000000001.4; ENSMUSG00000000001.1.
+DR   InterPro; IPR000001; Domain.
+DR   MGI; MGI:1001; Gene1.
+KW   Reference proteome; Zinc.
+SQ   SEQUENCE   120 AA;  13200 MW;  0123456789ABCDEF CRC64;
+//
+'''
+
+
+def contentHash(text):
+    parser = UniProtParser.Parser(None, buffer=text.encode())
+    return parser.nextRecord().contentHash()
+
+
+def test_same():
+    assert contentHash(ENTRY) == contentHash(ENTRY)
+    assert contentHash(ENTRY) == contentHash(ENTRY.replace('Does things', 'Does more'))
+
+
+@pytest.mark.parametrize('old, new', [
+    ('MGI:1001', 'MGI:1002'),
+    ('Name=Gene1', 'Name=Gene2'),
+    ('NCBI_TaxID=10090', 'NCBI_TaxID=10091'),
+    ('SEQUENCE   120 AA', 'SEQUENCE   121 AA'),
+    ('0123456789ABCDEF', '0123456789ABCDEE'),
+    ('A00002', 'A00003'),
+    ('ENSMUSG00000000001', 'ENSMUSG00000000002'),
+    ('11001', '11002'),
+    ('AK000001', 'AK000002'),
+    ('1X01', '1X02'),
+    ('1.2.3.4', '1.2.3.5'),
+    ('IPR000001', 'IPR000002'),
+    ('Zinc', 'Membrane'),
+    ('Reviewed', 'Unreviewed'),
+])
+def test_changed(old, new):
+    assert contentHash(ENTRY) != contentHash(ENTRY.replace(old, new))
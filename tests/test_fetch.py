@@ -0,0 +1,58 @@
+#
+# Parser.fetch() reads one record through the accession index, with the
+# same content, offset and length as when the whole file is parsed.
+#
+
+import pytest
+
+import UniProtParser
+
+
+@pytest.fixture(scope='module')
+def indexed(uniprotFile, tmp_path_factory):
+
+    fp = open(uniprotFile, 'r')
+    parser = UniProtParser.Parser(fp, mapped=1)
+    records = list(parser.records())
+    parser.close()
+    fp.close()
+
+    entries = []
+    for rec in records:
+        entries.extend(UniProtParser.indexEntries(rec))
+    indexFile = str(tmp_path_factory.mktemp('index') / 'uniprot.idx')
+    UniProtParser.writeIndex(entries, indexFile)
+
+    return (records, indexFile)
+
+
+@pytest.mark.parametrize('mapped', [0, 1])
+def test_fetch(uniprotFile, indexed, mapped):
+
+    (records, indexFile) = indexed
+
+    #
+    # The synthetic secondary accessions are random, so only the ones of
+    # one record are looked up.
+    #
+    counts = {}
+    for rec in records:
+        for accession in rec.getSecondaryID():
+            counts[accession] = counts.get(accession, 0) + 1
+
+    fp = open(uniprotFile, 'r')
+    parser = UniProtParser.Parser(fp, mapped=mapped, indexFile=indexFile)
+
+    for rec in records:
+        secondaryIDs = [a for a in rec.getSecondaryID() if counts[a] == 1]
+        for accession in [rec.getUniProtID()] + secondaryIDs:
+            fetched = parser.fetch(accession)
+            assert fetched.getUniProtID() == rec.getUniProtID()
+            assert fetched.getOffset() == rec.getOffset()
+            assert fetched.getLength() == rec.getLength()
+            assert fetched.contentHash() == rec.contentHash()
+
+    assert parser.fetch('NOTANID') is None
+
+    parser.close()
+    fp.close()
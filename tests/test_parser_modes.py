@@ -0,0 +1,58 @@
+#
+# makeUniProtAssocFile.py writes the same association files in every
+# parsing mode (line by line, read ahead, memory-mapped, in parallel,
+# taxon-filtered, compressed and streamed input) as the line-by-line parser.
+#
+
+import gzip
+import shutil
+
+import pytest
+
+from conftest import runAssoc, readAssoc
+
+MODES = {
+    'text' : { 'PARSER_MMAP' : 'false', 'PARSER_WORKERS' : 1 },
+    'readahead' : { 'PARSER_MMAP' : 'false', 'PARSER_WORKERS' : 1,
+                    'PARSER_READAHEAD' : 'true' },
+    'mmap' : { 'PARSER_MMAP' : 'true', 'PARSER_WORKERS' : 1 },
+    'mmap-workers' : { 'PARSER_MMAP' : 'true', 'PARSER_WORKERS' : 3 },
+    'workers' : { 'PARSER_MMAP' : 'false', 'PARSER_WORKERS' : 2 },
+    'taxon' : { 'PARSER_MMAP' : 'true', 'PARSER_WORKERS' : 1,
+                'PARSER_TAXON' : '10090' },
+}
+
+
+@pytest.mark.parametrize('mode', sorted(MODES))
+def test_modes(uniprotFile, expected, tmp_path, mode):
+
+    result = runAssoc(uniprotFile, tmp_path, **MODES[mode])
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert readAssoc(tmp_path) == expected
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_gzip(uniprotFile, expected, tmp_path, workers):
+
+    gzFile = tmp_path / 'uniprot.dat.gz'
+    fpIn = open(uniprotFile, 'rb')
+    fpOut = gzip.open(gzFile, 'wb')
+    shutil.copyfileobj(fpIn, fpOut)
+    fpOut.close()
+    fpIn.close()
+
+    result = runAssoc(gzFile, tmp_path / 'out', PARSER_WORKERS=workers)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert readAssoc(tmp_path / 'out') == expected
+
+
+def test_stream(uniprotFile, expected, tmp_path):
+
+    fp = open(uniprotFile, 'rb')
+    result = runAssoc('-', tmp_path, stdin=fp, PARSER_MMAP='true', PARSER_WORKERS=2)
+    fp.close()
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert readAssoc(tmp_path) == expected
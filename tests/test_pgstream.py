@@ -0,0 +1,230 @@
+#
+# PgStream.py on a mocked connection: the database driver (psycopg2) and the
+# MGI db module are replaced by stand-ins, so no database is needed.
+#
+
+import os
+import sys
+import types
+import threading
+import importlib.util
+
+import pytest
+
+from conftest import BIN
+
+COLUMNS = ('Accid', '_Marker_key')
+
+ROWS = [('Q00001', 1), ('Q00002', 1), ('Q00003', 2), ('Q00004', 3), ('Q00005', 3)]
+
+# the rows of the queries merged by merge() (by query)
+QUERIES = {
+    'even' : [('Q%05d' % i, i) for i in range(0, 100, 2)],
+    'odd' : [('Q%05d' % i, i) for i in range(1, 100, 2)],
+}
+
+
+#
+# A server-side cursor over ROWS.
+#
+class Cursor:
+
+    def __init__ (self, conn, rows):
+        self.conn = conn
+        self.rows = list(rows)
+        self.description = None
+        self.fetches = 0
+        self.closed = 0
+
+    def execute (self, cmd, args=None):
+        if self.conn.fail or cmd == 'fail':
+            raise RuntimeError('query failed')
+        if cmd in QUERIES:
+            self.rows = list(QUERIES[cmd])
+        self.description = [(c,) for c in COLUMNS]
+
+    def fetchone (self):
+        return ('00000003-00000002-1',)
+
+    def fetchmany (self, size):
+        self.fetches += 1
+        (rows, self.rows) = (self.rows[:size], self.rows[size:])
+        return rows
+
+    def close (self):
+        self.closed = 1
+
+
+class Connection:
+
+    def __init__ (self, rows=ROWS, fail=0):
+        self.rows = rows
+        self.fail = fail
+        self.cursors = []
+        self.rollbacks = 0
+        self.closed = 0
+
+    def set_session (self, **settings):
+        pass
+
+    def cursor (self, name=None):
+        cursor = Cursor(self, self.rows)
+        self.cursors.append(cursor)
+        return cursor
+
+    def rollback (self):
+        self.rollbacks += 1
+
+    def close (self):
+        self.closed = 1
+
+
+# PgStream, imported with the stand-in modules
+@pytest.fixture
+def PgStream(monkeypatch):
+
+    psycopg2 = types.ModuleType('psycopg2')
+    psycopg2.extensions = types.ModuleType('psycopg2.extensions')
+    psycopg2.extensions.encodings = {}
+    monkeypatch.setitem(sys.modules, 'psycopg2', psycopg2)
+    monkeypatch.setitem(sys.modules, 'psycopg2.extensions', psycopg2.extensions)
+    monkeypatch.setitem(sys.modules, 'db', types.ModuleType('db'))
+
+    spec = importlib.util.spec_from_file_location('PgStream',
+                                                  os.path.join(BIN, 'PgStream.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def test_stream(PgStream):
+
+    conn = Connection()
+    rows = list(PgStream.stream('select', chunkSize=2, conn=conn))
+
+    assert [(r['accid'], r['_MARKER_KEY']) for r in rows] == ROWS
+    assert 'ACCID' in rows[0]
+
+    #
+    # Three chunks of rows and the empty one that ends the loop; the
+    # cursor's transaction is ended.
+    #
+    cursor = conn.cursors[0]
+    assert cursor.fetches == 4
+    assert cursor.closed
+    assert conn.rollbacks == 1
+
+
+def test_raw(PgStream):
+
+    conn = Connection()
+
+    assert list(PgStream.stream('select', chunkSize=3, raw=1, conn=conn)) == ROWS
+
+
+def test_stopped(PgStream):
+
+    #
+    # The consumer stops after the first row.
+    #
+    conn = Connection()
+    rows = PgStream.stream('select', chunkSize=2, conn=conn)
+    assert next(rows)['accid'] == 'Q00001'
+    rows.close()
+
+    assert conn.cursors[0].fetches == 1
+    assert conn.cursors[0].closed
+    assert conn.rollbacks == 1
+
+
+def test_failed(PgStream):
+
+    conn = Connection(fail=1)
+
+    with pytest.raises(RuntimeError):
+        list(PgStream.stream('select', conn=conn))
+
+    assert conn.cursors[0].closed
+    assert conn.rollbacks == 1
+
+
+@pytest.mark.parametrize('field, value', [
+    ('\\N', None),
+    ('Q00001', 'Q00001'),
+    ('a\\tb\\nc\\\\d', 'a\tb\nc\\d'),
+    ('\\101\\60\\7', 'A0\x07'),         # octal, 1 to 3 digits
+    ('\\1011', 'A1'),                   # at most 3 octal digits
+    ('\\x41\\x9\\x4G', 'A\t\x04G'),      # hex, 1 or 2 digits
+    ('\\xZ', 'xZ'),                     # \x without hex digits
+    ('\\q', 'q'),                       # any other character
+])
+def test_copyField(PgStream, field, value):
+
+    assert PgStream.copyField(field) == value
+
+
+# the connections opened by merge()
+@pytest.fixture
+def connections(PgStream, monkeypatch):
+
+    connections = []
+
+    def newConnection():
+        conn = Connection()
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(PgStream, 'newConnection', newConnection)
+    monkeypatch.setattr(PgStream, 'BATCH_SIZE', 2)
+    monkeypatch.setattr(PgStream, 'QUEUE_SIZE', 1)
+
+    return connections
+
+
+#
+# The merge() threads are stopped and every connection is closed, with
+# its queries' transactions ended.
+#
+def assertClosed(connections):
+
+    assert [t for t in threading.enumerate() if 'queueRows' in t.name] == []
+
+    #
+    # The coordinator, then one connection per query (the query is on its
+    # last cursor).
+    #
+    assert len(connections) == 3
+    for conn in connections:
+        assert conn.closed
+    for conn in connections[1:]:
+        assert conn.cursors[-1].closed
+        assert conn.rollbacks == 1
+
+
+def test_merge(PgStream, connections):
+
+    rows = list(PgStream.merge(['even', 'odd'], key=lambda r: r[1]))
+
+    assert rows == sorted(QUERIES['even'] + QUERIES['odd'], key=lambda r: r[1])
+    assertClosed(connections)
+
+
+def test_merge_stopped(PgStream, connections):
+
+    #
+    # The consumer stops while the threads are still queueing rows.
+    #
+    rows = PgStream.merge(['even', 'odd'], key=lambda r: r[1])
+    assert next(rows) == ('Q00000', 0)
+    rows.close()
+
+    assertClosed(connections)
+
+
+def test_merge_failed(PgStream, connections):
+
+    with pytest.raises(RuntimeError):
+        list(PgStream.merge(['even', 'fail'], key=lambda r: r[1]))
+
+    assertClosed(connections)
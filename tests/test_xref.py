@@ -0,0 +1,58 @@
+#
+# UniProtXref.resolvePairs: the MGI/UniProt 1:1 pairs confirmed by the DR MGI
+# cross-references (the pairs that makeBuckets.py takes out before
+# bucketizing).
+#
+
+import pytest
+
+import UniProtXref
+
+# MGI ID, symbol, marker type, EntrezGene, Ensembl, EMBL
+MGI_ROWS = [
+    ['MGI:1', 'Gene1', '1', '100', '', ''],
+    ['MGI:2', 'Gene2', '1', '200', 'ENSMUSG2', ''],
+    ['MGI:3', 'Gene3', '1', '300', '', ''],
+    ['MGI:4', 'Gene4', '1', '400', '', 'AK4'],
+    ['MGI:5', 'Gene5', '1', '', '', 'AK4'],
+]
+
+# UniProt ID, EntrezGene, Ensembl, EMBL, EC, PDB, InterPro, key words, EMBL
+UNIPROT_ROWS = [
+    ['Q00001', '100', '', '', '', '', '', '', ''],
+    ['Q00002', '', 'ENSMUSG2', '', '', '', '', '', ''],
+    ['Q00003', '300', '', '', '', '', '', '', ''],
+    ['Q00004', '300', '', '', '', '', '', '', ''],
+    ['Q00005', '400', '', 'AK4', '', '', '', '', ''],
+]
+
+
+def test_pairs():
+
+    xrefs = { 'Q00001' : {'MGI:1'}, 'Q00002' : {'MGI:2', 'MGI:9'} }
+
+    assert UniProtXref.resolvePairs(MGI_ROWS, UNIPROT_ROWS, xrefs) == [(0, 0), (1, 1)]
+
+
+@pytest.mark.parametrize('uniprotID, mgiID', [
+    ('Q00001', 'MGI:2'),        # the cross-reference is to another marker
+    ('Q00003', 'MGI:3'),        # MGI:3 shares its IDs with Q00004 too
+    ('Q00005', 'MGI:4'),        # Q00005 shares its IDs with MGI:5 too
+    ('Q00009', 'MGI:1'),        # not in the UniProt association file
+])
+def test_not_resolved(uniprotID, mgiID):
+
+    xrefs = { uniprotID : {mgiID} }
+
+    assert UniProtXref.resolvePairs(MGI_ROWS, UNIPROT_ROWS, xrefs) == []
+
+
+def test_readXrefs(tmp_path):
+
+    path = tmp_path / 'xref.txt'
+    fp = open(path, 'w')
+    fp.write('Q00001\tMGI:1\nQ00002\tMGI:2\nQ00002\tMGI:9\n')
+    fp.close()
+
+    assert UniProtXref.readXrefs(path) == { 'Q00001' : {'MGI:1'},
+                                            'Q00002' : {'MGI:2', 'MGI:9'} }